@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+#
+# bench_double64.py
+#
+# Benchmarks of the decode, encode and display update hot paths.
+#
+#   python3 bench/bench_double64.py [--json FILE] [--compare OLD.json [--threshold 1.2]]
+#   xvfb-run python3 bench/bench_double64.py      # Include the Gtk benchmarks
+#
+# The original string based ieee754_breakdown() and update_frame_label() are
+# reproduced here against stub buttons, as a baseline for the integer model.
+# Benchmarks needing Gtk or NumPy are skipped if they are not available, so
+# this runs on a plain Linux box without a display.
+#
+# Results, in seconds per call, are written as JSON. --compare prints the
+# ratio to a previous results file, and exits with status 1 if any is above
+# --threshold, to catch regressions between releases, e.g. in CI.
+#
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from double64 import Double64, bits_to_float, float_to_bits
+
+PI = 0x400921FB54442D18
+SAMPLE = [0x3FF0000000000000, PI, 0x0000000000000001, 0x7FEFFFFFFFFFFFFF,
+        0xFFF0000000000000, 0x7FF8000000000000, 0x8000000000000000, 0xC3E0000000000000]
+
+
+class StubButton:
+    """Stands in for a Gtk.Button or Gtk.Frame. Only the label is kept"""
+    __slots__ = ("label",)
+
+    def __init__(self, label="0"):
+        self.label = label
+
+    def get_label(self):
+        return self.label
+
+    def set_label(self, label):
+        self.label = label
+
+
+def stub_bit_list(bits):
+    """A main_button_bit_list[0] of stub buttons holding bits"""
+    return [StubButton(str((bits >> i) & 1)) for i in range(64)]
+
+
+def legacy_breakdown(button_bit_list):
+    """The string based decode of the original ieee754_breakdown()"""
+    bias = 1023
+    sign = int(button_bit_list[63].get_label())
+    s = ""
+    for i in range(52, 63):
+        s += button_bit_list[i].get_label()
+    s = s[::-1]
+    exponent = int(s,2) - bias
+    s = ""
+    for i in range(0, 52):
+        s += button_bit_list[i].get_label()
+    s = s[::-1]
+    fraction = 0
+    for idx, value in enumerate(s):
+        fraction += int(value) * 2**-(idx + 1)
+    if exponent == -1023 and fraction == 0:
+        return "-0.0" if sign else "+0.0"
+    if exponent == 1024:
+        return "NaN" if fraction else "∞"
+    try:
+        return str((-1)**sign * (1 + fraction) * (2**exponent))
+    except OverflowError:
+        return "Overflow Error"
+
+
+def legacy_update_frame_label(button_bit_list, nibble_list, frame):
+    """The string based nibble and frame label update of the original update_frame_label()"""
+    s1 = ""
+    for i in range(16):
+        s = ""
+        for j in range(4):
+            s += str(button_bit_list[i*4 + j].get_label())
+        s = s[::-1]
+        nibble_list[i].set_label(str(hex(int(s,2)))[2:].upper())
+        s1 += str(nibble_list[i].get_label())
+    s1 = s1[::-1]
+    frame.set_label(s1[:8] + " " + s1[8:])
+
+
+def bench_legacy():
+    bit_lists = [stub_bit_list(bits) for bits in SAMPLE]
+    nibble_list = [StubButton() for i in range(16)]
+    frame = StubButton()
+
+    def breakdown():
+        for bit_list in bit_lists:
+            legacy_breakdown(bit_list)
+
+    def update_frame_label():
+        for bit_list in bit_lists:
+            legacy_update_frame_label(bit_list, nibble_list, frame)
+
+    return {
+        "legacy_breakdown": (breakdown, len(SAMPLE)),
+        "legacy_update_frame_label": (update_frame_label, len(SAMPLE)),
+        }
+
+
+def bench_model():
+    models = [Double64(bits) for bits in SAMPLE]
+    values = [bits_to_float(bits) for bits in SAMPLE]
+
+    def decode():
+        for model in models:
+            model.value
+
+    def breakdown():
+        for model in models:
+            model.describe()
+
+    def encode():
+        for value in values:
+            float_to_bits(value)
+
+    def toggle():
+        for model in models:
+            model.toggle_bit(51)
+
+    return {
+        "model_decode": (decode, len(SAMPLE)),
+        "model_describe": (breakdown, len(SAMPLE)),
+        "model_encode": (encode, len(SAMPLE)),
+        "model_toggle_bit": (toggle, len(SAMPLE)),
+        }
+
+
+def bench_numpy():
+    import numpy as np
+    from double64_batch import decode_array
+
+    count = 1000000
+    bits = np.random.default_rng(754).integers(0, 2**64, size=count, dtype=np.uint64)
+    return {
+        "numpy_decode_array": (lambda: decode_array(bits), count),
+        }
+
+
+def bench_gtk():
+    import gi
+    gi.require_version("Gtk", "3.0")
+    from gi.repository import Gtk
+    if not Gtk.init_check(sys.argv)[0]:
+        raise RuntimeError("No display. Run under xvfb-run")
+    import double_precision
+    # Build every widget in the constructor, not from idle.
+    double_precision.FAST_START = False
+
+    def flush():
+        while Gtk.events_pending():
+            Gtk.main_iteration()
+
+    def startup():
+        win = double_precision.Main_Window()
+        win.show_all()
+        flush()
+        win.destroy()
+        flush()
+
+    win = double_precision.Main_Window()
+    win.show_all()
+    flush()
+    button_pi = Gtk.Button(label="π")
+    button_zero = Gtk.Button(label="+0")
+
+    def preset():
+        win.cb_button_extreme(button_pi)
+        win.cb_button_extreme(button_zero)
+
+    def toggle():
+        win.cb_button_bit(win.main_button_bit_list[0][0], 0, 0)
+
+    return {
+        "gtk_startup": (startup, 1),
+        "gtk_preset_cb_button_extreme": (preset, 2),
+        "gtk_toggle_cb_button_bit": (toggle, 1),
+        }
+
+
+def run(benchmarks, repeat):
+    """Time each benchmark. Return name: seconds per call, the best of repeat"""
+    results = {}
+    for name, (function, calls) in benchmarks.items():
+        timer = timeit.Timer(function)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number))
+        results[name] = best / number / calls
+        print("{:32} {:12.3f} µs".format(name, results[name] * 1e6))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the double precision hot paths")
+    parser.add_argument("--json", default="bench_output.json", metavar="FILE",
+            help="Write results to FILE. Default bench_output.json")
+    parser.add_argument("--compare", metavar="OLD",
+            help="Print the ratio of each result to those in OLD")
+    parser.add_argument("--threshold", type=float, default=1.2,
+            help="With --compare, exit 1 if a ratio is above this. Default 1.2")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = {}
+    skipped = {}
+    for group in (bench_legacy, bench_model, bench_numpy, bench_gtk):
+        try:
+            benchmarks = group()
+        except (ImportError, ValueError, RuntimeError) as err:
+            skipped[group.__name__] = str(err)
+            print("{:32} skipped: {}".format(group.__name__, err))
+            continue
+        results.update(run(benchmarks, args.repeat))
+
+    output = {
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "unit": "seconds per call",
+        "results": results,
+        "skipped": skipped,
+        }
+    with open(args.json, "w") as fout:
+        json.dump(output, fout, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fin:
+            old = json.load(fin)["results"]
+        print("\nRatio to", args.compare)
+        regressions = 0
+        for name, seconds in results.items():
+            if name in old:
+                ratio = seconds / old[name]
+                slower = ratio > args.threshold
+                regressions += slower
+                print("{:32} {:8.2f}{}".format(name, ratio, "  REGRESSION" if slower else ""))
+        if regressions:
+            print("{} results slower than {} × {}".format(regressions, args.threshold,
+                    args.compare))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
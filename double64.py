@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+#
+# double64.py
+#
+# Double Precision bit model.
+#
+# Holds the 64 bits of an IEEE 754 double precision value as a single integer.
+# Does not use Gtk, so it may be imported by batch scripts on machines where
+# Gtk is not installed. double_precision.py uses it as the model behind the
+# 64 bit display.
+#
+# Bit numbering is the same as the display. Bit 0 is the least significant bit
+# of the fraction, bit 63 is the sign.
+#   Fraction: bits 0 to 51
+#   Exponent: bits 52 to 62
+#   Sign:     bit 63
+#
+import math
+import struct
+from array import array
+
+BIAS = 1023
+
+FRACTION_BITS = 52
+EXPONENT_BITS = 11
+SIGN_BIT = 63
+
+FRACTION_MASK = (1 << FRACTION_BITS) - 1             # 000F FFFF FFFF FFFF
+EXPONENT_MASK = (1 << EXPONENT_BITS) - 1             # 7FF
+BITS_MASK = (1 << 64) - 1                            # FFFF FFFF FFFF FFFF
+SIGN_MASK = 1 << SIGN_BIT                            # 8000 0000 0000 0000
+EXPONENT_FIELD_MASK = EXPONENT_MASK << FRACTION_BITS # 7FF0 0000 0000 0000
+
+# Classes of value given by classify()
+ZERO = "zero"
+SUBNORMAL = "subnormal"
+NORMAL = "normal"
+INFINITE = "inf"
+NAN = "nan"
+
+# Reinterpret 64 bits as a double and back. Same as a C union of uint64/double.
+_PACK_BITS = struct.Struct("<Q")
+_PACK_DOUBLE = struct.Struct("<d")
+
+
+def bits_to_float(bits):
+    """Return the Python float with the 64 bit pattern bits"""
+    return _PACK_DOUBLE.unpack(_PACK_BITS.pack(bits & BITS_MASK))[0]
+
+
+def float_to_bits(value):
+    """Return the 64 bit pattern of the Python float value"""
+    return _PACK_BITS.unpack(_PACK_DOUBLE.pack(value))[0]
+
+
+def encode(text):
+    """
+    Return the 64 bit pattern of the double nearest to the number in text.
+    Halfway cases round to even, as IEEE 754 round to nearest.
+    text may be decimal, e.g. "3.14159" or "-1e-310", an integer of any length,
+    a hex float, e.g. "0x1.921fb54442d18p+1", "inf" or "nan".
+    Spaces and line breaks in pasted constants are ignored.
+    Raise ValueError if text is not a number.
+
+    The decimal conversion is float(), which is correctly rounded and reads
+    long digit strings in about linear time. An integer is not converted with
+    int(), which is quadratic and limited to 4300 digits.
+    """
+    text = "".join(text.split())
+    if text.lstrip("+-")[:2].lower() == "0x":
+        try:
+            return float_to_bits(float.fromhex(text))
+        except OverflowError:
+            # Beyond Max. Round to nearest gives infinity
+            return float_to_bits(-math.inf if text.startswith("-") else math.inf)
+    return float_to_bits(float(text))
+
+
+def classify(bits):
+    """
+    Return the class of the 64 bit pattern. ZERO, SUBNORMAL, NORMAL, INFINITE or NAN.
+    Exponent field 000 is zero (fraction 0) or subnormal (fraction not 0).
+    Exponent field 7FF is infinity (fraction 0) or NaN (fraction not 0).
+    """
+    exponent = (bits >> FRACTION_BITS) & EXPONENT_MASK
+    fraction = bits & FRACTION_MASK
+    if exponent == 0:
+        return SUBNORMAL if fraction else ZERO
+    if exponent == EXPONENT_MASK:
+        return NAN if fraction else INFINITE
+    return NORMAL
+
+
+def unbiased_exponent(bits):
+    """
+    Return the power of two the significand is multiplied by.
+    Normal: exponent field - 1023. Zero and subnormal: -1022, as they are
+    0.fraction × 2**-1022. Infinity and NaN: 1024.
+    """
+    exponent = (bits >> FRACTION_BITS) & EXPONENT_MASK
+    if exponent == 0:
+        return 1 - BIAS
+    return exponent - BIAS
+
+
+def describe(bits):
+    """
+    Return the text for the value of the 64 bit pattern, as shown after
+    "Floating Point:" in the main frame label. E.g. "+∞" or "5e-324 ~ Subnormal"
+    """
+    bits &= BITS_MASK
+    sign = "-" if bits >> SIGN_BIT else "+"
+    magnitude = bits & ~(1 << SIGN_BIT)
+    kind = classify(bits)
+
+    if kind == ZERO:
+        return sign + "0.0"
+    if kind == INFINITE:
+        return sign + "∞"
+    if kind == NAN:
+        # NaN is anything in the fraction if the exponent is 7FF.
+        return sign + "NaN"
+
+    text = str(bits_to_float(bits))
+    if kind == SUBNORMAL:
+        # 0 00000000000 0000000000000000000000000000000000000000000000000001
+        # 2**-1074 ≈ 4.9406564584124654 × 10**-324 (Min. subnormal positive double)
+        if magnitude == 0x0000000000000001:
+            return text + " ~ Min subnormal " + sign + "ve"
+        return text + " ~ Subnormal"
+
+    # 0 11111111110 1111111111111111111111111111111111111111111111111111 Max +ve
+    if magnitude == 0x7FEFFFFFFFFFFFFF:
+        return text + " ~ Max " + sign + "ve"
+    # 0 00000000001 0000000000000000000000000000000000000000000000000000 Min +ve
+    if magnitude == 0x0010000000000000:
+        return text + " ~ Min " + sign + "ve"
+    return text
+
+
+def _ordered(bits):
+    """
+    Return bits as an integer in the order of the values. +0 and -0 are both 0,
+    the min subnormal is 1, -min subnormal -1, +∞ 7FF0000000000000 and so on.
+    Consecutive doubles are consecutive integers, so steps are additions.
+    """
+    if bits >> SIGN_BIT:
+        return -(bits & ~SIGN_MASK)
+    return bits
+
+
+def step_ulps(bits, count):
+    """
+    Return the 64 bit pattern count doubles above bits, or below if count is
+    negative. Steps stop at ±∞. A NaN is returned unchanged. Stepping onto zero
+    gives +0. E.g. step_ulps(bits, 1) is nextafter(value, +∞).
+    """
+    bits &= BITS_MASK
+    if bits & ~SIGN_MASK > EXPONENT_FIELD_MASK:
+        return bits
+    ordered = min(max(_ordered(bits) + count, -EXPONENT_FIELD_MASK), EXPONENT_FIELD_MASK)
+    if ordered < 0:
+        return SIGN_MASK | -ordered
+    return ordered
+
+
+def next_up(bits):
+    """Return the next double above bits. +∞ stays +∞"""
+    return step_ulps(bits, 1)
+
+
+def next_down(bits):
+    """Return the next double below bits. -∞ stays -∞"""
+    return step_ulps(bits, -1)
+
+
+# ulp_distance() of a NaN and a number
+NAN_DISTANCE = BITS_MASK
+
+
+def ulp_distance(a, b):
+    """
+    Return the number of doubles from a to b, 0 if they are equal. +0 and -0
+    are 0 apart. Two NaNs are 0 apart, a NaN and a number NAN_DISTANCE.
+    """
+    a_nan = a & ~SIGN_MASK > EXPONENT_FIELD_MASK
+    b_nan = b & ~SIGN_MASK > EXPONENT_FIELD_MASK
+    if a_nan or b_nan:
+        return 0 if a_nan and b_nan else NAN_DISTANCE
+    return abs(_ordered(a & BITS_MASK) - _ordered(b & BITS_MASK))
+
+
+class Double64:
+    """
+    A 64 bit IEEE 754 double precision pattern stored as one integer.
+    All reads and writes of fields are bit operations on self.bits.
+    """
+    __slots__ = ("bits",)
+
+    def __init__(self, bits=0):
+        self.bits = bits & BITS_MASK
+
+    @classmethod
+    def from_float(cls, value):
+        """Create from a Python float. E.g. Double64.from_float(1.0)"""
+        return cls(float_to_bits(value))
+
+    def __repr__(self):
+        return "Double64(0x{})".format(self.hex())
+
+    def __eq__(self, other):
+        if isinstance(other, Double64):
+            return self.bits == other.bits
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    # Individual bits. i is 0 to 63
+    def bit(self, i):
+        """Return bit i as 0 or 1"""
+        return (self.bits >> i) & 1
+
+    def set_bit(self, i, value):
+        """Set bit i to 0 or 1"""
+        if value:
+            self.bits |= 1 << i
+        else:
+            self.bits &= ~(1 << i) & BITS_MASK
+
+    def toggle_bit(self, i):
+        """Toggle bit i. Return the new value of the bit"""
+        self.bits ^= 1 << i
+        return (self.bits >> i) & 1
+
+    def nibble(self, i):
+        """Return nibble i (0 to 15) as an integer 0 to 15"""
+        return (self.bits >> (i * 4)) & 0xF
+
+    def hex(self):
+        """Return the 16 hex digits, most significant first. E.g. 3FF0000000000000"""
+        return "{:016X}".format(self.bits)
+
+    # Fields
+    @property
+    def sign(self):
+        return self.bits >> SIGN_BIT
+
+    @sign.setter
+    def sign(self, value):
+        self.set_bit(SIGN_BIT, value)
+
+    @property
+    def exponent(self):
+        """Biased exponent field. 0 to 7FF"""
+        return (self.bits >> FRACTION_BITS) & EXPONENT_MASK
+
+    @exponent.setter
+    def exponent(self, value):
+        self.bits = ((self.bits & ~(EXPONENT_MASK << FRACTION_BITS) & BITS_MASK)
+                | ((value & EXPONENT_MASK) << FRACTION_BITS))
+
+    @property
+    def fraction(self):
+        """Fraction field. The 52 bits after the binary point"""
+        return self.bits & FRACTION_MASK
+
+    @fraction.setter
+    def fraction(self, value):
+        self.bits = (self.bits & ~FRACTION_MASK & BITS_MASK) | (value & FRACTION_MASK)
+
+    # Value
+    @property
+    def value(self):
+        """
+        The double precision value of the 64 bits as a Python float.
+        The bits are reinterpreted, not calculated, so the result is exact
+        for every pattern including subnormals, infinities and NaNs.
+        """
+        return bits_to_float(self.bits)
+
+    @value.setter
+    def value(self, value):
+        self.bits = float_to_bits(value)
+
+    def classify(self):
+        """Return ZERO, SUBNORMAL, NORMAL, INFINITE or NAN"""
+        return classify(self.bits)
+
+    def unbiased_exponent(self):
+        """Return the power of two. -1022 for zero and subnormals"""
+        return unbiased_exponent(self.bits)
+
+    def describe(self):
+        """Return the text for the value. E.g. "+0.0" or "1.0" """
+        return describe(self.bits)
+
+    def step_ulps(self, count):
+        """Move count doubles up, or down if count is negative. See step_ulps()"""
+        self.bits = step_ulps(self.bits, count)
+
+
+class Register(Double64):
+    """
+    A Double64 whose bits are held in a RegisterFile, not in the object.
+    Writes that change the bits mark the register dirty.
+    """
+    __slots__ = ("registers", "index")
+
+    def __init__(self, registers, index):
+        self.registers = registers
+        self.index = index
+
+    def __repr__(self):
+        return "Register(F{}, 0x{})".format(self.index, self.hex())
+
+    @property
+    def bits(self):
+        return self.registers.values[self.index]
+
+    @bits.setter
+    def bits(self, value):
+        self.registers[self.index] = value
+
+
+class RegisterFile:
+    """
+    count 64 bit registers held in one array('Q'). E.g. the 32 Alpha floating
+    point registers F0 to F31. Indices of registers that have changed are kept
+    in self.dirty until take_dirty() is called, so a display need only redraw those.
+    Registers wider than 64 bits, e.g. x87 80 bit, are held in a list of ints.
+    """
+    __slots__ = ("values", "dirty", "mask")
+
+    def __init__(self, count=32, width=64):
+        if width <= 64:
+            self.values = array("Q", bytes(8 * count))
+        else:
+            self.values = [0] * count
+        self.mask = (1 << width) - 1
+        # Everything needs drawing the first time.
+        self.dirty = set(range(count))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __setitem__(self, index, bits):
+        bits &= self.mask
+        if self.values[index] != bits:
+            self.values[index] = bits
+            self.dirty.add(index)
+
+    def register(self, index):
+        """Return a Register, a Double64 view, of register index"""
+        return Register(self, index)
+
+    def take_dirty(self, count=None):
+        """
+        Return the sorted indices of changed registers and clear them.
+        If count is given only indices below count are taken. Others stay dirty.
+        """
+        if count is None or count >= len(self.values):
+            dirty = sorted(self.dirty)
+            self.dirty.clear()
+        else:
+            dirty = sorted(index for index in self.dirty if index < count)
+            self.dirty.difference_update(dirty)
+        return dirty
+
+
+class History:
+    """
+    Undo and redo of the writes to a RegisterFile. Each step is the XOR of
+    the old and new bits of one register, so a step is undone or redone by
+    the same XOR. Deltas are kept in an array('Q'), words uint64 per step for
+    registers wider than 64 bits, with the register index in an array('B').
+    Once capacity steps are held the oldest are overwritten, as a ring buffer.
+    """
+    __slots__ = ("words", "capacity", "deltas", "indices", "start", "count", "position")
+
+    def __init__(self, width=64, capacity=1 << 20):
+        self.words = (width + 63) // 64
+        self.capacity = capacity
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.deltas = array("Q")
+        self.indices = array("B")
+        # Slot of the oldest step, steps held, and steps done. Steps from
+        # position to count are undone steps that may be redone.
+        self.start = self.count = self.position = 0
+
+    def _slot(self, step):
+        return (self.start + step) % self.capacity
+
+    def _delta(self, slot):
+        if self.words == 1:
+            return self.deltas[slot]
+        first = slot * self.words
+        return sum(self.deltas[first + i] << (64 * i) for i in range(self.words))
+
+    def record(self, index, old, new):
+        """Record the write of new over old in register index. Redo steps are dropped"""
+        delta = old ^ new
+        if not delta:
+            return
+        self.count = self.position
+        if self.count == self.capacity:
+            # Full. The oldest step is overwritten
+            self.start = self._slot(1)
+            self.count -= 1
+            self.position -= 1
+        slot = self._slot(self.count)
+        words = [(delta >> (64 * i)) & BITS_MASK for i in range(self.words)]
+        if slot == len(self.indices):
+            self.deltas.extend(words)
+            self.indices.append(index)
+        else:
+            self.deltas[slot * self.words:(slot + 1) * self.words] = array("Q", words)
+            self.indices[slot] = index
+        self.count += 1
+        self.position += 1
+
+    def undo(self, registers):
+        """Undo the last step done in registers. Return its register index, or None"""
+        if not self.position:
+            return None
+        self.position -= 1
+        slot = self._slot(self.position)
+        index = self.indices[slot]
+        registers[index] = registers[index] ^ self._delta(slot)
+        return index
+
+    def redo(self, registers):
+        """Redo the next step undone in registers. Return its register index, or None"""
+        if self.position == self.count:
+            return None
+        slot = self._slot(self.position)
+        self.position += 1
+        index = self.indices[slot]
+        registers[index] = registers[index] ^ self._delta(slot)
+        return index
+
+    def seek(self, registers, position):
+        """Undo or redo steps until position steps are done. One XOR per step"""
+        position = min(max(position, 0), self.count)
+        while self.position > position:
+            self.undo(registers)
+        while self.position < position:
+            self.redo(registers)
+
+    def steps(self):
+        """Return (deltas, indices) of the steps held, oldest first. For saving"""
+        first = self.start * self.words
+        if self.start + self.count <= len(self.indices):
+            return (self.deltas[first:first + self.count * self.words],
+                    self.indices[self.start:self.start + self.count])
+        # Wrapped. The newest steps are at the front of the ring. Slots beyond
+        # count hold dropped redo steps.
+        end = self.start + self.count - self.capacity
+        return (self.deltas[first:] + self.deltas[:end * self.words],
+                self.indices[self.start:] + self.indices[:end])
+
+    def restore(self, deltas, indices, position):
+        """Replace the steps by deltas and indices, oldest first, position of them done"""
+        self.clear()
+        keep = min(len(indices), self.capacity)
+        # Only the newest capacity steps fit
+        drop = len(indices) - keep
+        self.deltas = array("Q", deltas[drop * self.words:])
+        self.indices = array("B", indices[drop:])
+        self.count = keep
+        self.position = min(max(position - drop, 0), keep)
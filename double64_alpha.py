@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+#
+# double64_alpha.py
+#
+# Emulation of the Alpha floating point convert instructions of the
+# double-precision simh script, so conversions can be checked without simh.
+# Does not import Gtk. Requires NumPy.
+#
+#   python3 double64_alpha.py double-precision      # Run the script, as simh
+#   python3 double64_alpha.py double-precision | python3 double64_simh.py
+#
+# Instructions, opcode 16, with their rounding and trap qualifiers:
+#   CVTQT  quadword integer to T_floating. /C /M /D /SUI
+#   CVTTQ  T_floating to quadword integer. /C /M /D /V /SV /SVI
+# The 11 bit function field is
+#   bits 10-8   trap qualifiers. /S software completion, /I inexact, /U or /V
+#   bits 7-6    rounding. 00 /C chopped, 01 /M minus ∞, 10 normal, 11 /D the FPCR
+#   bits 5-0    3E CVTQT, 2F CVTTQ
+# LDQ_U R31 is the universal NOP.
+#
+# cvtqt_array() and cvttq_array() convert whole NumPy arrays, with the flags
+# each element raises. cvtqt() and cvttq() do one value with integer arithmetic.
+# The two are checked against each other with --check.
+#
+import argparse
+import collections
+import re
+import sys
+
+import numpy as np
+
+from double64 import SIGN_BIT, BITS_MASK
+from double64_arith import (decompose, round_exact, is_nan, is_infinite, ROUND_NEAREST_EVEN,
+        ROUND_TOWARD_ZERO, ROUND_UP, ROUND_DOWN, INEXACT)
+from double64_batch import as_bits
+
+OPCODE_FLOAT_IEEE = 0x16
+OPCODE_LDQ_U = 0x0B
+FUNCTION_CVTQT = 0x3E
+FUNCTION_CVTTQ = 0x2F
+
+# Rounding field of the function, bits 7-6. None is /D, the FPCR dynamic mode
+ROUNDING = {0: ROUND_TOWARD_ZERO, 1: ROUND_DOWN, 2: ROUND_NEAREST_EVEN, 3: None}
+
+# Trap qualifier bits of the function
+TRAP_SOFTWARE = 0x400       # /S
+TRAP_INEXACT = 0x200        # /I
+TRAP_UNDERFLOW = 0x100      # /U, or /V integer overflow for CVTTQ
+TRAP_INTEGER_OVERFLOW = TRAP_UNDERFLOW
+
+# Exception flags, as the FPCR. Bits of the flags arrays
+FLAG_INVALID = 1            # INV. CVTTQ of a NaN or ∞
+FLAG_INEXACT = 2            # INE
+FLAG_INTEGER_OVERFLOW = 4   # IOV. CVTTQ beyond 64 bits
+FLAG_NAMES = {FLAG_INVALID: "INV", FLAG_INEXACT: "INE", FLAG_INTEGER_OVERFLOW: "IOV"}
+
+# name      e.g. "CVTQT/C"
+# function  FUNCTION_CVTQT or FUNCTION_CVTTQ. None for the NOP
+# mode      double64_arith rounding mode. None for /D
+# traps     the flags that trap
+Instruction = collections.namedtuple("Instruction", ["name", "function", "mode", "traps",
+        "ra", "rb", "rc"])
+
+# result    bits written to Fc
+# flags     FLAG_ bits raised
+# trap      the flags raised that the instruction traps on
+Execution = collections.namedtuple("Execution", ["result", "flags", "trap"])
+
+TWO_63 = 2.0 ** 63
+
+# F0 to F31 in simh commands
+REGISTER_NAME = re.compile(r"^f([12]?\d|3[01])$")
+
+
+def decode(word):
+    """Return the Instruction of the 32 bit instruction word. Raise ValueError if not emulated"""
+    opcode = word >> 26
+    ra, rb, rc = (word >> 21) & 31, (word >> 16) & 31, word & 31
+    if opcode == OPCODE_LDQ_U and ra == 31:
+        return Instruction("NOP", None, None, 0, ra, rb, rc)
+    function = (word >> 5) & 0x7FF
+    if opcode != OPCODE_FLOAT_IEEE or function & 0x3F not in (FUNCTION_CVTQT, FUNCTION_CVTTQ):
+        raise ValueError("Instruction {:08X} is not emulated".format(word))
+    name = "CVTQT" if function & 0x3F == FUNCTION_CVTQT else "CVTTQ"
+    # Invalid operation always traps
+    traps = FLAG_INVALID
+    qualifier = ""
+    if function & TRAP_SOFTWARE:
+        qualifier += "S"
+    if function & TRAP_UNDERFLOW:
+        # CVTQT cannot underflow. For CVTTQ this is /V
+        qualifier += "U" if name == "CVTQT" else "V"
+        traps |= FLAG_INTEGER_OVERFLOW if name == "CVTTQ" else 0
+    if function & TRAP_INEXACT:
+        qualifier += "I"
+        traps |= FLAG_INEXACT
+    qualifier += {0: "C", 1: "M", 2: "", 3: "D"}[(function >> 6) & 3]
+    if qualifier:
+        name += "/" + qualifier
+    return Instruction(name, function & 0x3F, ROUNDING[(function >> 6) & 3], traps, ra, rb, rc)
+
+
+def cvtqt(quadword, mode=ROUND_NEAREST_EVEN):
+    """Return (bits, flags) of the signed 64 bit integer quadword converted to a double"""
+    quadword &= BITS_MASK
+    sign = quadword >> SIGN_BIT
+    magnitude = (1 << 64) - quadword if sign else quadword
+    if magnitude == 0:
+        return 0, 0
+    bits, flags = round_exact(sign, magnitude, 0, False, mode)[:2]
+    return bits, FLAG_INEXACT if INEXACT in flags else 0
+
+
+def cvttq(bits, mode=ROUND_NEAREST_EVEN):
+    """
+    Return (quadword, flags) of the double bits converted to a signed 64 bit
+    integer. A NaN or ∞ gives 0 and FLAG_INVALID. Beyond 64 bits the result is
+    the low 64 bits of the integer, with FLAG_INTEGER_OVERFLOW and FLAG_INEXACT.
+    """
+    bits &= BITS_MASK
+    if is_nan(bits) or is_infinite(bits):
+        return 0, FLAG_INVALID
+    sign, significand, exponent = decompose(bits)
+    if exponent >= 0:
+        integer, remainder, half = significand << exponent, 0, 0
+    else:
+        integer = significand >> -exponent
+        remainder = significand & ((1 << -exponent) - 1)
+        half = 1 << (-exponent - 1)
+    flags = FLAG_INEXACT if remainder else 0
+    if remainder:
+        if mode == ROUND_NEAREST_EVEN:
+            integer += remainder > half or (remainder == half and integer & 1)
+        elif mode == ROUND_UP:
+            integer += not sign
+        elif mode == ROUND_DOWN:
+            integer += sign
+    if sign:
+        integer = -integer
+    if not -(1 << 63) <= integer < (1 << 63):
+        flags |= FLAG_INTEGER_OVERFLOW | FLAG_INEXACT
+    return integer & BITS_MASK, flags
+
+
+def _step(result, error, mode):
+    """Move the nearest even result one place where mode rounds the other way"""
+    if mode == ROUND_UP:
+        return np.where(error > 0, np.nextafter(result, np.inf), result)
+    if mode == ROUND_DOWN:
+        return np.where(error < 0, np.nextafter(result, -np.inf), result)
+    if mode == ROUND_TOWARD_ZERO:
+        return np.where(np.sign(error) == -np.sign(result), np.nextafter(result, 0.0), result)
+    return result
+
+
+def cvtqt_array(quadwords, mode=ROUND_NEAREST_EVEN):
+    """
+    Return (bits, flags) arrays of an int64 or uint64 array of quadword integers
+    converted to doubles. The hardware conversion rounds to nearest even. For
+    the other modes it is moved one place by the sign of the exact error.
+    """
+    integers = as_bits(np.asarray(quadwords)).view(np.int64)
+    result = integers.astype(np.float64)
+    # 2**63 does not convert back. Every quadword is below it.
+    inside = result < TWO_63
+    back = np.where(inside, result, 0.0).astype(np.int64)
+    error = np.where(inside, np.sign(integers - back), -1)
+    flags = np.where(error != 0, FLAG_INEXACT, 0).astype(np.uint8)
+    with np.errstate(all="ignore"):
+        result = _step(result, error, mode)
+    return result.view(np.uint64), flags
+
+
+def cvttq_array(data, mode=ROUND_NEAREST_EVEN):
+    """
+    Return (quadwords, flags) arrays of doubles converted to signed 64 bit
+    integers, as uint64. The same results and flags as cvttq().
+    """
+    bits = as_bits(np.asarray(data))
+    value = bits.view(np.float64)
+    rounding = {ROUND_NEAREST_EVEN: np.rint, ROUND_TOWARD_ZERO: np.trunc, ROUND_DOWN: np.floor,
+            ROUND_UP: np.ceil}[mode]
+    with np.errstate(all="ignore"):
+        integer = rounding(value)
+        finite = np.isfinite(value)
+        overflow = finite & ((integer >= TWO_63) | (integer < -TWO_63))
+        inside = finite & ~overflow
+        quadwords = np.where(inside, integer, 0.0).astype(np.int64).view(np.uint64)
+
+        # Beyond 2**63 the value is an integer, significand × 2**exponent with
+        # exponent 11 or more. The low 64 bits of it, two's complement if negative.
+        field = ((bits >> np.uint64(52)) & np.uint64(0x7FF)).astype(np.int64)
+        significand = (bits & np.uint64((1 << 52) - 1)) | np.uint64(1 << 52)
+        shift = np.clip(field - 1075, 0, 63).astype(np.uint64)
+        low = np.where(field - 1075 < 64, significand << shift, np.uint64(0))
+        low = np.where(value < 0, ~low + np.uint64(1), low)
+        quadwords = np.where(overflow, low, quadwords)
+
+    flags = np.zeros(bits.shape, dtype=np.uint8)
+    flags[~finite] = FLAG_INVALID
+    flags[inside & (integer != value)] |= FLAG_INEXACT
+    flags[overflow] |= FLAG_INTEGER_OVERFLOW | FLAG_INEXACT
+    return quadwords, flags
+
+
+def execute(instruction, operands, dynamic=ROUND_NEAREST_EVEN):
+    """
+    Execute a convert instruction on an array of Fb values. Return the Execution.
+    dynamic is the FPCR rounding mode used by /D.
+    """
+    mode = instruction.mode or dynamic
+    if instruction.function == FUNCTION_CVTQT:
+        result, flags = cvtqt_array(operands, mode)
+    else:
+        result, flags = cvttq_array(operands, mode)
+    return Execution(result, flags, flags & np.uint8(instruction.traps))
+
+
+class Machine:
+    """
+    The memory and floating point registers used by the double-precision
+    script, and the simh commands in it: d(eposit), e(xamine), go, echo, exit.
+    """
+    def __init__(self, output=sys.stdout, dynamic=ROUND_NEAREST_EVEN):
+        self.memory = {}                    # Longword address: 32 bit word
+        self.registers = [0] * 32           # F0 to F31. F31 reads as 0
+        self.dynamic = dynamic
+        self.output = output
+
+    def write(self, text=""):
+        self.output.write(text + "\n")
+
+    def deposit(self, target, value):
+        if REGISTER_NAME.match(target):
+            self.registers[int(target[1:])] = value & BITS_MASK
+        else:
+            # A quadword is two longwords, low first
+            address = int(target, 16)
+            self.memory[address] = value & 0xFFFFFFFF
+            self.memory[address + 4] = (value >> 32) & 0xFFFFFFFF
+
+    def examine(self, first, last):
+        for index in range(int(first[1:]), int(last[1:]) + 1):
+            self.write("F{}:\t{:016X}".format(index, self.registers[index]))
+
+    def go(self, start, until):
+        pc = start
+        while pc != until:
+            instruction = decode(self.memory.get(pc, 0))
+            if instruction.function is not None:
+                operand = self.registers[instruction.rb] if instruction.rb != 31 else 0
+                execution = execute(instruction, np.array([operand], dtype=np.uint64),
+                        self.dynamic)
+                if execution.trap[0]:
+                    self.write("Arithmetic trap, PC: {:X} {}".format(pc, " ".join(name
+                            for flag, name in FLAG_NAMES.items() if execution.trap[0] & flag)))
+                if instruction.rc != 31:
+                    self.registers[instruction.rc] = int(execution.result[0])
+            pc += 4
+        quadword = self.memory.get(pc, 0) | (self.memory.get(pc + 4, 0) << 32)
+        self.write()
+        self.write("Breakpoint, PC: {:X} ({:016X})".format(pc, quadword))
+
+    def run(self, lines):
+        """Run the simh commands in lines. Stop at exit"""
+        for line in lines:
+            line = line.split(";", 1)[0].strip()
+            if not line:
+                continue
+            command, _, rest = line.partition(" ")
+            command = command.lower()
+            words = rest.split()
+            if command == "echo":
+                self.write(rest)
+            elif command == "d":
+                self.deposit(words[0].lower(), int(words[1], 16))
+            elif command == "e":
+                first, _, last = words[0].lower().partition(":")
+                self.examine(first, last or first)
+            elif command == "go":
+                self.go(int(words[0], 16), int(words[2], 16))
+            elif command == "exit":
+                self.write("Goodbye")
+                return
+            else:
+                raise ValueError("simh command {!r} is not emulated".format(line))
+
+
+def check(count, seed=0):
+    """
+    Compare the array and integer conversions of count random quadwords and
+    doubles in every rounding mode. Return the number of mismatches.
+    """
+    random = np.random.default_rng(seed)
+    words = random.integers(0, 1 << 64, count, dtype=np.uint64, endpoint=False)
+    # Doubles near the 64 bit integer range, and small ones with fractions
+    near = (random.integers(0x3FE, 0x440, count, dtype=np.uint64) << np.uint64(52)) \
+            | (words & np.uint64((1 << 52) - 1)) | (words & np.uint64(1 << 63))
+    mismatches = 0
+    for mode in (ROUND_NEAREST_EVEN, ROUND_TOWARD_ZERO, ROUND_DOWN, ROUND_UP):
+        for array_function, function, operands in ((cvtqt_array, cvtqt, words),
+                (cvttq_array, cvttq, words), (cvttq_array, cvttq, near)):
+            results, flags = array_function(operands, mode)
+            for operand, result, flag in zip(operands.tolist(), results.tolist(), flags.tolist()):
+                if function(operand, mode) != (result, flag):
+                    mismatches += 1
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a simh Alpha script of CVTQT/CVTTQ "
+            "conversions, such as double-precision, without simh")
+    parser.add_argument("script", nargs="?", help="simh script. Default, or -, is stdin")
+    parser.add_argument("--dynamic", choices=["nearest", "chopped", "minus", "plus"],
+            default="nearest", help="FPCR rounding mode used by /D")
+    parser.add_argument("--check", type=int, metavar="COUNT",
+            help="Check the vectorized conversions against the integer ones on COUNT values")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        mismatches = check(args.check)
+        print("{} mismatches".format(mismatches))
+        return 1 if mismatches else 0
+
+    dynamic = {"nearest": ROUND_NEAREST_EVEN, "chopped": ROUND_TOWARD_ZERO,
+            "minus": ROUND_DOWN, "plus": ROUND_UP}[args.dynamic]
+    try:
+        if not args.script or args.script == "-":
+            Machine(dynamic=dynamic).run(sys.stdin)
+        else:
+            with open(args.script) as fin:
+                Machine(dynamic=dynamic).run(fin)
+    except (OSError, ValueError) as err:
+        print("double64_alpha:", err, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+#
+# double64_arith.py
+#
+# Exact IEEE 754 double precision arithmetic on 64 bit patterns. Does not
+# import Gtk.
+#
+# Each operation is done on the integer significands, so the exact result is
+# known. It is then rounded once, in one of the four IEEE rounding modes, as
+# the hardware does. operate() returns the result bits with a trace of the
+# rounding: the operands aligned at the result's last place, the guard, round
+# and sticky bits, and the rounding decision.
+#
+#   +  −  ×  ÷   a op b
+#   fma          a × b + c with a single rounding
+#   sqrt         √a
+#
+# NaN operands are propagated quiet, the first NaN of a, b, c. An invalid
+# operation, e.g. ∞ - ∞, gives DEFAULT_NAN, the x86 SSE and Alpha default NaN.
+#
+import collections
+import math
+
+from double64 import (FRACTION_BITS, FRACTION_MASK, EXPONENT_MASK, SIGN_BIT, SIGN_MASK,
+        BITS_MASK, EXPONENT_FIELD_MASK)
+
+# Operations. OPERANDS[op] is the number of operands it takes.
+ADD = "+"
+SUBTRACT = "−"
+MULTIPLY = "×"
+DIVIDE = "÷"
+FMA = "fma"
+SQRT = "sqrt"
+OPERANDS = collections.OrderedDict((
+    (ADD, 2), (SUBTRACT, 2), (MULTIPLY, 2), (DIVIDE, 2), (FMA, 3), (SQRT, 1)))
+
+# IEEE 754 rounding modes
+ROUND_NEAREST_EVEN = "nearest even"
+ROUND_TOWARD_ZERO = "toward zero"
+ROUND_UP = "toward +∞"
+ROUND_DOWN = "toward -∞"
+ROUNDING_MODES = (ROUND_NEAREST_EVEN, ROUND_TOWARD_ZERO, ROUND_UP, ROUND_DOWN)
+
+# Exception flags in Result.flags
+INEXACT = "inexact"
+UNDERFLOW = "underflow"
+OVERFLOW = "overflow"
+DIVIDE_BY_ZERO = "divide by zero"
+INVALID = "invalid"
+
+DEFAULT_NAN = 0xFFF8000000000000
+QUIET_BIT = 1 << (FRACTION_BITS - 1)                # 0008 0000 0000 0000
+INFINITY = EXPONENT_FIELD_MASK                      # 7FF0 0000 0000 0000
+MAX = EXPONENT_FIELD_MASK - 1                       # 7FEF FFFF FFFF FFFF
+# Power of two of the last place of the significand. Subnormals: 2**-1074
+MIN_QUANTUM = -1074
+# Significand bits, including the hidden bit
+PRECISION = FRACTION_BITS + 1
+
+# bits      the rounded result
+# flags     frozenset of INEXACT, UNDERFLOW, ...
+# terms     the exact addends (sign, significand, exponent), value
+#           (-1)**sign × significand × 2**exponent. a, ±b for + −, a × b, c for fma.
+#           Empty for the other operations.
+# exact     (sign, significand, exponent, sticky) of the exact result, before
+#           rounding. sticky is True if there are non zero bits beyond it, from
+#           ÷ or sqrt. None for special cases, e.g. a NaN operand.
+# quantum   power of two of the result's last place
+# kept      the significand truncated at quantum, before rounding
+# guard, round, sticky   the bits after the last place
+# decision  text of the rounding decision, e.g. "Round up. Guard and sticky set"
+Result = collections.namedtuple("Result", ["op", "mode", "bits", "flags", "terms", "exact",
+        "quantum", "kept", "guard", "round", "sticky", "decision"])
+
+
+def decompose(bits):
+    """
+    Return (sign, significand, exponent) of a finite 64 bit pattern. The
+    value is (-1)**sign × significand × 2**exponent, the significand an integer.
+    """
+    field = (bits >> FRACTION_BITS) & EXPONENT_MASK
+    fraction = bits & FRACTION_MASK
+    if field == 0:
+        return bits >> SIGN_BIT, fraction, MIN_QUANTUM
+    return bits >> SIGN_BIT, fraction | (1 << FRACTION_BITS), field + MIN_QUANTUM - 1
+
+
+def is_nan(bits):
+    return bits & ~SIGN_MASK > INFINITY
+
+
+def is_infinite(bits):
+    return bits & ~SIGN_MASK == INFINITY
+
+
+def is_zero(bits):
+    return bits & ~SIGN_MASK == 0
+
+
+def _special(op, mode, bits, flags, decision):
+    """Result of a special case. Nothing was rounded"""
+    return Result(op, mode, bits, frozenset(flags), (), None, None, None, 0, 0, False, decision)
+
+
+def _exact_zero_sign(sign_x, sign_y, mode):
+    """Sign of the exact zero sum of x and y. -0 + -0 is -0, otherwise +0, or -0 rounding down"""
+    if sign_x == sign_y:
+        return sign_x
+    return 1 if mode == ROUND_DOWN else 0
+
+
+def round_exact(sign, significand, exponent, sticky=False, mode=ROUND_NEAREST_EVEN):
+    """
+    Round (-1)**sign × significand × 2**exponent to a double. sticky is True
+    if the exact value has non zero bits below significand.
+    Return (bits, flags, quantum, kept, guard, round, sticky, decision).
+    """
+    # Power of two of the most significant bit, and of the last place kept
+    top = exponent + significand.bit_length() - 1
+    quantum = max(top - FRACTION_BITS, MIN_QUANTUM)
+    shift = quantum - exponent
+    if shift > 0:
+        kept = significand >> shift
+        guard = (significand >> (shift - 1)) & 1
+        round_bit = (significand >> (shift - 2)) & 1 if shift > 1 else 0
+        sticky = sticky or bool(significand & ((1 << max(shift - 2, 0)) - 1))
+    else:
+        kept = significand << -shift
+        guard = round_bit = 0
+    inexact = bool(guard or round_bit or sticky)
+
+    if not inexact:
+        increment = False
+        decision = "Exact"
+    elif mode == ROUND_NEAREST_EVEN:
+        if not guard:
+            increment = False
+            decision = "Round down. Guard clear, below half way"
+        elif round_bit or sticky:
+            increment = True
+            decision = "Round up. Guard and round or sticky set, above half way"
+        else:
+            increment = bool(kept & 1)
+            decision = "Half way, round to even. " + ("Up, last bit was 1" if increment
+                    else "Down, last bit was 0")
+    elif mode == ROUND_TOWARD_ZERO:
+        increment = False
+        decision = "Truncate toward zero"
+    elif mode == ROUND_UP:
+        increment = not sign
+        decision = "Toward +∞. " + ("Magnitude up" if increment else "Truncate")
+    elif mode == ROUND_DOWN:
+        increment = bool(sign)
+        decision = "Toward -∞. " + ("Magnitude up" if increment else "Truncate")
+    else:
+        raise ValueError("Unknown rounding mode {!r}".format(mode))
+
+    # kept × 2**quantum with kept < 2**53. A carry out of the significand
+    # adds one to the exponent field, and subnormals become normal, as wanted.
+    magnitude = ((quantum - MIN_QUANTUM) << FRACTION_BITS) + kept + increment
+    flags = set()
+    if inexact:
+        flags.add(INEXACT)
+        if top < MIN_QUANTUM + FRACTION_BITS:
+            flags.add(UNDERFLOW)
+    if magnitude >= INFINITY:
+        flags.update((OVERFLOW, INEXACT))
+        if mode == ROUND_NEAREST_EVEN or (mode == ROUND_UP and not sign) or \
+                (mode == ROUND_DOWN and sign):
+            magnitude = INFINITY
+            decision = "Overflow to ∞"
+        else:
+            magnitude = MAX
+            decision = "Overflow to Max"
+    bits = (sign << SIGN_BIT) | magnitude
+    return bits, frozenset(flags), quantum, kept, guard, round_bit, sticky, decision
+
+
+def _sum(op, mode, terms):
+    """Exactly add terms (sign, significand, exponent), then round"""
+    exponent = min(term[2] for term in terms)
+    total = 0
+    for sign, significand, term_exponent in terms:
+        aligned = significand << (term_exponent - exponent)
+        total += -aligned if sign else aligned
+    if total == 0:
+        sign = _exact_zero_sign(terms[0][0], terms[1][0], mode)
+        return Result(op, mode, sign << SIGN_BIT, frozenset(), tuple(terms), (sign, 0, exponent,
+                False), None, 0, 0, 0, False, "Exact zero")
+    sign = int(total < 0)
+    return _rounded(op, mode, tuple(terms), sign, abs(total), exponent, False)
+
+
+def _rounded(op, mode, terms, sign, significand, exponent, sticky):
+    bits, flags, quantum, kept, guard, round_bit, sticky_bit, decision = round_exact(
+            sign, significand, exponent, sticky, mode)
+    return Result(op, mode, bits, flags, terms, (sign, significand, exponent, sticky),
+            quantum, kept, guard, round_bit, sticky_bit, decision)
+
+
+def operate(op, a, b=0, c=0, mode=ROUND_NEAREST_EVEN):
+    """
+    Return the Result of a op b, fma(a, b, c) or sqrt(a), rounded in mode.
+    a, b and c are 64 bit patterns. Operands the op does not take are ignored.
+    """
+    if op not in OPERANDS:
+        raise ValueError("Unknown operation {!r}".format(op))
+    if mode not in ROUNDING_MODES:
+        raise ValueError("Unknown rounding mode {!r}".format(mode))
+    operands = (a & BITS_MASK, b & BITS_MASK, c & BITS_MASK)[:OPERANDS[op]]
+    for operand in operands:
+        if is_nan(operand):
+            flags = () if operand & QUIET_BIT else (INVALID,)
+            return _special(op, mode, operand | QUIET_BIT, flags, "NaN operand")
+    if op == SUBTRACT:
+        op_b = operands[1] ^ SIGN_MASK
+    elif len(operands) > 1:
+        op_b = operands[1]
+
+    if op in (ADD, SUBTRACT):
+        a, b = operands[0], op_b
+        if is_infinite(a) or is_infinite(b):
+            if is_infinite(a) and is_infinite(b) and (a ^ b) & SIGN_MASK:
+                return _special(op, mode, DEFAULT_NAN, (INVALID,), "Invalid. ∞ - ∞")
+            return _special(op, mode, a if is_infinite(a) else b, (), "∞")
+        return _sum(op, mode, [decompose(a), decompose(b)])
+
+    if op in (MULTIPLY, FMA):
+        a, b = operands[0], op_b
+        sign = (a ^ b) >> SIGN_BIT
+        if (is_infinite(a) and is_zero(b)) or (is_zero(a) and is_infinite(b)):
+            return _special(op, mode, DEFAULT_NAN, (INVALID,), "Invalid. 0 × ∞")
+        product_infinite = is_infinite(a) or is_infinite(b)
+        if op == MULTIPLY:
+            if product_infinite:
+                return _special(op, mode, (sign << SIGN_BIT) | INFINITY, (), "∞")
+            sign_a, significand_a, exponent_a = decompose(a)
+            sign_b, significand_b, exponent_b = decompose(b)
+            significand = significand_a * significand_b
+            if significand == 0:
+                return _special(op, mode, sign << SIGN_BIT, (), "Exact zero")
+            return _rounded(op, mode, (), sign, significand, exponent_a + exponent_b, False)
+        c = operands[2]
+        if product_infinite:
+            if is_infinite(c) and (c >> SIGN_BIT) != sign:
+                return _special(op, mode, DEFAULT_NAN, (INVALID,), "Invalid. ∞ - ∞")
+            return _special(op, mode, (sign << SIGN_BIT) | INFINITY, (), "∞")
+        if is_infinite(c):
+            return _special(op, mode, c, (), "∞")
+        sign_a, significand_a, exponent_a = decompose(a)
+        sign_b, significand_b, exponent_b = decompose(b)
+        product = (sign, significand_a * significand_b, exponent_a + exponent_b)
+        return _sum(op, mode, [product, decompose(c)])
+
+    if op == DIVIDE:
+        a, b = operands
+        sign = (a ^ b) >> SIGN_BIT
+        if is_infinite(a):
+            if is_infinite(b):
+                return _special(op, mode, DEFAULT_NAN, (INVALID,), "Invalid. ∞ ÷ ∞")
+            return _special(op, mode, (sign << SIGN_BIT) | INFINITY, (), "∞")
+        if is_infinite(b):
+            return _special(op, mode, sign << SIGN_BIT, (), "Exact zero")
+        if is_zero(b):
+            if is_zero(a):
+                return _special(op, mode, DEFAULT_NAN, (INVALID,), "Invalid. 0 ÷ 0")
+            return _special(op, mode, (sign << SIGN_BIT) | INFINITY, (DIVIDE_BY_ZERO,),
+                    "Divide by zero")
+        if is_zero(a):
+            return _special(op, mode, sign << SIGN_BIT, (), "Exact zero")
+        sign_a, significand_a, exponent_a = decompose(a)
+        sign_b, significand_b, exponent_b = decompose(b)
+        # At least 56 quotient bits, so the guard and round bits are in the quotient
+        shift = max(0, PRECISION + 3 + significand_b.bit_length() - significand_a.bit_length())
+        quotient, remainder = divmod(significand_a << shift, significand_b)
+        return _rounded(op, mode, (), sign, quotient, exponent_a - exponent_b - shift,
+                remainder != 0)
+
+    # SQRT
+    a = operands[0]
+    if is_zero(a):
+        # sqrt(-0) is -0
+        return _special(op, mode, a, (), "Exact zero")
+    if a >> SIGN_BIT:
+        return _special(op, mode, DEFAULT_NAN, (INVALID,), "Invalid. √ of negative")
+    if is_infinite(a):
+        return _special(op, mode, a, (), "∞")
+    sign, significand, exponent = decompose(a)
+    # At least 112 bits, so the root has 56, and an even exponent
+    shift = max(0, 2 * (PRECISION + 3) - significand.bit_length())
+    shift += (exponent - shift) & 1
+    root = math.isqrt(significand << shift)
+    remainder = (significand << shift) - root * root
+    return _rounded(op, mode, (), 0, root, (exponent - shift) // 2, remainder != 0)
+
+
+def add(a, b, mode=ROUND_NEAREST_EVEN):
+    return operate(ADD, a, b, mode=mode).bits
+
+
+def subtract(a, b, mode=ROUND_NEAREST_EVEN):
+    return operate(SUBTRACT, a, b, mode=mode).bits
+
+
+def multiply(a, b, mode=ROUND_NEAREST_EVEN):
+    return operate(MULTIPLY, a, b, mode=mode).bits
+
+
+def divide(a, b, mode=ROUND_NEAREST_EVEN):
+    return operate(DIVIDE, a, b, mode=mode).bits
+
+
+def fma(a, b, c, mode=ROUND_NEAREST_EVEN):
+    return operate(FMA, a, b, c, mode=mode).bits
+
+
+def sqrt(a, mode=ROUND_NEAREST_EVEN):
+    return operate(SQRT, a, mode=mode).bits
+
+
+def _columns(significand, exponent, quantum, sticky=False):
+    """
+    Return the significand as binary digits aligned at quantum: the kept bits,
+    then guard, round and sticky. Bits below the round bit are ORed into sticky.
+    """
+    shift = quantum - 2 - exponent
+    if shift > 0:
+        sticky = sticky or bool(significand & ((1 << shift) - 1))
+        significand >>= shift
+    else:
+        significand <<= -shift
+    digits = format(significand, "b").zfill(3)
+    return digits[:-2], digits[-2:-1], digits[-1:], str(int(sticky))
+
+
+def format_trace(result):
+    """
+    Return lines of text showing how the result was rounded. The terms of a
+    sum and the exact result are aligned on the last place kept, with the
+    guard (G), round (R) and sticky (S) columns after it.
+    """
+    lines = []
+    if result.exact is None:
+        lines.append("{}: {:016X}".format(result.decision, result.bits))
+        if result.flags:
+            lines.append("Flags: " + ", ".join(sorted(result.flags)))
+        return lines
+
+    quantum = result.quantum
+    if quantum is None:
+        # Exact zero sum. Aligned on the smallest term.
+        quantum = result.exact[2] + 2
+    rows = [("{}{}".format("-" if sign else "+", "term"), _columns(significand, exponent, quantum))
+            for sign, significand, exponent in result.terms]
+    sign, significand, exponent, sticky = result.exact
+    rows.append(("{}exact".format("-" if sign else "+"),
+            _columns(significand, exponent, quantum, sticky)))
+    width = max(len(columns[0]) for name, columns in rows)
+    lines.append("{:8} {:>{}} G R S   × 2**{}".format("", "kept", width, quantum))
+    for name, (kept, guard, round_bit, sticky_bit) in rows:
+        lines.append("{:8} {:>{}} {} {} {}".format(name, kept, width, guard, round_bit,
+                sticky_bit))
+    lines.append("Rounding {}: {}".format(result.mode, result.decision))
+    lines.append("Result: {:016X}".format(result.bits))
+    if result.flags:
+        lines.append("Flags: " + ", ".join(sorted(result.flags)))
+    return lines
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+#
+# double64_batch.py
+#
+# Vectorized decoding of many 64 bit patterns at once using NumPy.
+#
+# The same rules as double64.classify() and double64.unbiased_exponent() are
+# applied to whole arrays, so a register dump of millions of quadwords is
+# decoded in one pass instead of one Python call per value.
+#
+# Requires NumPy. double64.py and double_precision.py do not.
+#
+import collections
+
+import numpy as np
+
+from double64 import (BIAS, FRACTION_BITS, FRACTION_MASK, EXPONENT_MASK, SIGN_BIT,
+        SIGN_MASK, BITS_MASK, ZERO, SUBNORMAL, NORMAL, INFINITE, NAN, NAN_DISTANCE)
+import double64_arith as arith
+from double64_formats import BINARY64
+
+# Class codes in the kind array. CLASS_NAMES[code] is the double64 class.
+CLASS_ZERO = 0
+CLASS_SUBNORMAL = 1
+CLASS_NORMAL = 2
+CLASS_INFINITE = 3
+CLASS_NAN = 4
+CLASS_NAMES = (ZERO, SUBNORMAL, NORMAL, INFINITE, NAN)
+
+Breakdown = collections.namedtuple("Breakdown",
+        ["sign", "exponent", "fraction", "kind", "value"])
+
+
+# Breakdown of the other formats. fraction is the low 64 bits of the fraction and
+# fraction_high the bits above them, only used by binary128.
+FormatBreakdown = collections.namedtuple("FormatBreakdown",
+        ["sign", "exponent", "fraction_high", "fraction", "kind", "value"])
+
+
+def as_bits(data, byteorder="<"):
+    """
+    Return data as a NumPy uint64 array without copying where possible.
+    data may be a uint64/int64/float64 array or any buffer protocol object
+    (bytes, bytearray, memoryview, mmap, array.array) holding raw doubles.
+    byteorder is "<" (little endian) or ">" (big endian) for raw buffers.
+    """
+    if isinstance(data, np.ndarray):
+        if data.dtype.itemsize != 8:
+            raise ValueError("Expected 64 bit elements, not {}".format(data.dtype))
+        bits = data.view(np.dtype(np.uint64).newbyteorder(data.dtype.byteorder))
+    else:
+        bits = np.frombuffer(data, dtype=byteorder + "u8")
+    if not bits.dtype.isnative:
+        bits = bits.astype(np.uint64)
+    return bits
+
+
+def classify_array(bits):
+    """Return a uint8 array of class codes. CLASS_ZERO ... CLASS_NAN"""
+    bits = as_bits(bits)
+    exponent = (bits >> np.uint64(FRACTION_BITS)) & np.uint64(EXPONENT_MASK)
+    nonzero_fraction = (bits & np.uint64(FRACTION_MASK)) != 0
+
+    kind = np.full(bits.shape, CLASS_NORMAL, dtype=np.uint8)
+    low = exponent == 0
+    high = exponent == EXPONENT_MASK
+    kind[low] = np.where(nonzero_fraction[low], CLASS_SUBNORMAL, CLASS_ZERO)
+    kind[high] = np.where(nonzero_fraction[high], CLASS_NAN, CLASS_INFINITE)
+    return kind
+
+
+def decode_array(data, byteorder="<"):
+    """
+    Decode an array of 64 bit patterns in one vectorized pass.
+    Returns Breakdown(sign, exponent, fraction, kind, value) of arrays:
+      sign      uint8   0 or 1
+      exponent  int16   unbiased. -1022 for zero/subnormal, 1024 for inf/NaN
+      fraction  uint64  the 52 fraction bits
+      kind      uint8   class code. See CLASS_NAMES
+      value     float64 the bits reinterpreted. A view, not a copy
+    """
+    bits = as_bits(data, byteorder)
+    sign = (bits >> np.uint64(SIGN_BIT)).astype(np.uint8)
+    field = ((bits >> np.uint64(FRACTION_BITS)) & np.uint64(EXPONENT_MASK)).astype(np.int16)
+    exponent = np.where(field == 0, np.int16(1 - BIAS), field - np.int16(BIAS)).astype(np.int16)
+    fraction = bits & np.uint64(FRACTION_MASK)
+    kind = classify_array(bits)
+    value = bits.view(np.float64)
+    return Breakdown(sign, exponent, fraction, kind, value)
+
+
+def format_words(data, fmt, byteorder="<"):
+    """
+    Return (high, low) uint64 arrays of patterns of format fmt. low is bits 0
+    to 63 and high the bits above, zero for formats of 64 bits or less.
+    data may be a NumPy array with elements of the format's width, e.g.
+    float16 or uint32, or any buffer of raw values. byteorder is for buffers.
+    """
+    size = fmt.width // 8
+    if isinstance(data, np.ndarray) and data.dtype.itemsize == size and size <= 8:
+        low = data.view(np.dtype("u{}".format(size)).newbyteorder(data.dtype.byteorder))
+        low = low.astype(np.uint64)
+        return np.zeros_like(low), low
+    if isinstance(data, np.ndarray) and data.dtype.itemsize > size:
+        # E.g. x87 long doubles padded to 16 bytes. The value is in the low bytes
+        raw = np.ascontiguousarray(data).view(np.uint8).reshape(-1, data.dtype.itemsize)[:, :size]
+    else:
+        raw = np.frombuffer(data, dtype=np.uint8)
+        raw = raw[:raw.size // size * size].reshape(-1, size)
+    if byteorder == ">":
+        raw = raw[:, ::-1]
+    padded = np.zeros((raw.shape[0], 16), dtype=np.uint8)
+    padded[:, :size] = raw
+    words = padded.view("<u8")
+    return words[:, 1].astype(np.uint64), words[:, 0].astype(np.uint64)
+
+
+def _field(high, low, start, count):
+    """Bits start to start + count - 1 of the patterns. count is 64 or less, not across bit 64"""
+    mask = np.uint64((1 << count) - 1)
+    if start >= 64:
+        return (high >> np.uint64(start - 64)) & mask
+    return (low >> np.uint64(start)) & mask
+
+
+def decode_format_array(data, fmt, byteorder="<"):
+    """
+    Decode an array of patterns of any double64_formats.Format in one
+    vectorized pass, with the same rules as Format.classify(). Returns
+    FormatBreakdown(sign, exponent, fraction_high, fraction, kind, value):
+      sign           uint8   0 or 1
+      exponent       int32   unbiased. 1 - bias for zero/subnormal
+      fraction_high  uint64  fraction bits 64 and up. binary128 only
+      fraction       uint64  fraction bits 0 to 63
+      kind           uint8   class code. See CLASS_NAMES
+      value          float64 the value. ±∞ or 0 beyond the range of a double. The
+                     formats wider than binary64 are rounded, within an ULP
+    """
+    if fmt is BINARY64:
+        breakdown = decode_array(data, byteorder)
+        return FormatBreakdown(breakdown.sign, breakdown.exponent.astype(np.int32),
+                np.zeros_like(breakdown.fraction), *breakdown[2:])
+    high, low = format_words(data, fmt, byteorder)
+    sign = _field(high, low, fmt.sign_bit, 1).astype(np.uint8)
+    field = _field(high, low, fmt.exponent_shift, fmt.exponent_bits).astype(np.int32)
+    fraction = low & np.uint64(fmt.fraction_mask & BITS_MASK)
+    if fmt.fraction_bits > 64:
+        fraction_high = high & np.uint64(fmt.fraction_mask >> 64)
+    else:
+        fraction_high = np.zeros_like(low)
+    integer_bit = np.ones(low.shape, dtype=bool)
+    if fmt.explicit_bit:
+        integer_bit = _field(high, low, fmt.fraction_bits, 1) != 0
+    nonzero_fraction = (fraction != 0) | (fraction_high != 0)
+
+    kind = np.full(low.shape, CLASS_NORMAL, dtype=np.uint8)
+    zero_field = field == 0
+    kind[~integer_bit] = CLASS_NAN
+    top = field == fmt.exponent_mask
+    kind[top] = np.where(nonzero_fraction[top] | ~integer_bit[top], CLASS_NAN, CLASS_INFINITE)
+    # x87 pseudo denormals have the integer bit set
+    subnormal = nonzero_fraction | (integer_bit if fmt.explicit_bit else False)
+    kind[zero_field] = np.where(subnormal[zero_field], CLASS_SUBNORMAL, CLASS_ZERO)
+    exponent = np.where(zero_field, 1 - fmt.bias, field - fmt.bias).astype(np.int32)
+
+    # significand × 2**(exponent - fraction bits), in parts a double holds exactly
+    hidden = np.where(zero_field & ~(integer_bit & fmt.explicit_bit), 0.0, 1.0)
+    with np.errstate(all="ignore"):
+        if fmt.fraction_bits > 64:
+            value = np.ldexp(hidden, exponent) \
+                    + np.ldexp(fraction_high.astype(np.float64), exponent + 64 - fmt.fraction_bits) \
+                    + np.ldexp(fraction.astype(np.float64), exponent - fmt.fraction_bits)
+        else:
+            value = np.ldexp(hidden + np.ldexp(fraction.astype(np.float64), -fmt.fraction_bits),
+                    exponent)
+    value = np.where(kind == CLASS_INFINITE, np.inf, value)
+    value = np.where(kind == CLASS_NAN, np.nan, value)
+    value = np.where(sign != 0, -value, value)
+    return FormatBreakdown(sign, exponent, fraction_high, fraction, kind, value)
+
+
+def describe_array(data, byteorder="<"):
+    """
+    Return an object array of the same text as double64.describe() gives for
+    each value, e.g. "+∞" or "5e-324 ~ Min subnormal +ve". This is the text
+    ieee754_breakdown() shows after "Floating Point:".
+    """
+    bits = as_bits(data, byteorder)
+    kind = classify_array(bits)
+    sign = np.where((bits >> np.uint64(SIGN_BIT)) != 0, "-", "+").astype(object)
+    magnitude = bits & np.uint64(~SIGN_MASK & BITS_MASK)
+
+    text = np.array([repr(value) for value in bits.view(np.float64).tolist()], dtype=object)
+    text = text.reshape(bits.shape)
+    zero = kind == CLASS_ZERO
+    text[zero] = sign[zero] + "0.0"
+    infinite = kind == CLASS_INFINITE
+    text[infinite] = sign[infinite] + "∞"
+    nan = kind == CLASS_NAN
+    text[nan] = sign[nan] + "NaN"
+
+    min_subnormal = magnitude == np.uint64(0x0000000000000001)
+    text[min_subnormal] = text[min_subnormal] + " ~ Min subnormal " + sign[min_subnormal] + "ve"
+    subnormal = (kind == CLASS_SUBNORMAL) & ~min_subnormal
+    text[subnormal] = text[subnormal] + " ~ Subnormal"
+    maximum = magnitude == np.uint64(0x7FEFFFFFFFFFFFFF)
+    text[maximum] = text[maximum] + " ~ Max " + sign[maximum] + "ve"
+    minimum = magnitude == np.uint64(0x0010000000000000)
+    text[minimum] = text[minimum] + " ~ Min " + sign[minimum] + "ve"
+    return text
+
+
+def ordered_array(data, byteorder="<"):
+    """
+    Return a uint64 array of the 64 bit patterns in the order of their values,
+    offset by 2**63. +0 and -0 are both 2**63. Consecutive doubles differ by 1.
+    See double64.ulp_distance()
+    """
+    bits = as_bits(data, byteorder)
+    magnitude = bits & np.uint64(~SIGN_MASK & BITS_MASK)
+    middle = np.uint64(SIGN_MASK)
+    return np.where((bits >> np.uint64(SIGN_BIT)) != 0, middle - magnitude, middle + magnitude)
+
+
+def ulp_diff(a, b, byteorder="<"):
+    """
+    Return a uint64 array of the number of doubles between each pair of a and
+    b, the same as double64.ulp_distance(). a and b may be float64 arrays, or
+    arrays or buffers of 64 bit patterns. Two NaNs are 0 apart, a NaN and a
+    number NAN_DISTANCE.
+    """
+    bits_a = as_bits(a, byteorder)
+    bits_b = as_bits(b, byteorder)
+    ordered_a = ordered_array(bits_a)
+    ordered_b = ordered_array(bits_b)
+    distance = np.where(ordered_a >= ordered_b, ordered_a - ordered_b, ordered_b - ordered_a)
+    nan_a = classify_array(bits_a) == CLASS_NAN
+    nan_b = classify_array(bits_b) == CLASS_NAN
+    distance[nan_a != nan_b] = NAN_DISTANCE
+    distance[nan_a & nan_b] = 0
+    return distance
+
+
+def ordered_map(executor, function, chunks, window, *args):
+    """
+    Generator of function(chunk, *args) results in the order of chunks.
+    At most window chunks are submitted at once, so memory use is bounded.
+    """
+    pending = collections.deque()
+    for chunk in chunks:
+        pending.append(executor.submit(function, chunk, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class DumpReader:
+    """
+    Read only view of a raw binary file of 64 bit doubles.
+    The file is memory mapped, so it is not loaded into RAM. Values are decoded
+    one page at a time when they are first asked for.
+    byteorder is "<" (little endian) or ">" (big endian).
+    """
+    PAGE_SIZE = 4096    # 64 bit values per page. 32 KiB
+    SCAN_SIZE = 1 << 20 # 64 bit values per chunk of class_counts(). 8 MiB
+
+    def __init__(self, filename, byteorder="<"):
+        self.filename = filename
+        self.byteorder = byteorder
+        self.data = np.memmap(filename, dtype=byteorder + "u8", mode="r",
+                shape=(self._count(filename),))
+        self.page_number = None
+        self.page_breakdown = None
+
+    @staticmethod
+    def _count(filename):
+        """Number of whole 64 bit values in the file. A trailing part value is ignored"""
+        with open(filename, "rb") as fin:
+            size = fin.seek(0, 2)
+        if size < 8:
+            raise ValueError("{} holds no 64 bit values".format(filename))
+        return size // 8
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def page(self, number):
+        """Return the Breakdown of page number. The last page decoded is kept"""
+        if number != self.page_number:
+            start = number * self.PAGE_SIZE
+            self.page_breakdown = decode_array(self.data[start:start + self.PAGE_SIZE])
+            self.page_number = number
+        return self.page_breakdown
+
+    def bits(self, index):
+        """Return the 64 bit pattern at index as a Python int"""
+        if not 0 <= index < len(self):
+            raise IndexError("Index {} outside 0 to {}".format(index, len(self) - 1))
+        page = self.page(index // self.PAGE_SIZE)
+        return int(page.value[index % self.PAGE_SIZE].view(np.uint64))
+
+    def class_counts(self, cancelled=None):
+        """
+        Return the number of values of each class in the whole file, in
+        CLASS_NAMES order, decoding SCAN_SIZE values at a time. Return None
+        if the threading.Event cancelled is set before the end.
+        """
+        data = self.data
+        counts = np.zeros(len(CLASS_NAMES), dtype=np.int64)
+        for start in range(0, data.shape[0], self.SCAN_SIZE):
+            if cancelled is not None and cancelled.is_set():
+                return None
+            kind = classify_array(data[start:start + self.SCAN_SIZE])
+            counts += np.bincount(kind, minlength=len(CLASS_NAMES))
+        return counts
+
+    def close(self):
+        """Release the memory map"""
+        self.data = None
+        self.page_breakdown = None
+        self.page_number = None
+
+
+# Magnitudes within which Dekker's product and its error are exact doubles
+_SPLIT_LIMIT = 2.0 ** 995
+_PRODUCT_MIN = 2.0 ** -960
+
+
+def _split(x):
+    """Veltkamp split of x into high and low halves of 26 bits each"""
+    scaled = 134217729.0 * x        # 2**27 + 1
+    high = scaled - (scaled - x)
+    return high, x - high
+
+
+def _product_error(x, y, product):
+    """Exact x × y - product, Dekker's two product. Valid within _SPLIT_LIMIT and _PRODUCT_MIN"""
+    x_high, x_low = _split(x)
+    y_high, y_low = _split(y)
+    return (((x_high * y_high - product) + x_high * y_low) + x_low * y_high) + x_low * y_low
+
+
+def _two_sum(x, y):
+    """Return (x + y, the exact error of x + y), Knuth's two sum"""
+    total = x + y
+    virtual = total - x
+    return total, (x - (total - virtual)) + (y - virtual)
+
+
+def _round_to_odd(total, error):
+    """Of the two doubles next to total + error, the one with an odd last bit, if error"""
+    even = (total.view(np.uint64) & 1) == 0
+    return np.where((error != 0) & even, np.nextafter(total, np.copysign(np.inf, error)), total)
+
+
+def _in_product_range(*arrays):
+    inside = np.ones(arrays[0].shape, dtype=bool)
+    for array in arrays:
+        magnitude = np.abs(array)
+        inside &= (magnitude < _SPLIT_LIMIT) & (magnitude > _PRODUCT_MIN)
+    return inside
+
+
+def operate_array(op, a, b=None, c=None, mode=arith.ROUND_NEAREST_EVEN):
+    """
+    Return a uint64 array of a op b, fma(a, b, c) or sqrt(a) for arrays of 64 bit
+    patterns, with the same bits as double64_arith.operate() gives for each element.
+
+    The operation is the hardware's, which rounds to nearest even. For the
+    other rounding modes the sign of the rounding error is found exactly, by
+    the two sum and two product error free transformations, and the result
+    moved one place where the mode rounds the other way. NumPy has no fma, so
+    it is a × b + c as the exact sum of the product, its error and c: the
+    rounding error of the two lower terms is kept in their sum's last bit,
+    rounded to odd, and the sum rounded once, as Boldo and Melquiond. Elements
+    the transformations do not cover, non finite, zero, near the limits of the
+    exponent, or an fma that cancels most of the product, are done by operate().
+    """
+    if op not in arith.OPERANDS:
+        raise ValueError("Unknown operation {!r}".format(op))
+    if mode not in arith.ROUNDING_MODES:
+        raise ValueError("Unknown rounding mode {!r}".format(mode))
+    operands = [as_bits(np.asarray(operand)) for operand in (a, b, c)[:arith.OPERANDS[op]]]
+    operands = np.broadcast_arrays(*operands)
+    x, y = [operand.view(np.float64) for operand in (operands + operands)[:2]]
+
+    with np.errstate(all="ignore"):
+        if op == arith.ADD:
+            result = x + y
+        elif op == arith.SUBTRACT:
+            result = x - y
+        elif op == arith.MULTIPLY:
+            result = x * y
+        elif op == arith.DIVIDE:
+            result = x / y
+        elif op == arith.SQRT:
+            result = np.sqrt(x)
+        else:
+            # a × b + c = high + low + tail exactly. tail_sum rounded to odd
+            # stands for low + tail at the last bit, so high + tail_sum rounds
+            # as the exact sum, while tail_sum is far below the result's last place
+            product = x * y
+            tail = _product_error(x, y, product)
+            high, low = _two_sum(product, operands[2].view(np.float64))
+            tail_sum, tail_error = _two_sum(low, tail)
+            tail_sum = _round_to_odd(tail_sum, tail_error)
+            result = high + tail_sum
+
+        # Zeros, for their sign, and non finite results are left to operate()
+        fallback = ~np.isfinite(result) | (result == 0)
+        if op == arith.FMA:
+            fallback |= ~_in_product_range(x, y, product) | (np.abs(result) < _PRODUCT_MIN)
+            fallback |= (tail_error != 0) & (np.abs(tail_sum) * 32 > np.abs(result))
+        if mode != arith.ROUND_NEAREST_EVEN:
+            # The exact result - result. Only its sign is used
+            if op in (arith.ADD, arith.SUBTRACT):
+                error = _two_sum(x, y if op == arith.ADD else -y)[1]
+            elif op == arith.FMA:
+                error = _two_sum(high, tail_sum)[1]
+            elif op == arith.MULTIPLY:
+                fallback |= ~_in_product_range(x, y, result)
+                error = _product_error(x, y, result)
+            elif op == arith.DIVIDE:
+                # x - result × y is exact. Its sign times the sign of y is the error's
+                fallback |= ~_in_product_range(x, y, result)
+                residual = (x - result * y) - _product_error(result, y, result * y)
+                error = residual * np.sign(y)
+            else:
+                fallback |= ~_in_product_range(x, result)
+                error = (x - result * result) - _product_error(result, result, result * result)
+
+            if mode == arith.ROUND_UP:
+                result = np.where(error > 0, np.nextafter(result, np.inf), result)
+            elif mode == arith.ROUND_DOWN:
+                result = np.where(error < 0, np.nextafter(result, -np.inf), result)
+            else:
+                toward_zero = np.sign(error) == -np.sign(result)
+                result = np.where(toward_zero, np.nextafter(result, 0.0), result)
+
+    bits = result.view(np.uint64).copy()
+    for index in zip(*np.nonzero(fallback)):
+        bits[index] = arith.operate(op, *(int(operand[index]) for operand in operands),
+                mode=mode).bits
+    return bits
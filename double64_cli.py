@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+#
+# double64_cli.py
+#
+# Command line decoding of 64 bit patterns. Does not import Gtk.
+#
+#   python3 -m double_precision decode [FILE ...]
+#   python3 double64_cli.py [FILE ...]
+#
+# Reads lines from the files, or stdin, and writes one breakdown line per value.
+# Lines are read and written one at a time, so memory use does not grow with
+# the length of the input. Accepted values:
+#   F1:	3FF0000000000000     simh register lines, as output by double-precision
+#   3FF0000000000000         16 hex digits, even if they are all decimal digits
+#   0x3ff0000000000000       hex word
+#   1.5  -2  inf  nan        decimal values
+#   0x1.921fb54442d18p+1     hex floats
+# Lines without a value, such as the simh "Breakpoint" lines, are skipped.
+#
+# Output is tab separated:
+#   name  hex  sign  exponent  fraction  class  value
+#
+import argparse
+import re
+import sys
+
+from double64 import classify, unbiased_exponent, describe, encode, FRACTION_MASK, BITS_MASK
+
+# F0:	0000000000000001
+REGISTER_LINE = re.compile(r"^\s*(F\d+):\s*([0-9A-Fa-f]{1,16})\s*$")
+# A 0x word wider than 64 bits is not a value, rather than a hex float
+HEX_WORD = re.compile(r"^(?:0[xX][0-9A-Fa-f]+|[0-9A-Fa-f]{16})$")
+# 16 digits read as hex that could be meant as a decimal integer
+DECIMAL_DIGITS = re.compile(r"^[0-9]{16}$")
+
+
+def parse_value(text):
+    """
+    Return the 64 bit pattern for one value, or None if text is not a value.
+    A hex word is taken as the bits, so are 16 digits without 0x. One wider
+    than 64 bits is not a value. A decimal value or hex float is converted to
+    the nearest double.
+    """
+    text = text.strip()
+    if HEX_WORD.match(text):
+        bits = int(text, 16)
+        return bits if bits <= BITS_MASK else None
+    try:
+        return encode(text)
+    except ValueError:
+        return None
+
+
+def read_words(lines, warn=None):
+    """
+    Generator of (name, bits) for each line holding a value. name may be empty.
+    warn(text) is called for each 16 digit word that is all decimal digits, and
+    each hex word wider than 64 bits, which is skipped.
+    """
+    for line in lines:
+        match = REGISTER_LINE.match(line)
+        if match:
+            yield match.group(1), int(match.group(2), 16)
+            continue
+        text = line.strip()
+        bits = parse_value(text)
+        if warn is not None:
+            if bits is None and HEX_WORD.match(text):
+                warn("{} is wider than 64 bits. Skipped".format(text))
+            elif DECIMAL_DIGITS.match(text):
+                warn("{} is read as 16 hex digits. For the decimal integer write "
+                        "{}.0".format(text, text))
+        if bits is not None:
+            yield "", bits
+
+
+def format_breakdown(name, bits):
+    """Return the tab separated breakdown of one 64 bit pattern"""
+    return "\t".join((
+            name,
+            "{:016X}".format(bits),
+            str(bits >> 63),
+            str(unbiased_exponent(bits)),
+            "{:013X}".format(bits & FRACTION_MASK),
+            classify(bits),
+            describe(bits),
+            ))
+
+
+def read_lines(filenames):
+    """Generator of the lines of each file. "-" or no files is stdin"""
+    if not filenames:
+        filenames = ["-"]
+    for filename in filenames:
+        if filename == "-":
+            yield from sys.stdin
+        else:
+            with open(filename) as fin:
+                yield from fin
+
+
+def warn(text):
+    print("double_precision decode: warning:", text, file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            prog="double_precision decode",
+            description="Decode IEEE 754 double precision values. "
+            "Output: name, hex, sign, exponent, fraction, class, value",
+            epilog="A value of exactly 16 digits is the hex bit pattern, even if every "
+            "digit is decimal: 1000000000000000 is 0x1000000000000000. Write "
+            "1000000000000000.0 or 1e15 for the decimal value. Each such word, and "
+            "each 0x word wider than 64 bits, which is skipped, is warned of on stderr.")
+    parser.add_argument("files", nargs="*", metavar="FILE",
+            help="Files to read. Default, or -, is stdin")
+    args = parser.parse_args(argv)
+
+    write = sys.stdout.write
+    try:
+        for name, bits in read_words(read_lines(args.files), warn):
+            write(format_breakdown(name, bits) + "\n")
+    except BrokenPipeError:
+        # E.g. piped into head
+        sys.stderr.close()
+        return 0
+    except OSError as err:
+        print("double_precision decode:", err, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+#
+# double64_convert.py
+#
+# Bulk conversion of a CSV or Parquet column of doubles, or hex words, to the
+# IEEE 754 breakdown. Does not import Gtk.
+#
+#   python3 double64_convert.py INPUT OUTPUT --column NAME [--hex] [--workers N]
+#
+# INPUT and OUTPUT are CSV, or Parquet if the name ends in .parquet. Parquet
+# requires pyarrow. The output columns are:
+#   input     the value as read
+#   hex       16 hex digits
+#   sign      0 or 1. Bit 63
+#   exponent  unbiased. Bits 52 to 62. -1022 for zero/subnormal, 1024 for inf/NaN
+#   fraction  13 hex digits. Bits 0 to 51
+#   class     zero, subnormal, normal, inf or nan
+#   value     as shown after "Floating Point:" by ieee754_breakdown()
+#
+# The input is read in chunks which are decoded by a pool of processes. Only a
+# few chunks per process are held at once, so memory use does not grow with
+# the size of the file, and chunks are written in the order they were read.
+#
+import argparse
+import collections
+import concurrent.futures
+import csv
+import io
+import os
+import sys
+
+import numpy as np
+
+from double64_batch import as_bits, decode_array, describe_array, ordered_map, CLASS_NAMES
+
+COLUMNS = ["input", "hex", "sign", "exponent", "fraction", "class", "value"]
+CHUNK_SIZE = 100000
+MAX_WORD = (1 << 64) - 1
+
+
+def parse_values(texts, hex_words=False, first_row=1):
+    """
+    Return a uint64 array of the bits of text values. Decimal, or hex words if
+    hex_words. Raise ValueError with the row, counted from first_row, of a value
+    that is not a number, or a hex word that is not 0 to 2**64 - 1.
+    """
+    read = (lambda text: int(text, 16)) if hex_words else float
+    values = []
+    for row, text in enumerate(texts, first_row):
+        try:
+            value = read(text)
+        except ValueError:
+            raise ValueError("Row {}: {!r} is not a {}".format(row, text,
+                    "hex word" if hex_words else "number")) from None
+        if hex_words and not 0 <= value <= MAX_WORD:
+            raise ValueError("Row {}: {} is not a 64 bit hex word".format(row, text))
+        values.append(value)
+    if hex_words:
+        return np.array(values, dtype=np.uint64)
+    return np.array(values, dtype=np.float64).view(np.uint64)
+
+
+def breakdown_columns(bits):
+    """Return a dict of the breakdown columns, except input, of a uint64 array"""
+    breakdown = decode_array(bits)
+    class_names = np.array(CLASS_NAMES, dtype=object)
+    return collections.OrderedDict((
+            ("hex", ["{:016X}".format(word) for word in bits.tolist()]),
+            ("sign", breakdown.sign),
+            ("exponent", breakdown.exponent),
+            ("fraction", ["{:013X}".format(word) for word in breakdown.fraction.tolist()]),
+            ("class", class_names[breakdown.kind]),
+            ("value", describe_array(bits)),
+            ))
+
+
+def csv_text(columns):
+    """Return the rows of a dict of columns as CSV text"""
+    output = io.StringIO()
+    csv.writer(output).writerows(zip(*(column.tolist() if isinstance(column, np.ndarray)
+            else column for column in columns.values())))
+    return output.getvalue()
+
+
+def convert_chunk(chunk, hex_words=False, as_csv=True, first_row=1):
+    """
+    Worker. Return the breakdown of one chunk, as CSV text if as_csv, else as
+    a dict of columns. chunk is a list of CSV text values or a NumPy array
+    from a Parquet column. Parquet string columns are parsed as the CSV values,
+    uint64 columns with hex_words are the bits, and other numeric columns are
+    converted to the nearest double. first_row is the row of the first value,
+    for errors.
+    """
+    if isinstance(chunk, list):
+        bits = parse_values(chunk, hex_words, first_row)
+    elif chunk.dtype.kind in "OUS":
+        bits = parse_values(chunk.tolist(), hex_words, first_row)
+    elif chunk.dtype == np.float64 or (hex_words and chunk.dtype == np.uint64):
+        bits = as_bits(chunk)
+    else:
+        bits = chunk.astype(np.float64).view(np.uint64)
+    columns = collections.OrderedDict(input=chunk)
+    columns.update(breakdown_columns(bits))
+    if as_csv:
+        return csv_text(columns)
+    return columns
+
+
+def convert_numbered(numbered, hex_words, as_csv):
+    """Worker. convert_chunk() of a (first_row, chunk) of numbered_chunks()"""
+    first_row, chunk = numbered
+    return convert_chunk(chunk, hex_words, as_csv, first_row)
+
+
+def numbered_chunks(chunks):
+    """Generator of (first_row, chunk) of each chunk. Rows are counted from 1"""
+    row = 1
+    for chunk in chunks:
+        yield row, chunk
+        row += len(chunk)
+
+
+def read_csv_chunks(filename, column, chunk_size):
+    """Generator of lists of chunk_size text values from column of a CSV file"""
+    with open(filename, newline="") as fin:
+        reader = csv.reader(fin)
+        header = next(reader)
+        try:
+            index = header.index(column)
+        except ValueError:
+            raise ValueError("No column {} in {}".format(column, filename)) from None
+        chunk = []
+        for row in reader:
+            if len(row) <= index:
+                raise ValueError("Line {} of {} has no {} value".format(
+                        reader.line_num, filename, column))
+            chunk.append(row[index])
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def read_parquet_chunks(filename, column, chunk_size):
+    """Generator of NumPy arrays of chunk_size values from column of a Parquet file"""
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(filename).iter_batches(batch_size=chunk_size, columns=[column]):
+        yield batch.column(0).to_numpy(zero_copy_only=False)
+
+
+def convert(input_file, output_file, column, hex_words=False, workers=None,
+        chunk_size=CHUNK_SIZE):
+    """Convert column of input_file to the breakdown in output_file. Return the row count"""
+    workers = workers or os.cpu_count() or 1
+    as_csv = not output_file.endswith(".parquet")
+    if input_file.endswith(".parquet"):
+        chunks = read_parquet_chunks(input_file, column, chunk_size)
+    else:
+        chunks = read_csv_chunks(input_file, column, chunk_size)
+
+    # Written to a temporary file that then replaces output_file, so a bad
+    # value in a later chunk does not leave a partial output
+    temporary = output_file + ".tmp"
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            results = ordered_map(executor, convert_numbered, numbered_chunks(chunks),
+                    workers * 2, hex_words, as_csv)
+            if as_csv:
+                rows = write_csv(temporary, results)
+            else:
+                rows = write_parquet(temporary, results)
+        os.replace(temporary, output_file)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return rows
+
+
+def write_csv(filename, results):
+    """Write the header then the CSV text of each chunk. Return the row count"""
+    rows = 0
+    with open(filename, "w", newline="", encoding="utf-8") as fout:
+        fout.write(",".join(COLUMNS) + "\r\n")
+        for text in results:
+            fout.write(text)
+            rows += text.count("\n")
+    return rows
+
+
+def write_parquet(filename, results):
+    """Write the columns of each chunk as a row group. Return the row count"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    rows = 0
+    writer = None
+    try:
+        for columns in results:
+            table = pa.table(collections.OrderedDict(
+                    (name, column.tolist() if isinstance(column, np.ndarray)
+                    and column.dtype == object else column)
+                    for name, column in columns.items()))
+            if writer is None:
+                writer = pq.ParquetWriter(filename, table.schema)
+            writer.write_table(table)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+            description="Convert a CSV or Parquet column of doubles to the IEEE 754 breakdown")
+    parser.add_argument("input", help="CSV or .parquet file")
+    parser.add_argument("output", help="CSV or .parquet file")
+    parser.add_argument("--column", required=True, help="Name of the column to convert")
+    parser.add_argument("--hex", action="store_true",
+            help="Values are 16 digit hex words, not decimal. "
+            "A Parquet uint64 column is then the bits")
+    parser.add_argument("--workers", type=int, help="Processes. Default, all cores")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+            help="Values per chunk. Default {}".format(CHUNK_SIZE))
+    args = parser.parse_args(argv)
+
+    try:
+        rows = convert(args.input, args.output, args.column, args.hex,
+                args.workers, args.chunk_size)
+    except (OSError, ValueError, ImportError) as err:
+        print("double64_convert:", err, file=sys.stderr)
+        return 1
+    print("Converted {} values to {}".format(rows, args.output), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
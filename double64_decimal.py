@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+#
+# double64_decimal.py
+#
+# Decimal text of binary floating point values, from integers only. Does not
+# import Gtk, or use floats.
+#
+# Two renderings of a finite value significand × 2**exponent:
+#   shortest   the fewest digits that read back as the same value. The same
+#              digits as repr() of a double. E.g. 0.1
+#   exact      every digit of the value. A binary fraction always ends, after
+#              as many decimal places as the power of two, so 2**-1074 has 1074
+#              places, 751 of them significant, and the largest subnormal 767.
+#              E.g. 0.1000000000000000055511151231257827021181583404541015625
+#
+# shortest_digits() is the free format algorithm of Steele & White, as given
+# by Burger & Dybvig. The digits are generated until the value is the only one
+# of its precision in the interval they give. Half way cases read back to the
+# even significand, so the boundaries of an even significand are included.
+#
+# The exact digits are generated a chunk at a time by long division, so the
+# first chunk is shown before the thousands of digits of a binary128 are all
+# found. The text is cached by (sign, significand, exponent), which for binary64
+# is one key for each pattern.
+#
+import collections
+import functools
+import threading
+
+# binary64. As double64
+PRECISION = 53
+MIN_EXPONENT = -1074
+
+CACHE_SIZE = 4096
+CHUNK_DIGITS = 64
+
+# (sign, significand, exponent): exact text, least recently used first. See exact_text()
+_exact_cache = collections.OrderedDict()
+_exact_lock = threading.Lock()
+
+# Rendering modes of the window
+SHORTEST = "Shortest"
+EXACT = "Exact"
+MODES = (SHORTEST, EXACT)
+
+
+def decompose(bits):
+    """
+    Return (sign, significand, exponent) of a finite 64 bit pattern.
+    The value is (-1)**sign × significand × 2**exponent
+    """
+    sign = (bits >> 63) & 1
+    field = (bits >> 52) & 0x7FF
+    fraction = bits & 0xFFFFFFFFFFFFF
+    if field == 0:
+        return sign, fraction, MIN_EXPONENT
+    return sign, fraction | (1 << 52), field + MIN_EXPONENT - 1
+
+
+def shortest_digits(significand, exponent, precision=PRECISION, min_exponent=MIN_EXPONENT):
+    """
+    Return (digits, point) of the shortest decimal that is nearer to
+    significand × 2**exponent than to any other value of the precision.
+    The decimal is 0.digits × 10**point. significand is not 0.
+    """
+    # The value is r / s. The gaps to the neighbouring values are m_minus / s
+    # and m_plus / s, doubled so the half gaps are integers.
+    if exponent >= 0:
+        unit = 1 << exponent
+        if significand != 1 << (precision - 1):
+            r, s, m_plus, m_minus = significand * unit * 2, 2, unit, unit
+        else:
+            # The gap below a power of two is half the gap above
+            r, s, m_plus, m_minus = significand * unit * 4, 4, unit * 2, unit
+    elif exponent == min_exponent or significand != 1 << (precision - 1):
+        r, s, m_plus, m_minus = significand * 2, 1 << (1 - exponent), 1, 1
+    else:
+        r, s, m_plus, m_minus = significand * 4, 1 << (2 - exponent), 2, 1
+    inclusive = significand % 2 == 0
+
+    # point is the least with (r + m_plus) / s < 10**point, or <= when the
+    # boundary is excluded. Estimated from the bit lengths, then corrected.
+    high = r + m_plus
+
+    def below(point):
+        """True if (r + m_plus) / s is below 10**point, or at it when excluded"""
+        if point >= 0:
+            scaled_high, scaled_s = high, s * 10 ** point
+        else:
+            scaled_high, scaled_s = high * 10 ** -point, s
+        return scaled_high < scaled_s or (not inclusive and scaled_high == scaled_s)
+
+    point = ((high.bit_length() - s.bit_length()) * 30103) // 100000
+    while not below(point):
+        point += 1
+    while below(point - 1):
+        point -= 1
+
+    if point >= 0:
+        s *= 10 ** point
+    else:
+        scale = 10 ** -point
+        r, m_plus, m_minus = r * scale, m_plus * scale, m_minus * scale
+
+    digits = []
+    while True:
+        digit, r = divmod(r * 10, s)
+        m_plus *= 10
+        m_minus *= 10
+        low_end = r < m_minus or (inclusive and r == m_minus)
+        high_end = r + m_plus > s or (inclusive and r + m_plus == s)
+        if not low_end and not high_end:
+            digits.append(digit)
+            continue
+        if high_end and (not low_end or r * 2 > s or (r * 2 == s and digit % 2)):
+            # Nearer the digit above. Half way, as repr(), to the even digit.
+            digit += 1
+        digits.append(digit)
+        return "".join(map(str, digits)), point
+
+
+def repr_text(sign, digits, point):
+    """
+    Return the text of the decimal 0.digits × 10**point as repr() writes
+    floats. The exponent is used below 1e-4 and from 1e16.
+    """
+    digits = digits.rstrip("0") or "0"
+    sign = "-" if sign else ""
+    if not -4 < point <= 16:
+        return "{}{}{}e{:+03d}".format(sign, digits[0],
+                "." + digits[1:] if digits[1:] else "", point - 1)
+    if point >= len(digits):
+        return sign + digits + "0" * (point - len(digits)) + ".0"
+    if point > 0:
+        return sign + digits[:point] + "." + digits[point:]
+    return sign + "0." + "0" * -point + digits
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def shortest_text(sign, significand, exponent, precision=PRECISION, min_exponent=MIN_EXPONENT):
+    """Return the repr() style text of the shortest decimal of the value. See shortest_digits()"""
+    if significand == 0:
+        return "-0.0" if sign else "0.0"
+    return repr_text(sign, *shortest_digits(significand, exponent, precision, min_exponent))
+
+
+def _whole_chunks(whole, size):
+    """
+    Generator of the digits of the integer whole, most significant first, size
+    digits at a time. str() of ints of more than 4300 digits raises ValueError.
+    """
+    scale = 10 ** size
+    chunks = []
+    while whole >= scale:
+        whole, chunk = divmod(whole, scale)
+        chunks.append(chunk)
+    yield str(whole)
+    for chunk in reversed(chunks):
+        yield "{:0{}d}".format(chunk, size)
+
+
+def exact_chunks(sign, significand, exponent, size=CHUNK_DIGITS):
+    """
+    Generator of the text of every digit of (-1)**sign × significand × 2**exponent,
+    without an exponent. Up to size digits of the integer part at a time, then
+    up to size decimal places at a time. The last place is not 0.
+    """
+    if sign:
+        yield "-"
+    if exponent >= 0:
+        yield from _whole_chunks(significand << exponent, size)
+        yield ".0"
+        return
+    places = -exponent
+    yield from _whole_chunks(significand >> places, size)
+    yield "."
+    remainder = significand & ((1 << places) - 1)
+    if not remainder:
+        yield "0"
+        return
+    scale = 10 ** size
+    while remainder:
+        # The next size places, by long division by 2**places
+        remainder *= scale
+        chunk = remainder >> places
+        remainder &= (1 << places) - 1
+        text = "{:0{}d}".format(chunk, size)
+        yield text if remainder else text.rstrip("0")
+
+
+def exact_text(sign, significand, exponent, cancelled=None):
+    """
+    Return every digit of the value. See exact_chunks(). None if the
+    threading.Event cancelled is set before the last chunk. The last
+    CACHE_SIZE texts are cached. A cancelled text is not.
+    """
+    key = (sign, significand, exponent)
+    with _exact_lock:
+        text = _exact_cache.get(key)
+        if text is not None:
+            _exact_cache.move_to_end(key)
+            return text
+    chunks = []
+    for chunk in exact_chunks(sign, significand, exponent):
+        if cancelled is not None and cancelled.is_set():
+            return None
+        chunks.append(chunk)
+    text = "".join(chunks)
+    with _exact_lock:
+        _exact_cache[key] = text
+        if len(_exact_cache) > CACHE_SIZE:
+            _exact_cache.popitem(last=False)
+    return text
+
+
+def shortest(bits):
+    """Return the shortest text of the finite 64 bit pattern that reads back as it. As repr()"""
+    return shortest_text(*decompose(bits))
+
+
+def exact(bits):
+    """Return the exact decimal value of the finite 64 bit pattern"""
+    return exact_text(*decompose(bits))
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+#
+# double64_formats.py
+#
+# IEEE 754 style binary formats described by their layout. Does not import Gtk.
+#
+# A Format gives the width, exponent bits and bias. The fraction is the rest,
+# below the exponent, and the sign is the top bit. The same integer decoding
+# works for every format:
+#   binary16   16 bits. 5 exponent, 10 fraction. Bias 15
+#   bfloat16   16 bits. 8 exponent, 7 fraction. Bias 127
+#   binary32   32 bits. 8 exponent, 23 fraction. Bias 127
+#   binary64   64 bits. 11 exponent, 52 fraction. Bias 1023. The double64 functions
+#   x87        80 bits. 15 exponent, explicit integer bit 63, 63 fraction. Bias 16383
+#   binary128  128 bits. 15 exponent, 112 fraction. Bias 16383
+#
+# Bit 0 is the least significant bit of the fraction, as the display.
+# The x87 80 bit format has the integer bit of the significand in bit 63.
+# Encodings with the wrong integer bit for their exponent, which the x87 does
+# not accept as operands, are classed as NaN.
+#
+import collections
+import math
+import re
+from fractions import Fraction
+
+import double64
+import double64_decimal
+from double64 import ZERO, SUBNORMAL, NORMAL, INFINITE, NAN
+
+# About 40 digits of π, enough for binary128
+PI_TEXT = "3.141592653589793238462643383279502884197"
+
+HEX_FLOAT = re.compile(r"^([+-]?)0x([0-9a-f]*)(?:\.([0-9a-f]*))?(?:p([+-]?\d+))?$", re.I)
+DECIMAL = re.compile(r"^[+-]?(\d*)(?:\.(\d*))?(?:e([+-]?\d+))?$", re.I)
+
+# Exponents are clamped to this. Far beyond the range of any format.
+EXPONENT_LIMIT = 10 ** 9
+
+
+def _exponent(text):
+    """The int of the exponent text, clamped to ±EXPONENT_LIMIT without int() of long text"""
+    digits = text.lstrip("+-").lstrip("0") or "0"
+    value = EXPONENT_LIMIT if len(digits) > 10 else min(int(digits), EXPONENT_LIMIT)
+    return -value if text.startswith("-") else value
+
+
+def _decimal_int(digits):
+    """
+    The int of a string of decimal digits. int() is limited to 4300 digits,
+    so longer strings are converted 1000 digits at a time.
+    """
+    value = 0
+    for start in range(0, len(digits), 1000):
+        chunk = digits[start:start + 1000]
+        value = value * 10 ** len(chunk) + int(chunk)
+    return value
+
+
+class Format:
+    """
+    Layout of a binary floating point format. All methods take and return the
+    bits of a value as an integer.
+    """
+    __slots__ = ("name", "width", "exponent_bits", "fraction_bits", "bias", "explicit_bit",
+            "sign_bit", "sign_mask", "bits_mask", "exponent_shift", "exponent_mask",
+            "exponent_field_mask", "fraction_mask", "integer_bit", "min_quantum", "precision",
+            "hex_digits")
+
+    def __init__(self, name, width, exponent_bits, bias=None, explicit_bit=False):
+        self.name = name
+        self.width = width
+        self.exponent_bits = exponent_bits
+        # The fraction is the bits after the binary point, not the integer bit
+        self.fraction_bits = width - 1 - exponent_bits - explicit_bit
+        self.bias = (1 << (exponent_bits - 1)) - 1 if bias is None else bias
+        self.explicit_bit = explicit_bit
+        self.sign_bit = width - 1
+        self.sign_mask = 1 << self.sign_bit
+        self.bits_mask = (1 << width) - 1
+        self.exponent_shift = self.fraction_bits + explicit_bit
+        self.exponent_mask = (1 << exponent_bits) - 1
+        self.exponent_field_mask = self.exponent_mask << self.exponent_shift
+        self.fraction_mask = (1 << self.fraction_bits) - 1
+        self.integer_bit = 1 << self.fraction_bits if explicit_bit else 0
+        self.min_quantum = 1 - self.bias - self.fraction_bits
+        # Significand bits, including the integer bit
+        self.precision = self.fraction_bits + 1
+        self.hex_digits = width // 4
+
+    def __repr__(self):
+        return "Format({!r}, {}, {}, {})".format(self.name, self.width, self.exponent_bits,
+                self.bias)
+
+    # Fields
+    def sign(self, bits):
+        return bits >> self.sign_bit
+
+    def exponent(self, bits):
+        """Biased exponent field"""
+        return (bits >> self.exponent_shift) & self.exponent_mask
+
+    def fraction(self, bits):
+        """Fraction field. Not the x87 integer bit"""
+        return bits & self.fraction_mask
+
+    def one(self):
+        """Return the bits of 1.0"""
+        return (self.bias << self.exponent_shift) | self.integer_bit
+
+    def classify(self, bits):
+        """Return ZERO, SUBNORMAL, NORMAL, INFINITE or NAN"""
+        if self is BINARY64:
+            return double64.classify(bits)
+        exponent = self.exponent(bits)
+        fraction = self.fraction(bits)
+        if exponent == 0:
+            # x87 pseudo denormals, with the integer bit set, are values
+            return SUBNORMAL if fraction or bits & self.integer_bit else ZERO
+        if self.explicit_bit and not bits & self.integer_bit:
+            # x87 unnormals, pseudo ∞ and pseudo NaN
+            return NAN
+        if exponent == self.exponent_mask:
+            return NAN if fraction else INFINITE
+        return NORMAL
+
+    def unbiased_exponent(self, bits):
+        """Power of two of the integer bit. 1 - bias for zero and subnormals"""
+        exponent = self.exponent(bits)
+        if exponent == 0:
+            return 1 - self.bias
+        return exponent - self.bias
+
+    def decompose(self, bits):
+        """
+        Return (sign, significand, exponent) of finite bits. The value is
+        (-1)**sign × significand × 2**exponent, the significand an integer.
+        """
+        exponent = self.exponent(bits)
+        significand = bits & (self.fraction_mask | self.integer_bit)
+        if exponent == 0:
+            return self.sign(bits), significand, self.min_quantum
+        return (self.sign(bits), significand | (1 << self.fraction_bits),
+                exponent + self.min_quantum - 1)
+
+    def value_text(self, bits):
+        """
+        Return the shortest decimal text of finite bits that reads back as
+        them in this format. E.g. 0.1 for binary16 0x2E66. As repr() for binary64.
+        """
+        sign, significand, exponent = self.decompose(bits)
+        return double64_decimal.shortest_text(sign, significand, exponent,
+                self.precision, self.min_quantum)
+
+    def exact_chunks(self, bits, size=double64_decimal.CHUNK_DIGITS):
+        """Generator of the exact decimal value of finite bits, size digits at a time"""
+        return double64_decimal.exact_chunks(*self.decompose(bits), size=size)
+
+    def exact_text(self, bits, cancelled=None):
+        """
+        The exact decimal value of finite bits. Cached by double64_decimal.
+        None if the threading.Event cancelled is set first.
+        """
+        return double64_decimal.exact_text(*self.decompose(bits), cancelled=cancelled)
+
+    def describe(self, bits):
+        """
+        Return the text for the value, as double64.describe(). E.g. "+∞"
+        binary64 uses repr(), which is already the shortest round trip.
+        """
+        if self is BINARY64:
+            return double64.describe(bits)
+        sign = "-" if bits >> self.sign_bit else "+"
+        magnitude = bits & ~self.sign_mask
+        kind = self.classify(bits)
+        if kind == ZERO:
+            return sign + "0.0"
+        if kind == INFINITE:
+            return sign + "∞"
+        if kind == NAN:
+            return sign + "NaN"
+        text = self.value_text(bits)
+        if kind == SUBNORMAL:
+            if magnitude == 1:
+                return text + " ~ Min subnormal " + sign + "ve"
+            return text + " ~ Subnormal"
+        if magnitude == self.max():
+            return text + " ~ Max " + sign + "ve"
+        if magnitude == self.min_normal():
+            return text + " ~ Min " + sign + "ve"
+        return text
+
+    def hex(self, bits):
+        return "{:0{}X}".format(bits, self.hex_digits)
+
+    # Limits. Positive
+    def infinity(self):
+        return self.exponent_field_mask | self.integer_bit
+
+    def nan(self):
+        """The quiet NaN with only the top fraction bit set"""
+        return self.infinity() | (1 << (self.fraction_bits - 1))
+
+    def max(self):
+        return ((self.exponent_mask - 1) << self.exponent_shift) | self.integer_bit \
+                | self.fraction_mask
+
+    def exponent_preset_mask(self):
+        """The bits an exponent preset sets. With the x87 integer bit, which follows the exponent"""
+        return self.exponent_field_mask | self.integer_bit
+
+    def min_normal(self):
+        return (1 << self.exponent_shift) | self.integer_bit
+
+    # Steps between neighbouring values
+    def _ordered(self, bits):
+        """The bits without the x87 integer bit, signed. Neighbouring values differ by 1"""
+        magnitude = bits & ~self.sign_mask
+        if self.explicit_bit:
+            magnitude = ((magnitude >> self.exponent_shift) << self.fraction_bits) \
+                    | self.fraction(magnitude)
+        return -magnitude if bits >> self.sign_bit else magnitude
+
+    def _from_ordered(self, ordered):
+        sign = self.sign_mask if ordered < 0 else 0
+        magnitude = abs(ordered)
+        if self.explicit_bit:
+            exponent = magnitude >> self.fraction_bits
+            magnitude = (exponent << self.exponent_shift) | self.fraction(magnitude) \
+                    | (self.integer_bit if exponent else 0)
+        return sign | magnitude
+
+    def step_ulps(self, bits, count):
+        """Return the bits count values above bits, or below if count is negative. See double64"""
+        if self is BINARY64:
+            return double64.step_ulps(bits, count)
+        if self.classify(bits) == NAN:
+            return bits
+        limit = self._ordered(self.infinity())
+        return self._from_ordered(min(max(self._ordered(bits) + count, -limit), limit))
+
+    # Encoding
+    def round_fraction(self, value):
+        """Return the bits of the Fraction value rounded to nearest, half way to even"""
+        sign = self.sign_mask if value < 0 else 0
+        value = abs(value)
+        if value == 0:
+            return sign
+        numerator, denominator = value.numerator, value.denominator
+        # Power of two of the leading bit, and of the last place kept
+        top = numerator.bit_length() - denominator.bit_length()
+        if numerator << max(0, -top) < denominator << max(0, top):
+            top -= 1
+        quantum = max(top - self.fraction_bits, self.min_quantum)
+        # significand = value / 2**quantum, rounded
+        if quantum >= 0:
+            kept, remainder = divmod(numerator, denominator << quantum)
+            half = denominator << quantum
+        else:
+            kept, remainder = divmod(numerator << -quantum, denominator)
+            half = denominator
+        if 2 * remainder > half or (2 * remainder == half and kept & 1):
+            kept += 1
+        # As double64_arith.round_exact(). A carry moves into the exponent field
+        magnitude = ((quantum - self.min_quantum) << self.fraction_bits) + kept
+        if magnitude >= self.exponent_mask << self.fraction_bits:
+            return sign | self.infinity()
+        if self.explicit_bit:
+            return sign | self._from_ordered(magnitude)
+        return sign | magnitude
+
+    def encode(self, text):
+        """
+        Return the bits of the value nearest to the number in text, as
+        double64.encode(). Decimal, integer, hex float, "inf" or "nan".
+        Raise ValueError if text is not a number.
+        """
+        if self is BINARY64:
+            return double64.encode(text)
+        text = "".join(text.split())
+        sign = self.sign_mask if text.startswith("-") else 0
+        unsigned = text.lstrip("+-").lower()
+        if unsigned in ("inf", "infinity"):
+            return sign | self.infinity()
+        if unsigned == "nan":
+            return sign | self.nan()
+        match = HEX_FLOAT.match(text)
+        if match:
+            value = self._hex_value(match)
+        else:
+            value = self._decimal_value(text)
+        if value is None:
+            return sign
+        if value == math.inf:
+            return sign | self.infinity()
+        return sign | self.round_fraction(value)
+
+    def _hex_value(self, match):
+        """The Fraction of a HEX_FLOAT match, without sign. None if it rounds to 0, or math.inf"""
+        whole, point = match.group(2), match.group(3) or ""
+        if not whole and not point:
+            raise ValueError("Not a hex float: {!r}".format(match.group(0)))
+        significand = int(whole + point or "0", 16)
+        power = _exponent(match.group(4) or "0") - 4 * len(point)
+        top = significand.bit_length() + power
+        if not significand or top < self.min_quantum - 1:
+            # Below half the min subnormal
+            return None
+        if top > self.bias + 2:
+            return math.inf
+        return Fraction(significand << power) if power >= 0 else Fraction(significand, 1 << -power)
+
+    def _decimal_value(self, text):
+        """
+        The Fraction of decimal text, without sign. None if it rounds to 0,
+        or math.inf. Digits past those of any half way case are only kept as
+        a sticky 1, so constants of thousands of digits are read quickly.
+        """
+        match = DECIMAL.match(text)
+        if not match or not (match.group(1) or match.group(2)):
+            raise ValueError("Not a number: {!r}".format(text))
+        fraction = match.group(2) or ""
+        digits = (match.group(1) + fraction).lstrip("0")
+        power = _exponent(match.group(3) or "0") - len(fraction)
+        if not digits:
+            return None
+        # The value is below 10**point and at least 10**(point - 1). log10(2) ≈ 0.30103
+        point = power + len(digits)
+        if (point - 1) * 100000 > (self.bias + 2) * 30103:
+            return math.inf
+        if point * 100000 < (self.min_quantum - 2) * 30103:
+            return None
+        limit = self.precision + 4 - self.min_quantum
+        if len(digits) > limit:
+            sticky = digits[limit:].strip("0")
+            power += len(digits) - limit
+            digits = digits[:limit]
+            if sticky:
+                digits += "1"
+                power -= 1
+        significand = _decimal_int(digits)
+        if power >= 0:
+            return Fraction(significand * 10 ** power)
+        return Fraction(significand, 10 ** -power)
+
+    # Presets, as the tables in double_precision.py
+    def special_cases(self):
+        """Return a dict of button label: bits of the special cases"""
+        cases = collections.OrderedDict()
+        for label, bits in (("0", 0), ("∞", self.infinity()), ("NaN", self.infinity() | 1)):
+            cases["+" + label] = bits
+            cases["-" + label] = self.sign_mask | bits
+        for label, bits in (("Max", self.max()), ("Min", self.min_normal())):
+            cases[label + " +"] = bits
+            cases[label + " -"] = self.sign_mask | bits
+        cases["Min subnormal"] = 1
+        # Nearest to the largest 64 bit integer, if in range
+        max_64bit = self.round_fraction(Fraction(1 << 63))
+        if max_64bit != self.infinity():
+            cases["Max +64bit"] = max_64bit
+            cases["Max -64bit"] = self.sign_mask | max_64bit
+        cases["π"] = self.encode(PI_TEXT)
+        return cases
+
+    def exponent_presets(self):
+        """Return a dict of button label: bits of the exponent presets"""
+        digits = (self.exponent_bits + 3) // 4
+        presets = collections.OrderedDict()
+        for label, field in (("1", self.bias), ("2", self.bias + 1), ("Clear", 0),
+                ("All", self.exponent_mask)):
+            presets["{} ~ {:0{}X}₁₆".format(label, field, digits)] = (field << self.exponent_shift) \
+                    | (self.integer_bit if field else 0)
+        return presets
+
+    def fraction_presets(self):
+        """Return a dict of button label: bits of the fraction presets"""
+        # 0101... and 1010..., from the top of the fraction
+        alternate = self.fraction_mask // 3
+        return collections.OrderedDict((
+                (".000...", 0),
+                (".100...", 1 << (self.fraction_bits - 1)),
+                (".111...", self.fraction_mask),
+                (".0101...", alternate),
+                (".1010...", self.fraction_mask ^ alternate),
+                ))
+
+
+BINARY16 = Format("binary16", 16, 5)
+BFLOAT16 = Format("bfloat16", 16, 8)
+BINARY32 = Format("binary32", 32, 8)
+BINARY64 = Format("binary64", 64, 11)
+X87 = Format("x87", 80, 15, explicit_bit=True)
+BINARY128 = Format("binary128", 128, 15)
+
+FORMATS = collections.OrderedDict((fmt.name, fmt) for fmt in
+        (BINARY16, BFLOAT16, BINARY32, BINARY64, X87, BINARY128))
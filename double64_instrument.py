@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+#
+# double64_instrument.py
+#
+# Instrumentation of the display hot paths. Does not import Gtk.
+#
+# Callbacks are wrapped with INSTRUMENT.timed(name). While INSTRUMENT.enabled
+# is False the wrapper only tests that flag and calls through. When enabled,
+# each call appends a record to a fixed size ring buffer:
+#   (name, seconds, label_calls)
+# label_calls is the number of widget set_label() calls made during the call,
+# as counted by INSTRUMENT.count_labels(). summary() reports the records.
+#
+import collections
+import functools
+import logging
+import time
+
+log = logging.getLogger("double_precision")
+
+Record = collections.namedtuple("Record", ["name", "seconds", "label_calls"])
+
+
+class Instrument:
+    """Per call latency and set_label() counts kept in a ring buffer"""
+
+    def __init__(self, size=4096):
+        self.enabled = False
+        self.records = collections.deque(maxlen=size)
+        self.label_calls = 0
+
+    def timed(self, name):
+        """Decorator. Record the time and set_label() calls of each call when enabled"""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                label_calls = self.label_calls
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    seconds = time.perf_counter() - start
+                    record = Record(name, seconds, self.label_calls - label_calls)
+                    self.records.append(record)
+                    log.debug("%s %.1f µs %d labels", name, seconds * 1e6,
+                            record.label_calls)
+            return wrapper
+        return decorator
+
+    def count_labels(self, count=1):
+        """Add count widget set_label() calls"""
+        if self.enabled:
+            self.label_calls += count
+
+    def start(self):
+        """Clear the records and start recording"""
+        self.records.clear()
+        self.label_calls = 0
+        self.enabled = True
+
+    def stop(self):
+        """Stop recording. The records are kept for summary()"""
+        self.enabled = False
+
+    def summary(self):
+        """Return lines of count, mean, 95th percentile and max latency, and labels per call"""
+        by_name = collections.OrderedDict()
+        for record in self.records:
+            by_name.setdefault(record.name, []).append(record)
+
+        lines = ["{:24} {:>7} {:>10} {:>10} {:>10} {:>8}".format(
+                "Name", "Calls", "Mean µs", "95% µs", "Max µs", "Labels")]
+        for name, records in by_name.items():
+            seconds = sorted(record.seconds for record in records)
+            count = len(seconds)
+            lines.append("{:24} {:7d} {:10.1f} {:10.1f} {:10.1f} {:8.1f}".format(
+                    name, count,
+                    sum(seconds) / count * 1e6,
+                    seconds[min(count - 1, int(count * 0.95))] * 1e6,
+                    seconds[-1] * 1e6,
+                    sum(record.label_calls for record in records) / count))
+        if len(self.records) == self.records.maxlen:
+            lines.append("Only the last {} calls are kept".format(self.records.maxlen))
+        return lines
+
+
+# Shared by the window and its callbacks.
+INSTRUMENT = Instrument()
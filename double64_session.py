@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+#
+# double64_session.py
+#
+# Save and reload the register frames of double_precision.py as a binary
+# session file. Does not import Gtk.
+#
+# Layout. All little endian, the arrays 8 byte aligned:
+#   header     64 bytes. See HEADER
+#   registers  count × words uint64. Registers wider than 64 bits, e.g. x87,
+#              are words uint64 each, least significant first
+#   history    history_count × words uint64. The XOR of each undo step of the
+#              window. See double64.History
+#   indices    history_count bytes. The register of each undo step
+#   labels     labels_size bytes of UTF-8. The frame labels, one per line
+#
+# The file is written by one buffered stream of the whole session, to a
+# temporary file that then replaces the old one, so a failed or cancelled save
+# leaves the old session. It is reopened through mmap and the arrays are copied
+# straight out of the map, so a session with a history of millions of steps
+# loads in milliseconds.
+#
+# save() and load() may be run in a worker thread. They call progress(fraction)
+# after each CHUNK_SIZE bytes, and raise Cancelled once the cancelled
+# threading.Event is set.
+#
+import collections
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+MAGIC = b"DBL64SES"
+VERSION = 2
+SUFFIX = ".d64s"
+CHUNK_SIZE = 1 << 22
+
+# magic, version, reserved, format name, register count, uint64 words per
+# register, selected register, labels size, history count, history position
+HEADER = struct.Struct("<8sHH16sIII3Q")
+
+# format     name of the double64_formats.Format. E.g. "binary64"
+# registers  list of the register values as ints
+# selected   index of the selected frame
+# labels     list of the frame labels
+# history    array('Q') of the XOR of each undo step, oldest first
+# indices    array('B') of the register of each undo step
+# position   number of the steps in history that are done. The rest are redo steps
+Session = collections.namedtuple("Session",
+        ["format", "registers", "selected", "labels", "history", "indices", "position"])
+
+
+class Cancelled(Exception):
+    """The save or load was cancelled"""
+
+
+def _check(done, total, progress, cancelled):
+    """Report progress, and stop if cancelled"""
+    if cancelled is not None and cancelled.is_set():
+        raise Cancelled("Cancelled after {} of {} bytes".format(done, total))
+    if progress is not None:
+        progress(done / total if total else 1.0)
+
+
+def _words(registers, words):
+    """Return array('Q') of the registers, words uint64 each, least significant first"""
+    if words == 1 and isinstance(registers, array):
+        return array("Q", registers)
+    packed = array("Q")
+    mask = (1 << 64) - 1
+    for value in registers:
+        packed.extend((value >> (64 * i)) & mask for i in range(words))
+    return packed
+
+
+def _little_endian(packed):
+    """The bytes of array('Q') packed, little endian"""
+    if sys.byteorder == "big":
+        packed = array("Q", packed)
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def save(filename, session, width=64, progress=None, cancelled=None):
+    """
+    Write session to filename. width is the bits of each register.
+    Raise OSError if the file cannot be written, Cancelled if cancelled is set,
+    and ValueError if the history and indices differ in length.
+    """
+    words = (width + 63) // 64
+    history = session.history if isinstance(session.history, array) \
+            else array("Q", session.history)
+    indices = bytes(session.indices)
+    if len(history) != len(indices) * words:
+        raise ValueError("History of {} words for {} steps".format(len(history), len(indices)))
+    labels = "\n".join(session.labels).encode("utf-8")
+    header = HEADER.pack(MAGIC, VERSION, 0, session.format.encode("ascii"),
+            len(session.registers), words, session.selected,
+            len(labels), len(indices), session.position)
+    data = b"".join((header, _little_endian(_words(session.registers, words)),
+            _little_endian(history), indices, labels))
+
+    # A name of its own, as a cancelled save may still be running
+    handle, temporary = tempfile.mkstemp(suffix=".tmp", prefix=os.path.basename(filename) + ".",
+            dir=os.path.dirname(os.path.abspath(filename)))
+    view = memoryview(data)
+    try:
+        with os.fdopen(handle, "wb") as fout:
+            for start in range(0, len(view), CHUNK_SIZE):
+                _check(start, len(view), progress, cancelled)
+                fout.write(view[start:start + CHUNK_SIZE])
+        os.replace(temporary, filename)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    _check(len(view), len(view), progress, None)
+
+
+def _array_at(view, offset, count, progress=None, cancelled=None):
+    """Return array('Q') of count little endian uint64 at offset of the buffer view"""
+    values = array("Q")
+    end = offset + 8 * count
+    for start in range(offset, end, CHUNK_SIZE):
+        _check(start, len(view), progress, cancelled)
+        values.frombytes(view[start:min(start + CHUNK_SIZE, end)])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def load(filename, progress=None, cancelled=None):
+    """
+    Return the Session in filename. Raise ValueError if it is not a session
+    file, or is cut short, OSError if it cannot be read, and Cancelled if
+    cancelled is set.
+    """
+    with open(filename, "rb") as fin:
+        if os.fstat(fin.fileno()).st_size < HEADER.size:
+            raise ValueError("{} is not a session file".format(filename))
+        with mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            (magic, version, _, name, count, words, selected,
+                    labels_size, history_count, position) = HEADER.unpack_from(view)
+            if magic != MAGIC:
+                raise ValueError("{} is not a session file".format(filename))
+            if version != VERSION:
+                raise ValueError("{} is session version {}. Version {} is read".format(
+                        filename, version, VERSION))
+            history_offset = HEADER.size + 8 * count * words
+            indices_offset = history_offset + 8 * history_count * words
+            labels_offset = indices_offset + history_count
+            if len(view) < labels_offset + labels_size:
+                raise ValueError("{} is cut short".format(filename))
+
+            packed = _array_at(view, HEADER.size, count * words)
+            history = _array_at(view, history_offset, history_count * words,
+                    progress, cancelled)
+            indices = array("B", view[indices_offset:labels_offset])
+            labels = view[labels_offset:labels_offset + labels_size].decode("utf-8")
+
+    if words == 1:
+        registers = packed.tolist()
+    else:
+        registers = [sum(packed[i * words + j] << (64 * j) for j in range(words))
+                for i in range(count)]
+    return Session(name.rstrip(b"\0").decode("ascii"), registers, selected,
+            labels.split("\n") if labels else [], history, indices,
+            min(position, history_count))
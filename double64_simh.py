@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+#
+# double64_simh.py
+#
+# Read the console log of the simh Alpha double-precision script, and check
+# each conversion against the host. Does not import Gtk.
+#
+#   alpha double-precision | python3 double64_simh.py
+#   python3 double64_simh.py console.log [--all]
+#
+# After each CVTQT the script prints the registers:
+#   F0:	FFFFFFFFFFFFFFFD        quadword integer
+#   F1:	C008000000000000        F0 converted to T_floating
+# Each F0 line followed by an F1 line is a conversion. F1 is checked against
+# the host's conversion of the signed 64 bit integer in F0 to the nearest
+# double. Other lines are skipped.
+#
+# The log is read one line at a time, so a log of millions of lines is checked
+# in constant memory. With NumPy, main() checks the conversions a chunk of
+# CHUNK_SIZE at a time, collected into arrays by chunks(). Without it, one at
+# a time by check().
+#
+# Output is tab separated, one line per mismatch, or every conversion with --all:
+#   line  F0  F1  expected  ok
+#
+import argparse
+import collections
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    # The conversions are then checked one at a time
+    np = None
+
+from double64 import float_to_bits, SIGN_BIT, BITS_MASK
+from double64_cli import REGISTER_LINE, read_lines
+
+# line      line number of F1 in the log, from 1
+# f0        the quadword integer, as 64 bits
+# f1        the T_floating result, as 64 bits
+Conversion = collections.namedtuple("Conversion", ["line", "f0", "f1"])
+
+CHUNK_SIZE = 65536
+
+
+def cvtqt(quadword):
+    """
+    Return the 64 bits of the double nearest to the signed 64 bit integer
+    quadword, as CVTQT with the default rounding, to nearest even.
+    """
+    quadword &= BITS_MASK
+    if quadword >> SIGN_BIT:
+        quadword -= 1 << 64
+    # int to float is correctly rounded, half way cases to even
+    return float_to_bits(float(quadword))
+
+
+def read_conversions(lines):
+    """Generator of the Conversion of each F0 line followed by an F1 line"""
+    f0 = None
+    for number, line in enumerate(lines, 1):
+        match = REGISTER_LINE.match(line)
+        if not match:
+            continue
+        register, bits = match.group(1), int(match.group(2), 16)
+        if register == "F0":
+            f0 = bits
+        elif register == "F1" and f0 is not None:
+            yield Conversion(number, f0, bits)
+            f0 = None
+
+
+def chunks(conversions, size=CHUNK_SIZE):
+    """
+    Generator of (lines, f0, f1) array('Q') of up to size conversions each.
+    Only one chunk is held at a time.
+    """
+    lines, f0, f1 = array("Q"), array("Q"), array("Q")
+    for conversion in conversions:
+        lines.append(conversion.line)
+        f0.append(conversion.f0)
+        f1.append(conversion.f1)
+        if len(lines) >= size:
+            yield lines, f0, f1
+            lines, f0, f1 = array("Q"), array("Q"), array("Q")
+    if lines:
+        yield lines, f0, f1
+
+
+def check(conversions, convert=cvtqt):
+    """Generator of (conversion, expected F1) for each conversion"""
+    for conversion in conversions:
+        yield conversion, convert(conversion.f0)
+
+
+def check_chunks(conversions, size=CHUNK_SIZE):
+    """
+    Generator of (lines, f0, f1, expected) uint64 NumPy arrays of up to size
+    conversions. expected is the host CVTQT of f0, as check(). Requires NumPy.
+    """
+    for lines, f0, f1 in chunks(conversions, size):
+        f0 = np.frombuffer(f0, dtype=np.uint64)
+        # int64 to float64 is correctly rounded, half way cases to even, as cvtqt()
+        expected = f0.view(np.int64).astype(np.float64).view(np.uint64)
+        yield (np.frombuffer(lines, dtype=np.uint64), f0, np.frombuffer(f1, dtype=np.uint64),
+                expected)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the F0/F1 conversions in a simh "
+            "Alpha console log of the double-precision script against the host")
+    parser.add_argument("files", nargs="*", metavar="FILE",
+            help="Logs to read. Default, or -, is stdin")
+    parser.add_argument("--all", action="store_true",
+            help="Output every conversion, not only mismatches")
+    args = parser.parse_args(argv)
+
+    write = sys.stdout.write
+    count = mismatches = 0
+
+    def write_row(line, f0, f1, expected):
+        write("{}\t{:016X}\t{:016X}\t{:016X}\t{}\n".format(line, f0, f1, expected,
+                "ok" if f1 == expected else "MISMATCH"))
+
+    conversions = read_conversions(read_lines(args.files))
+    try:
+        if np is None:
+            for conversion, expected in check(conversions):
+                count += 1
+                if conversion.f1 != expected:
+                    mismatches += 1
+                if args.all or conversion.f1 != expected:
+                    write_row(conversion.line, conversion.f0, conversion.f1, expected)
+        else:
+            for lines, f0, f1, expected in check_chunks(conversions):
+                wrong = f1 != expected
+                count += len(lines)
+                mismatches += int(wrong.sum())
+                shown = slice(None) if args.all else wrong
+                for row in zip(lines[shown].tolist(), f0[shown].tolist(), f1[shown].tolist(),
+                        expected[shown].tolist()):
+                    write_row(*row)
+    except BrokenPipeError:
+        sys.stderr.close()
+        return 0
+    except OSError as err:
+        print("double64_simh:", err, file=sys.stderr)
+        return 1
+    print("{} conversions, {} mismatches".format(count, mismatches), file=sys.stderr)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+#
+# double64_sweep.py
+#
+# Exhaustive sweep of slices of the 2**64 patterns, for validation of the
+# decoding rules. Does not import Gtk.
+#
+#   python3 double64_sweep.py exponent 3FF          # Both signs, all 2**52 fractions
+#   python3 double64_sweep.py top-half              # All 2**32 upper 32 bit patterns
+#   python3 double64_sweep.py range BASE SHIFT COUNT
+#
+# The patterns of a sweep are BASE | (i << SHIFT) for i in 0 to COUNT - 1.
+# Each pattern is classified with double64_batch.classify_array() and checked:
+#   class       against the hardware: value == 0, isinf, isnan and below the
+#               minimum normal.
+#   round trip  bits -> Python float -> bits gives the same bits.
+# The patterns ieee754_breakdown() labels, zero, ∞, Max, Min and Min subnormal,
+# are counted by their label.
+#
+# The sweep is split into chunks, decoded by NumPy in a pool of processes.
+# Progress is written to stderr. With --checkpoint the totals are saved as
+# chunks complete, and a later run with the same checkpoint file resumes.
+#
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from double64 import (describe, classify, FRACTION_BITS, EXPONENT_MASK, SIGN_MASK,
+        BITS_MASK)
+from double64_batch import (classify_array, ordered_map, CLASS_NAMES, CLASS_ZERO,
+        CLASS_SUBNORMAL, CLASS_NORMAL, CLASS_INFINITE, CLASS_NAN)
+
+CHUNK_SIZE = 1 << 22
+# Mismatching patterns kept as examples
+EXAMPLES = 10
+
+MIN_NORMAL = 2.2250738585072014e-308
+
+# Magnitudes of the patterns ieee754_breakdown() labels. Counted with either sign.
+LABELLED = [
+    0x0000000000000000,     # ±0.0
+    0x7FF0000000000000,     # ±∞
+    0x7FEFFFFFFFFFFFFF,     # Max
+    0x0010000000000000,     # Min
+    0x0000000000000001,     # Min subnormal
+    ]
+
+
+def sweep_chunk(base, shift, start, count):
+    """
+    Worker. Classify and check patterns base | (i << shift) for i in start to
+    start + count - 1. Return a dict of counts and examples of mismatches.
+    """
+    index = np.arange(start, start + count, dtype=np.uint64)
+    bits = np.uint64(base) | (index << np.uint64(shift))
+    kind = classify_array(bits)
+    value = bits.view(np.float64)
+
+    # The hardware's classification of the same bits
+    hardware = np.full(kind.shape, CLASS_NORMAL, dtype=np.uint8)
+    magnitude = np.abs(value)
+    hardware[magnitude < MIN_NORMAL] = CLASS_SUBNORMAL
+    hardware[value == 0] = CLASS_ZERO
+    hardware[np.isinf(value)] = CLASS_INFINITE
+    hardware[np.isnan(value)] = CLASS_NAN
+    class_mismatch = bits[kind != hardware]
+
+    # Through Python floats and back
+    round_trip = np.array(value.tolist(), dtype=np.float64).view(np.uint64)
+    round_trip_mismatch = bits[round_trip != bits]
+
+    labelled = {}
+    unsigned = bits & np.uint64(~SIGN_MASK & BITS_MASK)
+    for pattern in LABELLED:
+        found = bits[unsigned == np.uint64(pattern)]
+        for word in found.tolist():
+            label = describe(word)
+            labelled[label] = labelled.get(label, 0) + 1
+
+    return {
+        "patterns": count,
+        "classes": dict(zip(CLASS_NAMES, np.bincount(kind, minlength=len(CLASS_NAMES)).tolist())),
+        "labelled": labelled,
+        "class_mismatches": int(class_mismatch.size),
+        "round_trip_mismatches": int(round_trip_mismatch.size),
+        "examples": ["{:016X}".format(word) for word in
+                class_mismatch[:EXAMPLES].tolist() + round_trip_mismatch[:EXAMPLES].tolist()],
+        }
+
+
+def add_totals(totals, result):
+    """Add the counts of one chunk's result into totals"""
+    totals["patterns"] += result["patterns"]
+    for key in ("classes", "labelled"):
+        for name, count in result[key].items():
+            totals[key][name] = totals[key].get(name, 0) + count
+    totals["class_mismatches"] += result["class_mismatches"]
+    totals["round_trip_mismatches"] += result["round_trip_mismatches"]
+    examples = totals["examples"]
+    examples.extend(result["examples"][:EXAMPLES - len(examples)])
+
+
+def new_totals():
+    return {"patterns": 0, "classes": {}, "labelled": {}, "class_mismatches": 0,
+            "round_trip_mismatches": 0, "examples": []}
+
+
+def load_checkpoint(filename, spec):
+    """Return (next chunk, totals) saved in filename for spec, or (0, empty totals)"""
+    try:
+        with open(filename) as fin:
+            checkpoint = json.load(fin)
+    except FileNotFoundError:
+        return 0, new_totals()
+    if checkpoint["spec"] != spec:
+        raise ValueError("Checkpoint {} is for a different sweep: {}".format(
+                filename, checkpoint["spec"]))
+    return checkpoint["next_chunk"], checkpoint["totals"]
+
+
+def save_checkpoint(filename, spec, next_chunk, totals):
+    """Write the checkpoint to a temporary file, then replace, so it is never partial"""
+    temporary = filename + ".tmp"
+    with open(temporary, "w") as fout:
+        json.dump({"spec": spec, "next_chunk": next_chunk, "totals": totals}, fout)
+    os.replace(temporary, filename)
+
+
+def sweep(base, shift, count, workers=None, chunk_size=CHUNK_SIZE, checkpoint=None,
+        checkpoint_seconds=30, progress=sys.stderr):
+    """Sweep patterns base | (i << shift) for i below count. Return the totals"""
+    if base & ~BITS_MASK or shift > 63 or count < 1 or (count - 1) << shift > BITS_MASK:
+        raise ValueError("Sweep is outside the 64 bit patterns")
+    if base & (((1 << (count - 1).bit_length()) - 1) << shift):
+        raise ValueError("Base has bits set in the swept field")
+    spec = {"base": base, "shift": shift, "count": count, "chunk_size": chunk_size}
+    chunks = (count + chunk_size - 1) // chunk_size
+    next_chunk, totals = 0, new_totals()
+    if checkpoint:
+        next_chunk, totals = load_checkpoint(checkpoint, spec)
+
+    workers = workers or os.cpu_count() or 1
+    start_time = time.perf_counter()
+    saved_time = start_time
+    # Patterns swept by this run, for the rate. The last chunk may be short
+    swept = 0
+    saved_chunk = next_chunk
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        starts = ((chunk * chunk_size, min(chunk_size, count - chunk * chunk_size))
+                for chunk in range(next_chunk, chunks))
+        try:
+            for result in ordered_map(executor, run_chunk, starts, workers * 2, base, shift):
+                add_totals(totals, result)
+                next_chunk += 1
+                swept += result["patterns"]
+                now = time.perf_counter()
+                if checkpoint and (now - saved_time >= checkpoint_seconds
+                        or next_chunk == chunks):
+                    save_checkpoint(checkpoint, spec, next_chunk, totals)
+                    saved_time, saved_chunk = now, next_chunk
+                if progress:
+                    rate = swept / (now - start_time)
+                    progress.write("\r{}/{} chunks  {:.0f} M patterns/minute  ".format(
+                            next_chunk, chunks, rate * 60 / 1e6))
+                    progress.flush()
+        finally:
+            # E.g. on Ctrl-C. Keep the chunks done since the last save
+            if checkpoint and next_chunk > saved_chunk:
+                save_checkpoint(checkpoint, spec, next_chunk, totals)
+    if progress:
+        progress.write("\n")
+    return totals
+
+
+def run_chunk(start_count, base, shift):
+    """Worker. sweep_chunk() with the (start, count) of a chunk"""
+    start, count = start_count
+    return sweep_chunk(base, shift, start, count)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exhaustively classify slices of the "
+            "64 bit patterns and check them against the hardware")
+    subparsers = parser.add_subparsers(dest="sweep", required=True)
+    exponent = subparsers.add_parser("exponent", help="Every pattern with an exponent field")
+    exponent.add_argument("field", help="Exponent field in hex, 000 to 7FF")
+    exponent.add_argument("--sign", choices=["+", "-", "both"], default="both")
+    subparsers.add_parser("top-half", help="All 2**32 patterns of the upper 32 bits")
+    general = subparsers.add_parser("range", help="Patterns BASE | (i << SHIFT), i < COUNT")
+    general.add_argument("base", help="Hex")
+    general.add_argument("shift", type=int)
+    general.add_argument("count", type=lambda text: int(text, 0))
+    for subparser in subparsers.choices.values():
+        subparser.add_argument("--workers", type=int, help="Processes. Default, all cores")
+        subparser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        subparser.add_argument("--checkpoint", metavar="FILE",
+                help="Save progress to FILE, and resume from it")
+        subparser.add_argument("--json", action="store_true", help="Print the totals as JSON")
+    args = parser.parse_args(argv)
+
+    if args.sweep == "exponent":
+        field = int(args.field, 16)
+        if field > EXPONENT_MASK:
+            parser.error("Exponent field is 000 to 7FF")
+        base = field << FRACTION_BITS
+        if args.sign == "both":
+            # One sweep of the fraction for each sign, set in the base
+            sweeps = [(base, 0, 1 << FRACTION_BITS), (base | SIGN_MASK, 0, 1 << FRACTION_BITS)]
+        else:
+            sweeps = [(base | (SIGN_MASK if args.sign == "-" else 0), 0, 1 << FRACTION_BITS)]
+    elif args.sweep == "top-half":
+        sweeps = [(0, 32, 1 << 32)]
+    else:
+        sweeps = [(int(args.base, 16), args.shift, args.count)]
+
+    totals = new_totals()
+    try:
+        for number, (base, shift, count) in enumerate(sweeps):
+            checkpoint = args.checkpoint
+            if checkpoint and len(sweeps) > 1:
+                checkpoint += ".{}".format(number)
+            add_totals(totals, sweep(base, shift, count, args.workers, args.chunk_size,
+                    checkpoint))
+    except (OSError, ValueError) as err:
+        print("double64_sweep:", err, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("\nInterrupted. Run again with the same --checkpoint to resume",
+                file=sys.stderr)
+        return 130
+
+    if args.json:
+        print(json.dumps(totals, indent=2, ensure_ascii=False))
+    else:
+        print("Patterns:", totals["patterns"])
+        for name in CLASS_NAMES:
+            print("  {:10} {}".format(name, totals["classes"].get(name, 0)))
+        for label, count in sorted(totals["labelled"].items()):
+            print("  {:40} {}".format(label, count))
+        print("Class mismatches:", totals["class_mismatches"])
+        print("Round trip mismatches:", totals["round_trip_mismatches"])
+        for example in totals["examples"]:
+            print("  {} {}".format(example, classify(int(example, 16))))
+    mismatches = totals["class_mismatches"] + totals["round_trip_mismatches"]
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
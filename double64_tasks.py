@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+#
+# double64_tasks.py
+#
+# Background jobs of double_precision.py in a pool of worker threads. Does not
+# import Gtk.
+#
+# Each job has a key, e.g. "decimal" for the exact digits of the selected
+# frame. A job submitted with the key of a job not yet finished supersedes it.
+# The old job is cancelled if it has not started, and if it has, its
+# cancelled threading.Event is set and its result is dropped. So after a click
+# on another bit only the digits of the new value are shown.
+#
+# Results are passed back by deliver(function, *args), which the window sets
+# to GLib.idle_add, so on_done(result, error) is called from the main loop and
+# may use Gtk. Without deliver on_done is called in the worker thread. A job
+# with on_progress, e.g. reading or writing a file, passes its progress back
+# the same way, in steps of PROGRESS_STEP.
+#
+# The jobs are big integer arithmetic and NumPy scans. NumPy releases the GIL,
+# and the GIL is switched every few milliseconds otherwise, so the window keeps
+# repainting while a job runs.
+#
+import concurrent.futures
+import functools
+import os
+import threading
+
+WORKERS = min(4, os.cpu_count() or 1)
+# Smaller steps of progress are not passed back
+PROGRESS_STEP = 0.01
+
+
+class Job:
+    """A job of a TaskPool. See TaskPool.submit()"""
+    __slots__ = ("key", "on_done", "on_progress", "shown", "cancelled", "future")
+
+    def __init__(self, key, on_done, on_progress=None):
+        self.key = key
+        self.on_done = on_done
+        self.on_progress = on_progress
+        # Last fraction passed back. See TaskPool.submit()
+        self.shown = -1.0
+        self.cancelled = threading.Event()
+        self.future = None
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class TaskPool:
+    """
+    Run jobs in worker threads. Only the latest job of each key delivers
+    its result.
+    """
+    def __init__(self, deliver=None, workers=WORKERS):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                thread_name_prefix="double64")
+        self.deliver = deliver
+        # key: the Job to deliver
+        self.latest = {}
+        self.lock = threading.Lock()
+
+    def submit(self, key, function, *args, on_done, on_progress=None):
+        """
+        Run function(cancelled, *args) in a worker thread, then on_done(result,
+        error) by deliver. error is the exception raised, or None. cancelled is
+        a threading.Event set when the job is superseded, so a long job may stop.
+        With on_progress the function is run as function(cancelled, progress,
+        *args). It may call progress(fraction), or progress(None) when the size
+        of the work is not known, and on_progress(fraction) is called by deliver.
+        Return the Job.
+        """
+        job = Job(key, on_done, on_progress)
+        with self.lock:
+            previous = self.latest.get(key)
+            if previous is not None:
+                previous.cancel()
+            self.latest[key] = job
+        job.future = self.executor.submit(self._run, job, function, args)
+        return job
+
+    def cancel(self, key):
+        """Cancel the job of key, if any. Its on_done is not called"""
+        with self.lock:
+            job = self.latest.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def busy(self, key):
+        """True if a job of key has not yet delivered"""
+        with self.lock:
+            return key in self.latest
+
+    def shutdown(self):
+        """Cancel every job. Jobs running finish in the background, undelivered"""
+        with self.lock:
+            jobs = list(self.latest.values())
+            self.latest.clear()
+        for job in jobs:
+            job.cancel()
+        self.executor.shutdown(wait=False)
+
+    def _run(self, job, function, args):
+        """In the worker thread"""
+        if job.cancelled.is_set():
+            return
+        if job.on_progress is not None:
+            args = (functools.partial(self._progress, job),) + args
+        try:
+            result, error = function(job.cancelled, *args), None
+        except Exception as err:
+            result, error = None, err
+        if job.cancelled.is_set():
+            return
+        if self.deliver is None:
+            self._finish(job, result, error)
+        else:
+            self.deliver(self._finish, job, result, error)
+
+    def _progress(self, job, fraction):
+        """In the worker thread. Each None is passed back, fractions in PROGRESS_STEP steps"""
+        if job.cancelled.is_set():
+            return
+        if fraction is not None:
+            if fraction - job.shown < PROGRESS_STEP:
+                return
+            job.shown = fraction
+        if self.deliver is None:
+            self._show_progress(job, fraction)
+        else:
+            self.deliver(self._show_progress, job, fraction)
+
+    def _show_progress(self, job, fraction):
+        """By deliver. Dropped once the job is superseded"""
+        with self.lock:
+            current = self.latest.get(job.key) is job
+        if current:
+            job.on_progress(fraction)
+        return False
+
+    def _finish(self, job, result, error):
+        """By deliver. False, so GLib.idle_add does not repeat it"""
+        with self.lock:
+            if self.latest.get(job.key) is not job:
+                # Superseded after the result was passed back
+                return False
+            del self.latest[job.key]
+        job.on_done(result, error)
+        return False
@@ -13,15 +13,45 @@
 # https://en.wikipedia.org/wiki/Double-precision_floating-point_format
 # https://class.ece.iastate.edu/arun/Cpre305/ieee754/ie5.html
 #
+# Command line decoding, without Gtk:
+#   python3 -m double_precision decode [FILE ...]
+#
 # Ian Stewart. May 2021.
 #
+import sys
+import time
+
+# Start of the program. Used to report the time to the first frame.
+START_TIME = time.perf_counter()
+
+if __name__ == "__main__" and sys.argv[1:2] == ["decode"]:
+    # Decode from the command line. Exits before Gtk is imported.
+    import double64_cli
+    sys.exit(double64_cli.main(sys.argv[2:]))
+
 import gi
 gi.require_version('GdkPixbuf', '2.0')
+gi.require_version('Gdk', '3.0')
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, GdkPixbuf
-import time
+gi.require_version("Pango", "1.0")
+from gi.repository import Gtk, Gdk, GdkPixbuf, GLib, Pango
+import argparse
 import base64
-import sys
+import itertools
+import logging
+import os
+import struct
+import tempfile
+import zlib
+
+from double64_instrument import INSTRUMENT
+import double64_arith
+import double64_decimal
+import double64_session
+import double64_simh
+from double64_tasks import TaskPool
+from double64 import RegisterFile, History
+from double64_formats import FORMATS, BINARY64, INFINITE, NAN
 
 # The following constants are used by the string variable 'glade_xml'.
 AUTHOR = "Ian Stewart"
@@ -34,28 +64,144 @@ DATE = "2021-05-12"
 TITLE = "Double Precision Modelling"
 LABEL = "Modelling Double Precision / 64 Bit / IEEE754 Floating Point Data"
 
-# DEBUG will display data to the console
+# The "double_precision" logger reports to the console at INFO level. DEBUG
+# adds the data of each callback.
 DEBUG = False
-# TESTING allows aspects of the Headerbar buttons to be functional.
-TESTING = True
+log = logging.getLogger("double_precision")
+
+# FAST_START shows the window with F0 only. The other register frames and the
+# adjustment panels are built once the first frame has been drawn, one per
+# idle call. See setup_deferred()
+FAST_START = True
+
+# Number of 64 bit register frames. F0 to F31, as the Alpha floating point registers.
+REGISTER_COUNT = 32
+
+# Files opened as simh console logs. Other files are opened as binary dumps.
+SIMH_LOG_SUFFIXES = (".log", ".txt")
+
+# Presets. Button label: 64 bit pattern. Applied to the selected main frame in one
+# write. SPECIAL_CASES replace the whole 64 bits. EXPONENT_PRESETS are masked to
+# the exponent field and FRACTION_PRESETS to the fraction, so the other bits are kept.
+SPECIAL_CASES = {
+    # 0 00000000000 0000000000000000000000000000000000000000000000000000 +0
+    "+0": 0x0000000000000000,
+    # 1 00000000000 0000000000000000000000000000000000000000000000000000 -0
+    "-0": 0x8000000000000000,
+    # 0 11111111111 0000000000000000000000000000000000000000000000000000 +∞
+    "+∞": 0x7FF0000000000000,
+    # 1 11111111111 0000000000000000000000000000000000000000000000000000 -∞
+    "-∞": 0xFFF0000000000000,
+    # Nan - Can be anything in the fraction field ?
+    # 0 11111111111 0000000000000000000000000000000000000000000000000001 +NaN
+    "+NaN": 0x7FF0000000000001,
+    # 1 11111111111 0000000000000000000000000000000000000000000000000001 -NaN
+    "-NaN": 0xFFF0000000000001,
+    # 0 11111111110 1111111111111111111111111111111111111111111111111111 Max +ve
+    # 1.7976931348623157 × 10**308
+    "Max +": 0x7FEFFFFFFFFFFFFF,
+    # 1 11111111110 1111111111111111111111111111111111111111111111111111 Max -ve
+    "Max -": 0xFFEFFFFFFFFFFFFF,
+    # 0 00000000001 0000000000000000000000000000000000000000000000000000 
+    # ≙ +2**−1022 × 1 ≈ 2.2250738585072014 × 10** −308 (Min. normal positive double)
+    "Min +": 0x0010000000000000,
+    # 1 00000000001 0000000000000000000000000000000000000000000000000000 
+    "Min -": 0x8010000000000000,
+    # 0 00000000000 0000000000000000000000000000000000000000000000000001 
+    # ≙ +2**−1074 ≈ 4.9406564584124654 × 10** −324 (Min. subnormal positive double)
+    "Min subnormal": 0x0000000000000001,
+    # 0 10000111110 0000000000000000000000000000000000000000000000000000 
+    # 7FFF FFFF FFFF FFFF Maximum positive 64bit signed integer                              
+    "Max +64bit": 0x43E0000000000000,
+    # 1 10000111110 0000000000000000000000000000000000000000000000000000
+    # 8000 0000 0000 0000 Maximum negative 64bit signed integer        
+    "Max -64bit": 0xC3E0000000000000,
+    # 0 10000000000 1001001000011111101101010100010001000010110100011000 ≈ pi
+    "π": 0x400921FB54442D18,
+    }
+
+EXPONENT_PRESETS = {
+    "1 ~ 3FF₁₆": 0x3FF0000000000000,
+    "2 ~ 400₁₆": 0x4000000000000000,
+    "Clear ~ 000₁₆": 0x0000000000000000,
+    "All ~ 7FF₁₆": 0x7FF0000000000000,
+    }
+
+# Steps to neighbouring doubles. Button label: (direction, times the ULPs count)
+ULP_STEPS = {
+    "Next down": (-1, False),
+    "Next up": (1, False),
+    "- N ULPs": (-1, True),
+    "+ N ULPs": (1, True),
+    }
+
+FRACTION_PRESETS = {
+    ".000...": 0x0000000000000,
+    ".100...": 0x8000000000000,
+    ".111...": 0xFFFFFFFFFFFFF,
+    ".0101...": 0x5555555555555,
+    ".1010...": 0xAAAAAAAAAAAAA,
+    }
+
+
+def decimal_chunks(cancelled, fmt, bits, mode):
+    """
+    In a worker thread. Return a list of the chunks of the decimal text of bits
+    in mode, double64_decimal.SHORTEST or EXACT. None if the job is cancelled,
+    by a newer one, before the exact text is found.
+    """
+    if mode == double64_decimal.SHORTEST:
+        return [fmt.value_text(bits)]
+    # The text is cached, so a frame selected again is not worked out again.
+    text = fmt.exact_text(bits, cancelled)
+    if text is None:
+        return None
+    size = double64_decimal.CHUNK_DIGITS
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+def describe_bits(cancelled, fmt, bits):
+    """In a worker thread. The value text of main frame labels"""
+    return fmt.describe(bits)
 
 
 class Main_Window(Gtk.Window):
-    def __init__(self):
+    def __init__(self, fmt = BINARY64):
         Gtk.Window.__init__(self, title="Menu Example")
         self.set_default_size(1100, 200)
 
+        # Format of the register frames. A double64_formats.Format. The presets
+        # of binary64 are the tables above. Those of other formats are made by the Format.
+        self.format = fmt
+        if fmt is BINARY64:
+            self.special_cases = SPECIAL_CASES
+            self.exponent_presets = EXPONENT_PRESETS
+            self.fraction_presets = FRACTION_PRESETS
+        else:
+            self.special_cases = fmt.special_cases()
+            self.exponent_presets = fmt.exponent_presets()
+            self.fraction_presets = fmt.fraction_presets()
+
         self.image = self.get_image_from_base64(B64_IMAGE) 
         # Add the Favicon
         self.set_icon(self.image)        
         
-        # Path and filename of working file.
+        # Path and filename of the session file. See save_session()
         self.filename = None
-        self.main_data = "This is a test \n"
+        # Progress frame of the file being read or written. See start_file_task()
+        self.frame_file = None
+        # Worker threads for the exact digits, wide format labels, dump scans
+        # and files. Results are passed back through the main loop.
+        self.tasks = TaskPool(GLib.idle_add)
+        self.connect("destroy", self.cb_destroy)
+        # Memory mapped dump file being inspected. See open_dump()
+        self.dump_reader = None
+        self.frame_dump = None
 
         # Use Builder to read embedded xml string defining HeaderBar
+        # The About dialog is only built when it is first shown. See cb_about_show()
         self.builder = Gtk.Builder()
-        self.builder.add_from_string(glade_xml)
+        self.builder.add_objects_from_string(glade_xml, ["headerbar", "main_menu"])
         #self.builder.add_from_file("header_bar_4.glade")        
         self.header_bar = self.builder.get_object("headerbar")
         self.builder.connect_signals(self)
@@ -68,16 +214,18 @@ class Main_Window(Gtk.Window):
         image = self.builder.get_object("image_1")
         image.set_from_pixbuf(self.image)
                 
-        # Instantiate about dialog, which is hidden by default
-        self.about = self.builder.get_object("about_dialog")
-        # Add the logo image to the About dialog
-        self.about.set_logo(self.image)
+        # About dialog is instantiated on first use
+        self.about_dialog = None
               
         
         # Add widgets using traditional method to the Gtk.Window
         self.grid = Gtk.Grid()
         self.grid.set_border_width(10)
-        self.label = Gtk.Label(label=LABEL)
+        if fmt is BINARY64:
+            self.label = Gtk.Label(label=LABEL)
+        else:
+            self.label = Gtk.Label(label="Modelling {} / {} Bit / IEEE754 Floating Point Data".format(
+                    fmt.name, fmt.width))
 
         self.grid.attach(self.label, 0,0,1,1)
         self.add(self.grid)
@@ -88,20 +236,191 @@ class Main_Window(Gtk.Window):
         self.main_frame_nibble_list = []
         self.main_frame_bit_list = []
         self.main_button_bit_list = []   
-
-        # setup the frames in the display
+        # Bit model for each main frame. The buttons only display the bits.
+        # The models are views of the one shared array in self.registers
+        self.registers = RegisterFile(REGISTER_COUNT, fmt.width)
+        self.main_model_list = []
+        # Bits shown by each main frame, and its hex digits, most significant
+        # first. Compared with the model so only changed bits and nibbles are redrawn.
+        self.main_shown_list = []
+        self.main_hex_list = []
+        # The main frame the adjustments below act on. Set by clicking a bit.
+        self.selected_index = 0
+        # Created by setup_sign_adjustment()
+        self.checkbutton_sign = None
+        # Created by setup_value_entry(). The idle source adding exact digits. 
+        self.label_decimal = None
+        self.decimal_source = None
+
+        # Main frames are in a scrolled window, one below the other.
+        scrolled_window = Gtk.ScrolledWindow()
+        scrolled_window.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        scrolled_window.set_min_content_height(420)
+        scrolled_window.set_vexpand(True)
+        self.box_register = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        scrolled_window.add(self.box_register)
+        self.grid.attach(scrolled_window, 0,1,1,1)
+
+        # setup the frames in the display. F0 first, so it can be shown quickly.
         self.setup_64_bit_display_1()
-        self.setup_sign_adjustment()
-        self.setup_exponent_adjustment()
-        self.setup_fraction_adjustment()
-        self.setup_special_adjustment()       
-
-        # Set initial value to +1.0
-        for i in range(52,62):
-            self.main_button_bit_list[0][i].set_label("1")
-            
-        self.update_frame_label()
-        self.ieee754_breakdown()
+        self.select_frame(0)
+
+        # Set initial value of F0 to +1.0
+        self.registers[0] = fmt.one()
+        self.update_display()
+        # Undo and redo of the writes to the registers from here on. See write_register()
+        self.history = History(fmt.width)
+        self.spinbutton_history = None
+
+        # Report the time until the window is first drawn.
+        self.first_draw_id = self.connect_after("draw", self.cb_first_draw)
+
+        steps = self.setup_deferred()
+        if FAST_START:
+            # One step per idle call, so the main loop runs between them
+            GLib.idle_add(lambda: next(steps, False))
+        else:
+            for _ in steps:
+                pass
+
+
+    def setup_deferred(self):
+        """
+        Generator building the other register frames and the adjustment panels,
+        one frame or panel per step. Yields True until the last step.
+        With FAST_START the steps are run from idle, after the first frame is shown.
+        """
+        start = time.perf_counter()
+        for index in range(len(self.main_frame_list), REGISTER_COUNT):
+            self.setup_64_bit_display_1()
+            self.main_frame_list[-1].show_all()
+            # Draw a register written before its frame was built
+            self.update_display()
+            yield True
+        panels = [self.setup_value_entry, self.setup_sign_adjustment,
+                self.setup_exponent_adjustment, self.setup_fraction_adjustment,
+                self.setup_special_adjustment]
+        if self.format is BINARY64:
+            # double64_arith works on the 64 bit patterns only.
+            panels.append(self.setup_arithmetic)
+        panels.append(self.setup_history)
+        for setup in panels:
+            setup()
+            yield True
+        self.update_display()
+        self.update_decimal()
+        self.grid.show_all()
+        log.debug("Deferred widgets built in %.1f ms", (time.perf_counter() - start) * 1000)
+
+
+    def cb_first_draw(self, widget, cr):
+        """Report the time from the program start to the first frame drawn"""
+        self.disconnect(self.first_draw_id)
+        log.info("Time to first frame: %.1f ms", (time.perf_counter() - START_TIME) * 1000)
+        return False
+
+
+    def setup_value_entry(self):
+        """Entry of a decimal, hex float or integer value for the selected frame"""
+        frame = Gtk.Frame(label="Value")
+        frame.set_label_align(0.1,0.5)
+        frame.get_style_context().add_class("frame_main")        
+        self.grid.attach(frame, 0,2,1,1)
+        grid_adjust = Gtk.Grid()
+        frame.add(grid_adjust)
+
+        self.entry_value = Gtk.Entry()
+        self.entry_value.set_placeholder_text(
+                "Decimal, hex float or integer. E.g. 3.14159 or 0x1.921fb54442d18p+1. Press Enter")
+        self.entry_value.set_hexpand(True)
+        self.entry_value.connect("activate", self.cb_entry_value)
+        grid_adjust.attach(self.entry_value, 0,0,1,1)
+
+        # Decimal value of the selected frame. Shortest round trip, or every digit.
+        self.combo_decimal = Gtk.ComboBoxText()
+        for mode in double64_decimal.MODES:
+            self.combo_decimal.append_text(mode)
+        self.combo_decimal.set_active(0)
+        self.combo_decimal.connect("changed", self.cb_decimal_mode)
+        grid_adjust.attach(self.combo_decimal, 1,0,1,1)
+
+        self.label_decimal = Gtk.Label(label="")
+        self.label_decimal.set_xalign(0)
+        self.label_decimal.set_selectable(True)
+        self.label_decimal.set_line_wrap(True)
+        self.label_decimal.set_line_wrap_mode(Pango.WrapMode.CHAR)
+        self.label_decimal.set_max_width_chars(100)
+        self.label_decimal.get_style_context().add_class("label_trace")
+        grid_adjust.attach(self.label_decimal, 0,1,2,1)
+
+
+    @INSTRUMENT.timed("cb_entry_value")
+    def cb_entry_value(self, entry):
+        """Encode the entered number to the nearest double and set the selected frame"""
+        text = entry.get_text()
+        log.debug("Value entry: %.60s", text)
+        try:
+            bits = self.format.encode(text)
+        except ValueError:
+            entry.set_icon_from_icon_name(Gtk.EntryIconPosition.SECONDARY, 
+                    "dialog-error-symbolic")
+            entry.set_icon_tooltip_text(Gtk.EntryIconPosition.SECONDARY, 
+                    "Not a decimal, hex float or integer")
+            return
+        entry.set_icon_from_icon_name(Gtk.EntryIconPosition.SECONDARY, None)
+        self.apply_pattern(bits)
+
+
+    def cb_decimal_mode(self, combo):
+        self.update_decimal()
+
+
+    def update_decimal(self):
+        """
+        Show the decimal value of the selected frame. The exact digits, and the
+        shortest of formats wider than 64 bits, are found in a worker thread and
+        added a chunk at a time from idle, so thousands of digits do not stall
+        the window. A change of frame or value stops the digits of the previous one.
+        """
+        if self.label_decimal is None:
+            return
+        if self.decimal_source:
+            GLib.source_remove(self.decimal_source)
+            self.decimal_source = None
+        bits = self.registers[self.selected_index]
+        mode = self.combo_decimal.get_active_text()
+        if self.format.classify(bits) in (INFINITE, NAN):
+            self.tasks.cancel("decimal")
+            self.label_decimal.set_label(self.format.describe(bits))
+        elif mode == double64_decimal.SHORTEST and self.format.width <= 64:
+            self.tasks.cancel("decimal")
+            self.label_decimal.set_label(self.format.value_text(bits))
+        else:
+            self.label_decimal.set_label("…")
+            self.tasks.submit("decimal", decimal_chunks, self.format, bits, mode, 
+                    on_done=self.cb_decimal_done)
+        INSTRUMENT.count_labels()
+
+
+    def cb_decimal_done(self, chunks, error):
+        """From the worker. Show the chunks of digits from idle"""
+        if error is not None:
+            log.warning("Unable to find the decimal value: %s", error)
+            return
+        self.label_decimal.set_label("")
+        self.decimal_source = GLib.idle_add(self.cb_decimal_chunk, iter(chunks), [])
+
+
+    def cb_decimal_chunk(self, chunks, shown):
+        """Idle. Add the next chunk of exact digits to the label. False when all are shown"""
+        chunk = next(chunks, None)
+        if chunk is None:
+            self.decimal_source = None
+            return False
+        shown.append(chunk)
+        self.label_decimal.set_label("".join(shown))
+        INSTRUMENT.count_labels()
+        return True
 
 
     def setup_sign_adjustment(self):
@@ -122,11 +441,12 @@ class Main_Window(Gtk.Window):
         grid_adjust.attach(colour_label, 0,0,1,1)        
         
         grid_adjust.attach(self.checkbutton_sign, 1,0,1,1)
+        self.checkbutton_sign.set_active(bool(self.format.sign(self.registers[self.selected_index])))
         
         
     def setup_exponent_adjustment(self):
         """Setup the exponent quick adjustments in a button box."""
-        frame = Gtk.Frame(label="Exponent. Bias = 1023 ~ 3FF₁₆")
+        frame = Gtk.Frame(label="Exponent. Bias = {0} ~ {0:X}₁₆".format(self.format.bias))
         frame.set_label_align(0.1,0.5)
         frame.get_style_context().add_class("frame_main")        
         self.grid.attach(frame, 0,4,1,1)
@@ -142,8 +462,7 @@ class Main_Window(Gtk.Window):
         bbox.set_spacing(10)
         grid_adjust.attach(bbox, 1,0,1,1)
         
-        button_list = ["1 ~ 3FF₁₆", "2 ~ 400₁₆", "Clear ~ 000₁₆", "All ~ 7FF₁₆"]       
-        for item in button_list:
+        for item in self.exponent_presets:
             button = Gtk.Button(label=item)
             button.connect("clicked", self.cb_button_exponent)        
             bbox.add(button)
@@ -167,8 +486,7 @@ class Main_Window(Gtk.Window):
         bbox.set_spacing(10)
         grid_adjust.attach(bbox, 1,0,1,1)
         
-        button_list = [".000...", ".100...", ".000...", ".111...", ".0101...", ".1010..."]      
-        for item in button_list:
+        for item in self.fraction_presets:
             button = Gtk.Button(label=item)
             button.connect("clicked", self.cb_button_fraction)        
             bbox.add(button)
@@ -186,418 +504,432 @@ class Main_Window(Gtk.Window):
         bbox.set_spacing(6)
         grid_adjust.attach(bbox, 0,0,1,1)
         
-        button_list = ["+0", "-0", "+∞", "-∞", "+NaN", "-NaN", "Max +", "Max -", 
-                "Min +", "Min -", "Max +64bit", "Max -64bit", "π" ]
-                             
-        for item in button_list:
+        for item in self.special_cases:
             button = Gtk.Button(label=item)
             button.connect("clicked", self.cb_button_extreme)        
             bbox.add(button)        
 
+        # Step to the neighbouring doubles. Steps are count ULPs, units in the last place.
+        bbox = Gtk.ButtonBox()
+        bbox.set_spacing(6)
+        bbox.set_layout(Gtk.ButtonBoxStyle.START)
+        grid_adjust.attach(bbox, 0,1,1,1)
+
+        self.spinbutton_ulps = Gtk.SpinButton.new_with_range(1, 2**52, 1)
+        for item in ULP_STEPS:
+            button = Gtk.Button(label=item)
+            button.connect("clicked", self.cb_button_ulp)
+            bbox.add(button)
+        bbox.add(self.spinbutton_ulps)
+
+    def setup_arithmetic(self):
+        """
+        Arithmetic on the register frames. Result = A op B, fma A × B + C, or
+        sqrt A, rounded in the selected mode. The trace shows the rounding.
+        """
+        frame = Gtk.Frame(label="Arithmetic")
+        frame.set_label_align(0.1,0.5)
+        frame.get_style_context().add_class("frame_main")        
+        self.grid.attach(frame, 0,8,1,1)
+        grid_adjust = Gtk.Grid()
+        grid_adjust.set_column_spacing(10)
+        frame.add(grid_adjust)
+
+        # Register of each of A, B, C and the result. F0 + F1 → F3 to start with.
+        self.arithmetic_spin_list = []
+        for column, (name, index) in enumerate((("A", 0), ("B", 1), ("C", 2), ("Result", 3))):
+            grid_adjust.attach(Gtk.Label(label=name + " F"), column * 2, 0, 1, 1)
+            spin_button = Gtk.SpinButton.new_with_range(0, REGISTER_COUNT - 1, 1)
+            spin_button.set_value(index)
+            grid_adjust.attach(spin_button, column * 2 + 1, 0, 1, 1)
+            self.arithmetic_spin_list.append(spin_button)
+
+        self.combo_operation = Gtk.ComboBoxText()
+        for op in double64_arith.OPERANDS:
+            self.combo_operation.append_text(op)
+        self.combo_operation.set_active(0)
+        grid_adjust.attach(self.combo_operation, 8,0,1,1)
+
+        self.combo_rounding = Gtk.ComboBoxText()
+        for mode in double64_arith.ROUNDING_MODES:
+            self.combo_rounding.append_text(mode)
+        self.combo_rounding.set_active(0)
+        grid_adjust.attach(self.combo_rounding, 9,0,1,1)
+
+        button = Gtk.Button(label="=")
+        button.connect("clicked", self.cb_arithmetic)
+        grid_adjust.attach(button, 10,0,1,1)
+
+        self.label_trace = Gtk.Label(label="")
+        self.label_trace.set_xalign(0)
+        self.label_trace.set_selectable(True)
+        self.label_trace.get_style_context().add_class("label_trace")
+        grid_adjust.attach(self.label_trace, 0,1,11,1)
+
+
+    @INSTRUMENT.timed("cb_arithmetic")
+    def cb_arithmetic(self, button):
+        """Calculate into the result register and show the rounding trace"""
+        a, b, c, index = [spin_button.get_value_as_int() 
+                for spin_button in self.arithmetic_spin_list]
+        op = self.combo_operation.get_active_text()
+        mode = self.combo_rounding.get_active_text()
+        result = double64_arith.operate(op, self.registers[a], self.registers[b], 
+                self.registers[c], mode)
+        log.debug("F%d %s F%d (F%d) = %016X %s", a, op, b, c, result.bits, result.decision)
+        self.label_trace.set_label("\n".join(double64_arith.format_trace(result)))
+        INSTRUMENT.count_labels()
+        self.apply_pattern(result.bits, index = index)
+
+
+    def setup_history(self):
+        """Undo and redo of the changes to the registers. Ctrl+Z and Ctrl+Shift+Z or Ctrl+Y"""
+        frame = Gtk.Frame(label="History")
+        frame.set_label_align(0.1,0.5)
+        frame.get_style_context().add_class("frame_main")        
+        self.grid.attach(frame, 0,9,1,1)
+        grid_adjust = Gtk.Grid()
+        grid_adjust.set_column_spacing(10)
+        frame.add(grid_adjust)
+
+        accel_group = Gtk.AccelGroup()
+        self.add_accel_group(accel_group)
+        button_undo = Gtk.Button(label="Undo")
+        button_undo.connect("clicked", self.cb_undo)
+        button_undo.add_accelerator("clicked", accel_group, Gdk.KEY_z, 
+                Gdk.ModifierType.CONTROL_MASK, Gtk.AccelFlags.VISIBLE)
+        grid_adjust.attach(button_undo, 0,0,1,1)
+
+        button_redo = Gtk.Button(label="Redo")
+        button_redo.connect("clicked", self.cb_redo)
+        button_redo.add_accelerator("clicked", accel_group, Gdk.KEY_z, 
+                Gdk.ModifierType.CONTROL_MASK | Gdk.ModifierType.SHIFT_MASK, 
+                Gtk.AccelFlags.VISIBLE)
+        button_redo.add_accelerator("clicked", accel_group, Gdk.KEY_y, 
+                Gdk.ModifierType.CONTROL_MASK, Gtk.AccelFlags.VISIBLE)
+        grid_adjust.attach(button_redo, 1,0,1,1)
+
+        # Jump to any step. 0 is before the first change held.
+        grid_adjust.attach(Gtk.Label(label="Step"), 2,0,1,1)
+        self.spinbutton_history = Gtk.SpinButton.new_with_range(0, 0, 1)
+        self.history_step_id = self.spinbutton_history.connect("value-changed", 
+                self.cb_history_step)
+        grid_adjust.attach(self.spinbutton_history, 3,0,1,1)
+        self.label_history = Gtk.Label(label="")
+        grid_adjust.attach(self.label_history, 4,0,1,1)
+        self.update_history()
+
+
+    def update_history(self):
+        """
+        Sync up the history step with the history. cb_history_step() is blocked,
+        so a value clamped by the new range does not seek the history.
+        """
+        if self.spinbutton_history is None:
+            return
+        self.spinbutton_history.handler_block(self.history_step_id)
+        try:
+            self.spinbutton_history.set_range(0, len(self.history))
+            self.spinbutton_history.set_value(self.history.position)
+        finally:
+            self.spinbutton_history.handler_unblock(self.history_step_id)
+        self.label_history.set_label("of {} steps".format(len(self.history)))
+        INSTRUMENT.count_labels()
+
+
+    @INSTRUMENT.timed("cb_undo")
+    def cb_undo(self, button):
+        self.history.undo(self.registers)
+        self.update_history()
+        self.update_display()
+
+
+    @INSTRUMENT.timed("cb_redo")
+    def cb_redo(self, button):
+        self.history.redo(self.registers)
+        self.update_history()
+        self.update_display()
+
+
+    @INSTRUMENT.timed("cb_history_step")
+    def cb_history_step(self, spin_button):
+        """Undo or redo to the step selected"""
+        position = spin_button.get_value_as_int()
+        if position == self.history.position:
+            return
+        self.history.seek(self.registers, position)
+        self.update_history()
+        self.update_display()
+
+
+    @INSTRUMENT.timed("cb_button_extreme")
     def cb_button_extreme(self, button):
         """Set the extreme limit floating point values"""
-        
-        if DEBUG: print("\nSpecial Cases button label:", button.get_label())         
-        
-        if button.get_label() == "+0":
-            # 0 00000000000 0000000000000000000000000000000000000000000000000000 +0
-            for i in range(0, 64):
-                self.main_button_bit_list[0][i].set_label("0")        
-
-        if button.get_label() == "-0":
-            # 1 00000000000 0000000000000000000000000000000000000000000000000000 -0
-            for i in range(0, 63):
-                self.main_button_bit_list[0][i].set_label("0") 
-            for i in range(63, 64):
-                self.main_button_bit_list[0][i].set_label("1") 
-
-        if button.get_label() == "+∞":
-            # 0 11111111111 0000000000000000000000000000000000000000000000000000 +∞
-            for i in range(0, 64):
-                self.main_button_bit_list[0][i].set_label("0") 
-            for i in range(52, 63):
-                self.main_button_bit_list[0][i].set_label("1") 
-
-        if button.get_label() == "-∞":
-            # 1 11111111111 0000000000000000000000000000000000000000000000000000 -∞
-            for i in range(0, 53):
-                self.main_button_bit_list[0][i].set_label("0") 
-            for i in range(52, 64):
-                self.main_button_bit_list[0][i].set_label("1")        
-        
-        if button.get_label() == "+NaN":
-            # Nan - Can be anything in the fraction field ?
-            # 0 11111111111 0000000000000000000000000000000000000000000000000001 +NaN
-            for i in range(0, 64):
-                self.main_button_bit_list[0][i].set_label("0") 
-            for i in range(52, 63):
-                self.main_button_bit_list[0][i].set_label("1")
-            for i in range(0, 1):
-                self.main_button_bit_list[0][i].set_label("1")
-
-        if button.get_label() == "-NaN":
-            # Nan - Can be anything in the fraction field ?
-            # 1 11111111111 0000000000000000000000000000000000000000000000000001 -NaN
-            for i in range(0, 53):
-                self.main_button_bit_list[0][i].set_label("0") 
-            for i in range(52, 64):
-                self.main_button_bit_list[0][i].set_label("1")
-            for i in range(0, 1):
-                self.main_button_bit_list[0][i].set_label("1")
-
-        if button.get_label() == "Max +":
-            # 1.7976931348623157 × 10**308
-            # 0 11111111110 1111111111111111111111111111111111111111111111111111 Max +ve
-            for i in range(0, 64):
-                self.main_button_bit_list[0][i].set_label("1")
-            self.main_button_bit_list[0][52].set_label("0")                           
-            self.main_button_bit_list[0][63].set_label("0")           
-            
-        if button.get_label() == "Max -":
-            # -1.7976931348623157 × 10**308
-            # 1 11111111110 1111111111111111111111111111111111111111111111111111 Max -ve
-            for i in range(0, 64):
-                self.main_button_bit_list[0][i].set_label("1")
-            self.main_button_bit_list[0][52].set_label("0")                           
- 
-        if button.get_label() == "Min +":  
-            # 0 00000000001 0000000000000000000000000000000000000000000000000000 
-            # ≙ 0010 0000 0000 000016 ≙ +2**−1022 × 1 ≈ 2.2250738585072014 × 10** −308 
-            # (Min. normal positive double)
-            for i in range(0, 64):
-                self.main_button_bit_list[0][i].set_label("0")
-            self.main_button_bit_list[0][52].set_label("1")  
-
-        if button.get_label() == "Min -":  
-            # 1 00000000001 0000000000000000000000000000000000000000000000000000 
-            # ≙ 8010 0000 0000 0000 hex ≙ -2**−1022 × 1 ≈ -2.2250738585072014 × 10** −308 
-            # (Min. normal positive double)
-            for i in range(0, 64):
-                self.main_button_bit_list[0][i].set_label("0")
-            self.main_button_bit_list[0][52].set_label("1") 
-            self.main_button_bit_list[0][63].set_label("1")  
-        
-        if button.get_label() == "Max +64bit":
-            # 0 10000111110 0000000000000000000000000000000000000000000000000000 
-            # 7FFF FFFF FFFF FFFF Maximum positive 64bit signed integer                              
-            for i in range(0, 64):
-                self.main_button_bit_list[0][i].set_label("0")
-            for i in range(53, 58):
-                self.main_button_bit_list[0][i].set_label("1")             
-            self.main_button_bit_list[0][62].set_label("1")             
-            
-        if button.get_label() == "Max -64bit":
-            # 1 10000111110 0000000000000000000000000000000000000000000000000000
-            # 8000 0000 0000 0000 Maximum negative 64bit signed integer        
-            for i in range(0, 64):
-                self.main_button_bit_list[0][i].set_label("0")
-            for i in range(53, 58):
-                self.main_button_bit_list[0][i].set_label("1")                            
-            for i in range(62, 64):
-                self.main_button_bit_list[0][i].set_label("1")
+        log.debug("Special Cases button label: %s", button.get_label())
+        self.apply_pattern(self.special_cases[button.get_label()])
+
+
+    @INSTRUMENT.timed("cb_button_ulp")
+    def cb_button_ulp(self, button):
+        """Step the selected frame to a neighbouring double. See ULP_STEPS"""
+        direction, by_count = ULP_STEPS[button.get_label()]
+        count = direction
+        if by_count:
+            # get_value_as_int() is a 32 bit gint. The range is up to 2**52
+            count *= int(self.spinbutton_ulps.get_value())
+        log.debug("ULP step: %d", count)
+        self.apply_pattern(self.format.step_ulps(self.registers[self.selected_index], count))
 
-            
-        if button.get_label() ==  "π":
-            # 0 10000000000 1001001000011111101101010100010001000010110100011000 
-            # 4009 21FB 5444 2D1816 ≈ pi
-            s = "1001001000011111101101010100010001000010110100011000"
-            s = s[::-1]
-            for i in range(0, 64):
-                self.main_button_bit_list[0][i].set_label("0")           
-            self.main_button_bit_list[0][62].set_label("1")           
-            for i in range(len(s)):
-                self.main_button_bit_list[0][i].set_label(s[i:i+1]) 
-            
-            
-        self.update_frame_label()
-        self.ieee754_breakdown()  
 
+    @INSTRUMENT.timed("cb_button_fraction")
     def cb_button_fraction(self, button):
-        """
-        Set exponent bits and then update
-        button_list = [".000...", ".100...", ".000...", ".111...", ".0101...", ".1010..."]
-        """
-        if DEBUG: print("\nExponent button label:", button.get_label())
-
-        if button.get_label() == ".000...":
-            for i in range(0, 52):
-                self.main_button_bit_list[0][i].set_label("0")
-
-        if button.get_label() == ".100...":
-            for i in range(0, 51):
-                self.main_button_bit_list[0][i].set_label("0")
-            for i in range(51,52):
-                 self.main_button_bit_list[0][i].set_label("1")         
-
-        if button.get_label() == ".000...":
-            for i in range(0, 52):
-                self.main_button_bit_list[0][i].set_label("0")
-
-        if button.get_label() == ".111...":
-            for i in range(0, 52):
-                self.main_button_bit_list[0][i].set_label("1")
-                                
-        if button.get_label() == ".0101...":
-            for i in range(0, 52):
-                self.main_button_bit_list[0][i].set_label("0")
-            for i in range(0, 52, 2):
-                self.main_button_bit_list[0][i].set_label("1")                               
-
-        if button.get_label() == ".1010...":
-            for i in range(0, 52):
-                self.main_button_bit_list[0][i].set_label("0")
-            for i in range(1, 52, 2):
-                self.main_button_bit_list[0][i].set_label("1") 
-
-        self.update_frame_label()
-        self.ieee754_breakdown()                
+        """Set fraction bits and then update. See FRACTION_PRESETS"""
+        log.debug("Fraction button label: %s", button.get_label())
+        self.apply_pattern(self.fraction_presets[button.get_label()], self.format.fraction_mask)
                         
         
+    @INSTRUMENT.timed("cb_button_exponent")
     def cb_button_exponent(self, button):
-        """
-        Set exponent bits and then update
-        ["1 ~ 3FF₁₆", "2 ~ 400₁₆", "Clear ~ 000₁₆", "All ~ 7FF₁₆"]  
-        """
-        if DEBUG: print("\nExponent button label:", button.get_label())
-        
-        if button.get_label() == "1 ~ 3FF₁₆":
-            for i in range(52,62):
-                self.main_button_bit_list[0][i].set_label("1")
-            for i in range(62,63):
-                 self.main_button_bit_list[0][i].set_label("0")               
-
-        if button.get_label() == "2 ~ 400₁₆":
-            for i in range(52,62):
-                self.main_button_bit_list[0][i].set_label("0")
-            for i in range(62,63):
-                 self.main_button_bit_list[0][i].set_label("1")  
-
-        if button.get_label() == "Clear ~ 000₁₆":
-            for i in range(52,63):
-                self.main_button_bit_list[0][i].set_label("0")
-  
-        if button.get_label() == "All ~ 7FF₁₆":
-            for i in range(52,63):
-                self.main_button_bit_list[0][i].set_label("1")
-                
-        self.update_frame_label()
-        self.ieee754_breakdown()        
+        """Set exponent bits and then update. See EXPONENT_PRESETS"""
+        log.debug("Exponent button label: %s", button.get_label())
+        self.apply_pattern(self.exponent_presets[button.get_label()], 
+                self.format.exponent_preset_mask())
     
     
+    @INSTRUMENT.timed("cb_sign_adjust")
     def cb_sign_adjust(self, check_button):
-        if DEBUG: print("\nSign button:", check_button.get_active())
-        if check_button.get_active():
-            self.main_button_bit_list[0][63].set_label("1")
-        else:
-            self.main_button_bit_list[0][63].set_label("0")   
-        self.update_frame_label()
-        self.ieee754_breakdown()
+        log.debug("Sign button: %s", check_button.get_active())
+        sign_mask = self.format.sign_mask
+        if check_button.get_active() == bool(self.registers[self.selected_index] & sign_mask):
+            # Set from update_display() syncing up the checkbutton. 
+            return
+        self.apply_pattern(sign_mask if check_button.get_active() else 0, sign_mask)
+
+
+    def apply_pattern(self, bits, mask = None, index = None):
+        """
+        Write the bits under mask (default all bits) into main frame index
+        (default the selected frame) in one write to the model, then redraw once.
+        """
+        if mask is None:
+            mask = self.format.bits_mask
+        if index is None:
+            index = self.selected_index
+        old = self.registers[index]
+        self.write_register(index, (old & ~mask) | (bits & mask))
+        self.update_display()
+
+
+    def write_register(self, index, bits):
+        """Write bits into register index, as a step that may be undone"""
+        old = self.registers[index]
+        self.registers[index] = bits
+        self.history.record(index, old, self.registers[index])
+        self.update_history()
 
 
+    @INSTRUMENT.timed("ieee754_breakdown")
     def ieee754_breakdown(self, index = 0):
         """Display a breakdown of an IEEE 754"""
-        bias = 1023
+        fmt = self.format
+        bits = self.registers[index]
         
-        # Sign bit       
-        sign = int(self.main_button_bit_list[index][63].get_label())
-        if DEBUG: print("Sign:", sign)
-        
-        # Exponent
-        s = ""
-        for i in range(52, 63):
-            s += self.main_button_bit_list[index][i].get_label()
-        s = s[::-1]
-        if DEBUG: print("Exponent in binary:", s)
-        exponent = int(s,2) - bias
-        if DEBUG: print("Exponent:", exponent)
-
-        # Mantissa
-        s = ""
-        for i in range(0, 52):
-            s += self.main_button_bit_list[index][i].get_label()
-        s = s[::-1]
-        if DEBUG: print(s)  # left to right 0 to 2**-52               
-        fraction = 0 
-        for idx, value in enumerate(s):
-            #print(index, value)
-            fraction += int(value) * 2**-(idx + 1)
-        if DEBUG: print("fraction:", fraction)
+        if log.isEnabledFor(logging.DEBUG):
+            # Sign bit       
+            log.debug("Sign: %d", fmt.sign(bits))
+            # Exponent. Zero and subnormals use 2**(1-bias), not 2**-bias
+            log.debug("Exponent in binary: %s", format(fmt.exponent(bits), 
+                    "0{}b".format(fmt.exponent_bits)))
+            log.debug("Exponent: %d", fmt.unbiased_exponent(bits))
+            # Mantissa. left to right 2**-1 to 2**-fraction_bits
+            log.debug("Fraction in binary: %s", format(fmt.fraction(bits), 
+                    "0{}b".format(fmt.fraction_bits)))
+            log.debug("Class: %s", fmt.classify(bits))
+            log.debug("decimal_value: %s", fmt.value_text(bits))
 
         # Calculation...
-        # (-1)**sign bit * (1+fraction) * 2 ** exponent - bias
+        # Normal:    (-1)**sign bit * (1+fraction) * 2 ** (exponent - bias)
+        # Subnormal: (-1)**sign bit * (0+fraction) * 2 ** -1022
         # Sing bit: (-1)**0 = 1, (-1)**1 = -1 
+        # The value is not calculated from the formula. The model reinterprets
+        # the bits as a double, which is exact and cannot overflow. The digits
+        # are found from integers by double64_decimal.
+        # The zero, ∞, NaN, subnormal, Max and Min labels are from describe().
+        s1 = "".join(self.main_hex_list[index])
+        groups = " ".join(s1[i:i + 8] for i in range(0, len(s1), 8))
+        prefix = "F{}: ".format(index) + groups + " ~ Floating Point: "
+        if fmt.width <= 64:
+            self.main_frame_list[index].set_label(prefix + fmt.describe(bits)) 
+        else:
+            # Thousands of bits of big integer for binary128. Found in a worker thread.
+            self.main_frame_list[index].set_label(prefix + "…") 
+            self.tasks.submit(("breakdown", index), describe_bits, fmt, bits, 
+                    on_done=lambda text, error: self.cb_breakdown_done(index, prefix, text, error))
+        INSTRUMENT.count_labels()
 
-        try:
-            if fraction == 0 and exponent == -1023 and sign == 0:
-                self.main_frame_list[index].set_label(self.main_frame_list[index].get_label() + 
-                    " ~ Floating Point: +0.0")                
-            elif fraction == 0 and exponent == -1023 and sign == 1:
-                self.main_frame_list[index].set_label(self.main_frame_list[index].get_label() + 
-                    " ~ Floating Point: -0.0")
-                    
-            elif fraction == 0 and exponent == 1024 and sign == 0:
-                self.main_frame_list[index].set_label(self.main_frame_list[index].get_label() + 
-                    " ~ Floating Point: +∞")                       
-
-            elif fraction == 0 and exponent == 1024 and sign == 1:
-                self.main_frame_list[index].set_label(self.main_frame_list[index].get_label() + 
-                    " ~ Floating Point: -∞") 
-
-            # NaN seems to be anything in the fraction if exponent is 1024.
-            elif fraction > 0 and exponent == 1024 and sign == 0:
-                self.main_frame_list[index].set_label(self.main_frame_list[index].get_label() + 
-                    " ~ Floating Point: +NaN") 
-                    
-            elif fraction > 0 and exponent == 1024 and sign == 1:
-                self.main_frame_list[index].set_label(self.main_frame_list[index].get_label() + 
-                    " ~ Floating Point: -NaN") 
 
+    def cb_breakdown_done(self, index, prefix, text, error):
+        """From the worker. The value text of main frame index"""
+        self.main_frame_list[index].set_label(prefix + (text if error is None else "?"))
+        INSTRUMENT.count_labels()
 
-            else:
-                # Perform the calculation of the floating point value
-                decimal_value = (-1)**sign * (1 + fraction) * (2**exponent)
-                if DEBUG: print("decimal_value:", decimal_value)
-                if DEBUG: print(self.main_frame_list[index].get_label())
-                self.main_frame_list[index].set_label(self.main_frame_list[index].get_label() + 
-                        " ~ Floating Point: " + str(decimal_value)) 
-                
-                # Append a message after providing the fp value
-                # If Max +ve or Max -ve append to label        
-                if fraction > 0 and exponent == 1023 and sign == 0:
-                    self.main_frame_list[index].set_label(self.main_frame_list[index].get_label() + 
-                            " ~ Max +ve ")        
-                            
-                # If Max +ve or Max -ve append to label        
-                if fraction > 0 and exponent == 1023 and sign == 1:
-                    self.main_frame_list[index].set_label(self.main_frame_list[index].get_label() + 
-                            " ~ Max -ve ")                              
-                
-                # Min + - Closest to zero?                     
-                # 0 00000000001 0000000000000000000000000000000000000000000000000000 
-                if fraction == 0 and exponent == -1022 and sign == 0:
-                    self.main_frame_list[index].set_label(self.main_frame_list[index].get_label() + 
-                            " ~ Min +ve")                                                 
-
-                if fraction == 0 and exponent == -1022 and sign == 1:
-                    self.main_frame_list[index].set_label(self.main_frame_list[index].get_label() + 
-                            " ~ Min -ve")                                        
-                        
-        except OverflowError:
-            print("WARNING: OverflowError: int too large to convert to float") 
-            self.main_frame_list[index].set_label(self.main_frame_list[index].get_label() + 
-                    " ~ Floating Point: Overflow Error" )
-
-        # Sync up the checkbutton with bit 63
-        if self.main_button_bit_list[0][63].get_label() == "0":
-            self.checkbutton_sign.set_active(False)
-        else:
-            self.checkbutton_sign.set_active(True)   
                      
         
-    def update_frame_label(self):
+    def update_display(self):
+        """
+        Redraw only the main frames whose registers have changed since the
+        last update. Sync up the sign checkbutton if the selected sign changed.
+        Window updates are frozen until all the labels are set, so the changes
+        are painted together.
         """
-        Convert the 4 x bit nibble to hex for nibble frame label.
-        Place all the nibble labels in the main frame label.
-        Updates all main frames
+        # Registers of main frames not yet built stay dirty until they are.
+        dirty = self.registers.take_dirty(len(self.main_frame_list))
+        if not dirty:
+            return
+        gdk_window = self.get_window()
+        if gdk_window:
+            gdk_window.freeze_updates()
+        try:
+            for idx in dirty:
+                changed = self.update_frame_label(idx)
+                if changed:
+                    self.ieee754_breakdown(idx)
+                if (idx == self.selected_index and changed & self.format.sign_mask 
+                        and self.checkbutton_sign):
+                    # Sync up the checkbutton with the sign bit
+                    self.checkbutton_sign.set_active(bool(self.format.sign(self.registers[idx])))
+            if self.selected_index in dirty:
+                self.update_decimal()
+        finally:
+            if gdk_window:
+                gdk_window.thaw_updates()
+
+
+    def update_frame_label(self, idx = 0):
         """
-        count = len(self.main_frame_list)
-
-        for idx in range(count):  #Start, count)                  
-            s1 = ""
-            for i in range(16): #self.main_frame_nibble_list:  # 16
-                s = ""
-                for j in range(4):
-                    s += str(self.main_button_bit_list[idx][i*4 + j].get_label())
-                s = s[::-1]
-                self.main_frame_nibble_list[idx][i].set_label(str(hex(int(s,2)))[2:].upper())
-                s1 += str(self.main_frame_nibble_list[idx][i].get_label())
-            s1 = s1[::-1]
-            if DEBUG: print("\n" + s1[:8] + " " + s1[8:])
-            self.main_frame_list[idx].set_label(s1[:8] + " " + s1[8:])            
+        Set the bit buttons, nibble frame labels and hex digits that differ
+        from the bit model. A single bit toggle touches one button and one nibble.
+        Return a mask of the bits that changed in main frame idx.
+        """
+        bits = self.main_model_list[idx].bits
+        shown = self.main_shown_list[idx]
+        if shown is None:
+            # Never drawn. The buttons and nibble frames have their initial labels.
+            changed = self.format.bits_mask
+        else:
+            changed = shown ^ bits
+        self.main_shown_list[idx] = bits
+        log.debug("Changed bits: %X", changed)
+
+        button_bit_list = self.main_button_bit_list[idx]
+        nibbles = 0
+        remaining = changed
+        while remaining:
+            low = remaining & -remaining
+            i = low.bit_length() - 1
+            button_bit_list[i].set_label(str((bits >> i) & 1))
+            nibbles |= 1 << (i // 4)
+            remaining ^= low
+            INSTRUMENT.count_labels()
+
+        hex_list = self.main_hex_list[idx]
+        last = self.format.hex_digits - 1
+        for i in range(last + 1):
+            if nibbles >> i & 1:
+                digit = "{:X}".format((bits >> (i * 4)) & 0xF)
+                self.main_frame_nibble_list[idx][i].set_label(digit)
+                INSTRUMENT.count_labels()
+                hex_list[last - i] = digit
+        return changed
+
+
+    def select_frame(self, index):
+        """Make main frame index the one the adjustments act on. It is coloured."""
+        self.main_frame_list[self.selected_index].get_style_context().remove_class("colour_3")
+        self.selected_index = index
+        self.main_frame_list[index].get_style_context().add_class("colour_3")
+        # Sync up the checkbutton with the sign bit of the newly selected frame
+        if self.checkbutton_sign:
+            self.checkbutton_sign.set_active(bool(self.format.sign(self.registers[index])))
+        self.update_decimal()
 
 
     def setup_64_bit_display_1(self):
         """
-        A 64 bit binary display. 
-        2 x rows of 32 x labels in frames. Frame buttons give the bit number.
-        i = 2 rows, j = 8 nibbles per row, k = 4 bits per nibble. total = 64 bits
+        A binary display of the format's bits. 64 bits for binary64.
+        Rows of 32 x labels in frames. Frame buttons give the bit number.
+        Rows of 8 nibbles, k = 4 bits per nibble. The top row holds the sign.
         Contained in self.main_frame attached to the Window grid
         self required for button_bit_list, frame_bit_list, frame_nibble_list, main_frame.
         """
-        main_frame = Gtk.Frame(label="Main Frame 0")
+        fmt = self.format
+        # Index of this main frame and its register. F0, F1, ...
+        index = len(self.main_frame_list)
+        main_frame = Gtk.Frame(label="F" + str(index))
         main_frame.set_label_align(0.1,0.5)
         main_frame.get_style_context().add_class("frame_main")
+        main_frame.get_style_context().add_class("frame_register")
         
         self.main_frame_list.append(main_frame)
+        self.main_model_list.append(self.registers.register(index))
+        self.main_shown_list.append(None)
+        self.main_hex_list.append(["0"] * fmt.hex_digits)
         
-        # Increment placement on window grid based on length of mainframe
-        position = len(self.main_frame_list)
-        self.grid.attach(self.main_frame_list[-1], 0,position,1,1)       
+        # Placed below the previous main frame
+        self.box_register.pack_start(self.main_frame_list[-1], False, False, 0)
         
-        # Grid_frame. Grid for the 16 x nibble frames
+        # Grid_frame. Grid for the nibble frames
         grid_frame = Gtk.Grid()
         self.main_frame_list[-1].add(grid_frame) 
         
         # Temp lists. These get wiped out. Only good for the current pass       
         frame_nibble_list = []
-        grid_nibble_list = []
         frame_bit_list = []        
         button_bit_list = []
-        s = ""
+        # Nibble 0 is bottom right. Rows of 8 nibbles, the last row may be short.
+        rows = (fmt.hex_digits + 7) // 8
         
-        for i in range(2):  # rows 2**5 = 32
-            # i is reserved for producing two rows
-            for j in range(8):  # nibbles per row 2**2 = 4
-                # Create the 16 nibble frames and place in frame_nibble_list
-                frame_nibble = Gtk.Frame(label=str(i*8+j).zfill(2))
-                frame_nibble.get_style_context().add_class("frame_nibble")
-                frame_nibble.set_label_align(0.5,0.5)
-                frame_nibble_list.append(frame_nibble)
-
-                # Place a grid in each of the 16 nibble frame
-                grid_nibble = Gtk.Grid()
-                grid_nibble_list.append(grid_nibble)
-                frame_nibble_list[i*8+j].add(grid_nibble_list[i*8+j])
-
-                # Attach the nibble frames (and their nibble grids) into the grid frame.
-                # Two rows, bottom 0 to 7 and top 8 to 15                                
-                if i*8+j < 8:
-                    grid_frame.attach(frame_nibble_list[i*8+j], 8-j,1,1,1)
+        for n in range(fmt.hex_digits):
+            # Create the nibble frames and place in frame_nibble_list
+            frame_nibble = Gtk.Frame(label=str(n).zfill(2))
+            frame_nibble.get_style_context().add_class("frame_nibble")
+            frame_nibble.set_label_align(0.5,0.5)
+            frame_nibble_list.append(frame_nibble)
+
+            # Place a grid in each nibble frame
+            grid_nibble = Gtk.Grid()
+            frame_nibble.add(grid_nibble)
+
+            # Attach the nibble frames (and their nibble grids) into the grid frame.
+            # Bottom row 0 to 7, the row above 8 to 15, ...
+            grid_frame.attach(frame_nibble, 8 - n % 8, rows - 1 - n // 8, 1, 1)
+        
+            for k in range(4):  # bit per frame n*4+k
+                bit = n * 4 + k
+                #Create the 4 bit frames to insert into grid_nibbles in each frame_nibble
+                frame_bit = Gtk.Frame(label=str(bit).zfill(2))
+                frame_bit.get_style_context().add_class("frame_bit")
+                frame_bit.set_label_align(0.5,0.5)
+                
+                # Add the IEEE 754 colouring for sign, exponent and fraction.
+                # The x87 explicit integer bit is coloured with the fraction.
+                if bit < fmt.exponent_shift:
+                    frame_bit.get_style_context().add_class("colour_0")
+                elif bit < fmt.sign_bit:
+                    frame_bit.get_style_context().add_class("colour_1")                        
                 else:
-                    grid_frame.attach(frame_nibble_list[i*8+j], 8-j,0,1,1)               
+                    frame_bit.get_style_context().add_class("colour_2")
             
-                for k in range(4):  # bit per frame i*32+j*4+k
-                    #Create the 4 bit frames to insert into grid_nibbles in each frame_nibble
-                    frame_bit = Gtk.Frame(label=str(i*32+j*4+k).zfill(2))
-                    #print(i*32+j*4+k)
-                    frame_bit.get_style_context().add_class("frame_bit")
-                    frame_bit.set_label_align(0.5,0.5)
-                    
-                    # Add the IEEE 754 colouring for sign, exponent and fraction.
-                    if i*32+j*4+k <= 51:
-                        frame_bit.get_style_context().add_class("colour_0")
-                    elif i*32+j*4+k >= 52 and i*32+j*4+k <= 62:
-                        frame_bit.get_style_context().add_class("colour_1")                        
-                    else:
-                        frame_bit.get_style_context().add_class("colour_2")
+                # Button bits. Add into each frame bit. Label set to 0.
+                button_bit = Gtk.Button(label="0")
+                button_bit.get_style_context().add_class("button_bit")
+                button_bit.connect("clicked", self.cb_button_bit, index, bit)                     
+                button_bit_list.append(button_bit)
                 
-                    # Button bits. Add into each frame bit. Label set to 0.
-                    button_bit = Gtk.Button(label="0")
-                    button_bit.get_style_context().add_class("button_bit")
-                    button_bit.connect("clicked", self.cb_button_bit, i*32+j*4+k)                     
-                    button_bit_list.append(button_bit)
-                    
-                    # Add the button bits to their frames
-                    frame_bit.add(button_bit_list[i*32+j*4+k]) 
-                    frame_bit_list.append(frame_bit)                    
-                    
-                    # Bottom row 0 to 31 and top row 32 to 63
-                    if not i:    
-                        grid_nibble_list[i*8+j].attach(frame_bit_list[i*32+j*4+k], 
-                                                        32-i*32+j*4-k,1,1,1)
-                    else:
-                        grid_nibble_list[i*8+j].attach(frame_bit_list[i*32+j*4+k], 
-                                                        64-i*32+j*4-k,0,1,1)                
+                # Add the button bits to their frames. Bit 0 on the right.
+                frame_bit.add(button_bit) 
+                frame_bit_list.append(frame_bit)                    
+                grid_nibble.attach(frame_bit, 4 - k, 0, 1, 1)
 
         # Permanent lists. Plus, self.main_frame_list
         self.main_button_bit_list.append(button_bit_list)        
@@ -605,19 +937,22 @@ class Main_Window(Gtk.Window):
         self.main_frame_bit_list.append(frame_bit_list)
 
  
-    def cb_button_bit(self, button, ident):
-        """Toggle the button bit. Ident is integer from 0 to 63"""
-        if DEBUG: print("Buttons Bit Identity:", ident)
-        # Toggle 0 to 1 and 1 to 0. if a=0, a = abs(a-1), then a=1
-        button.set_label(str(abs(int(button.get_label())-1)))
-        self.update_frame_label()
-        self.ieee754_breakdown()
+    @INSTRUMENT.timed("cb_button_bit")
+    def cb_button_bit(self, button, index, ident):
+        """Toggle the button bit. Index is the main frame. Ident is the bit number, 0 to 63 for binary64"""
+        log.debug("Buttons Bit Identity: %d %d", index, ident)
+        # The adjustments now act on this main frame
+        if index != self.selected_index:
+            self.select_frame(index)
+        # Toggle 0 to 1 and 1 to 0 in the bit model. The button only displays it.
+        self.write_register(index, self.registers[index] ^ (1 << ident))
+        self.update_display()
         
         
     # Callbacks on Main buttons in header bar
     def cb_open(self, button):
-        """Open button on Header Bar. Sets self.filename variable"""
-        print("Open File callback")
+        """Open button on Header Bar. Opens a binary dump of doubles for inspection"""
+        log.debug("Open File callback")
         dialog = Gtk.FileChooserDialog(
                 title="Please choose a file", 
                 parent=self, 
@@ -630,25 +965,329 @@ class Main_Window(Gtk.Window):
                 Gtk.ResponseType.OK,
                 )
 
+        self.add_session_filter(dialog)
+        self.add_dump_filter(dialog)
+        self.add_simh_filter(dialog)
         self.add_filters(dialog)
 
-        response = dialog.run()
-        if response == Gtk.ResponseType.OK:
-            print("Open clicked")
-            print("File selected: " + dialog.get_filename())
-            self.filename = dialog.get_filename()
-            if TESTING:
-                # Testing. Place a time stamp into the file each time it is opened.
-                # E.g. 'Fri May  7 16:46:41 2021'
-                with open(self.filename, "a") as fout:
-                    fout.write("Opened: " + time.ctime() + "\n")            
-                
-            
-        elif response == Gtk.ResponseType.CANCEL:
-            print("Cancel clicked")
+        # The dialog does not run its own main loop. The file is read in cb_open_response()
+        dialog.set_modal(True)
+        dialog.connect("response", self.cb_open_response)
+        dialog.show()
+
 
+    def cb_open_response(self, dialog, response):
+        filename = dialog.get_filename()
         dialog.destroy()
-        
+        if response != Gtk.ResponseType.OK:
+            log.debug("Cancel clicked")
+            return
+        log.debug("Open clicked")
+        log.info("File selected: %s", filename)
+        # A session is saved back to the same file. A raw binary dump of doubles,
+        # or a simh console log, is only read. self.filename is not set, 
+        # so Save never overwrites it.
+        if filename.endswith(double64_session.SUFFIX):
+            self.open_session(filename)
+        elif self.format is not BINARY64:
+            log.warning("Dumps and simh logs hold binary64. Format is %s", self.format.name)
+        elif filename.endswith(SIMH_LOG_SUFFIXES):
+            self.open_simh_log(filename)
+        else:
+            self.open_dump(filename)
+
+
+    def start_file_task(self, text, function, on_done):
+        """
+        Run function(cancelled, progress) as the "file" job of self.tasks,
+        showing its progress and a Cancel button. It must not use Gtk. Only one
+        file is read or written at a time. Return False if one already is.
+        """
+        if self.tasks.busy("file"):
+            log.warning("Wait for the file to finish, or cancel it")
+            return False
+        if self.frame_file is None:
+            self.setup_file_progress()
+        self.progressbar_file.set_text(text)
+        self.progressbar_file.set_fraction(0)
+        self.frame_file.show_all()
+
+        def done(result, error):
+            self.frame_file.hide()
+            on_done(result, error)
+        self.tasks.submit("file", function, on_done=done, on_progress=self.cb_file_progress)
+        return True
+
+
+    def setup_file_progress(self):
+        """Progress of the file being read or written, with a Cancel button. Hidden when idle."""
+        self.frame_file = Gtk.Frame(label="File")
+        self.frame_file.set_label_align(0.1,0.5)
+        self.frame_file.get_style_context().add_class("frame_main")
+        self.frame_file.set_no_show_all(True)
+        self.grid.attach(self.frame_file, 0,10,1,1)
+        grid_adjust = Gtk.Grid()
+        grid_adjust.set_column_spacing(10)
+        self.frame_file.add(grid_adjust)
+
+        self.progressbar_file = Gtk.ProgressBar()
+        self.progressbar_file.set_show_text(True)
+        self.progressbar_file.set_hexpand(True)
+        grid_adjust.attach(self.progressbar_file, 0,0,1,1)
+
+        button = Gtk.Button(label="Cancel")
+        button.connect("clicked", self.cb_file_cancel)
+        grid_adjust.attach(button, 1,0,1,1)
+
+
+    def cb_file_progress(self, fraction):
+        """From the file job. None if the size of the work is not known"""
+        if fraction is None:
+            self.progressbar_file.pulse()
+        else:
+            self.progressbar_file.set_fraction(fraction)
+
+
+    def cb_file_cancel(self, button):
+        """Stop the file job. A save being cancelled leaves the old file"""
+        self.tasks.cancel("file")
+        self.frame_file.hide()
+
+
+    def open_session(self, filename):
+        """
+        Load the registers, history and selected frame of a session file, 
+        in a worker thread. See double64_session
+        """
+        def load(cancelled, progress):
+            return double64_session.load(filename, progress, cancelled)
+        self.start_file_task("Opening " + os.path.basename(filename), load,
+                lambda session, error: self.opened_session(filename, session, error))
+
+
+    def opened_session(self, filename, session, error):
+        """Show the session read by open_session()"""
+        if error is not None:
+            log.warning("Unable to open session: %s", error)
+            return
+        if session.format != self.format.name:
+            log.warning("Session is %s. Start with --format %s to open it",
+                    session.format, session.format)
+            return
+        for index, bits in enumerate(session.registers[:len(self.registers.values)]):
+            self.registers[index] = bits
+        self.history.restore(session.history, session.indices, session.position)
+        self.update_history()
+        self.filename = filename
+        self.select_frame(min(session.selected, len(self.main_frame_list) - 1))
+        self.update_display()
+        log.info("Session: %d registers loaded from %s", len(session.registers), filename)
+
+
+    def save_session(self):
+        """
+        Write the registers, history, frame labels and selected frame to
+        self.filename in a worker thread. The job writes a copy, so changes made
+        while it runs are not in the file.
+        """
+        history, indices = self.history.steps()
+        session = double64_session.Session(self.format.name, list(self.registers.values), 
+                self.selected_index, [self.frame_label(index) 
+                for index in range(len(self.registers.values))], 
+                history, indices, self.history.position)
+        filename, width = self.filename, self.format.width
+
+        def save(cancelled, progress):
+            double64_session.save(filename, session, width, progress, cancelled)
+
+        def saved(result, error):
+            if error is not None:
+                log.warning("Unable to save session: %s", error)
+            else:
+                log.info("Session saved to %s", filename)
+        self.start_file_task("Saving " + os.path.basename(filename), save, saved)
+
+
+    def frame_label(self, index):
+        """The label of main frame index. Made from the register if the frame is not built yet"""
+        if index < len(self.main_frame_list):
+            return self.main_frame_list[index].get_label()
+        bits = self.registers[index]
+        return "F{}: {} ~ Floating Point: {}".format(index, self.format.hex(bits), 
+                self.format.describe(bits))
+
+
+    def open_dump(self, filename):
+        """
+        Open a raw binary file of 64 bit doubles. The file is memory mapped and
+        decoded a page at a time, so multi-GB files are not loaded into RAM.
+        The value at the selected index is shown in the selected main frame.
+        """
+        try:
+            # NumPy is only required for the dump inspector.
+            from double64_batch import DumpReader
+        except ImportError as err:
+            log.warning("Dump inspector requires NumPy: %s", err)
+            return
+
+        if self.frame_dump is None:
+            self.setup_dump_adjustment()
+
+        if self.checkbutton_dump_big_endian.get_active():
+            byteorder = ">"
+        else:
+            byteorder = "<"
+        try:
+            reader = DumpReader(filename, byteorder)
+        except (OSError, ValueError) as err:
+            log.warning("Unable to open dump: %s", err)
+            return
+
+        if self.dump_reader:
+            self.tasks.cancel("scan")
+            self.label_dump_scan.set_label("")
+            self.dump_reader.close()
+        self.dump_reader = reader
+        self.spinbutton_dump.set_range(0, len(reader) - 1)
+        self.spinbutton_dump.set_value(0)
+        # value-changed is not emitted if the index was already 0
+        self.cb_dump_index(self.spinbutton_dump)
+
+
+    def open_simh_log(self, filename):
+        """
+        Load the F0/F1 register pairs of a simh console log of the
+        double-precision script into the main frames. Pair i is shown in
+        F(2i) and F(2i+1). Each F1 is checked against the host's CVTQT.
+        Only as many pairs as there are frames are read from the log.
+        """
+        pairs = len(self.main_frame_list) // 2
+
+        def read(cancelled, progress):
+            # A long log without conversions is read to the end. Lines are counted.
+            def lines(fin):
+                for number, line in enumerate(fin):
+                    if number % 65536 == 0:
+                        if cancelled.is_set():
+                            raise double64_session.Cancelled("Cancelled on line {}".format(number))
+                        progress(None)
+                    yield line
+            with open(filename) as fin:
+                conversions = double64_simh.read_conversions(lines(fin))
+                return list(double64_simh.check(itertools.islice(conversions, pairs)))
+        self.start_file_task("Reading " + os.path.basename(filename), read, self.read_simh_log)
+
+
+    def read_simh_log(self, checked, error):
+        """Show the (conversion, expected) pairs read by open_simh_log()"""
+        if error is not None:
+            log.warning("Unable to read simh log: %s", error)
+            return
+        mismatches = 0
+        for shown, (conversion, expected) in enumerate(checked):
+            self.write_register(2 * shown, conversion.f0)
+            self.write_register(2 * shown + 1, conversion.f1)
+            if conversion.f1 != expected:
+                mismatches += 1
+                log.warning("Mismatch on line %d: F0 %016X F1 %016X expected %016X",
+                        conversion.line, conversion.f0, conversion.f1, expected)
+        log.info("simh log: %d conversions shown, %d mismatches", len(checked), mismatches)
+        self.update_display()
+
+
+    def setup_dump_adjustment(self):
+        """Setup the dump inspector. Selects the index of the value shown from the dump."""
+        self.frame_dump = Gtk.Frame(label="Dump")
+        self.frame_dump.set_label_align(0.1,0.5)
+        self.frame_dump.get_style_context().add_class("frame_main")        
+        self.grid.attach(self.frame_dump, 0,7,1,1)
+        grid_adjust = Gtk.Grid()
+        grid_adjust.set_column_spacing(10)
+        self.frame_dump.add(grid_adjust)
+
+        self.spinbutton_dump = Gtk.SpinButton.new_with_range(0, 0, 1)
+        self.spinbutton_dump.connect("value-changed", self.cb_dump_index)
+        grid_adjust.attach(self.spinbutton_dump, 0,0,1,1)
+
+        self.checkbutton_dump_big_endian = Gtk.CheckButton(label="Big endian")
+        self.checkbutton_dump_big_endian.connect("toggled", self.cb_dump_byteorder)
+        grid_adjust.attach(self.checkbutton_dump_big_endian, 1,0,1,1)
+
+        self.label_dump = Gtk.Label(label="")
+        grid_adjust.attach(self.label_dump, 2,0,1,1)
+
+        # Count of each class in the whole dump, from a worker thread
+        button = Gtk.Button(label="Scan")
+        button.connect("clicked", self.cb_dump_scan)
+        grid_adjust.attach(button, 3,0,1,1)
+        self.label_dump_scan = Gtk.Label(label="")
+        grid_adjust.attach(self.label_dump_scan, 0,1,4,1)
+        self.frame_dump.show_all()
+
+
+    def cb_dump_scan(self, button):
+        """Count the classes of all the values of the dump in a worker thread"""
+        if not self.dump_reader:
+            return
+        self.label_dump_scan.set_label("Scanning {} values…".format(len(self.dump_reader)))
+        self.tasks.submit("scan", lambda cancelled, reader: reader.class_counts(cancelled), 
+                self.dump_reader, on_done=self.cb_dump_scanned)
+
+
+    def cb_dump_scanned(self, counts, error):
+        """From the worker. Show the count of each class"""
+        if error is not None:
+            self.label_dump_scan.set_label("Scan failed: {}".format(error))
+            return
+        from double64_batch import CLASS_NAMES
+        self.label_dump_scan.set_label(", ".join("{} {}".format(name, count) 
+                for name, count in zip(CLASS_NAMES, counts.tolist())))
+        INSTRUMENT.count_labels()
+
+
+    @INSTRUMENT.timed("cb_dump_index")
+    def cb_dump_index(self, spin_button):
+        """Show the value at the selected index of the dump in the selected main frame"""
+        if not self.dump_reader:
+            return
+        index = spin_button.get_value_as_int()
+        log.debug("Dump index: %d", index)
+        self.write_register(self.selected_index, self.dump_reader.bits(index))
+        self.label_dump.set_label("Value {} of {} in {}".format(
+                index, len(self.dump_reader), self.dump_reader.filename))
+        INSTRUMENT.count_labels()
+        self.update_display()
+
+
+    def cb_dump_byteorder(self, check_button):
+        """Reopen the dump with the other byte order"""
+        if self.dump_reader:
+            index = self.spinbutton_dump.get_value_as_int()
+            self.open_dump(self.dump_reader.filename)
+            self.spinbutton_dump.set_value(index)
+
+
+    def add_session_filter(self, dialog):
+        filter_session = Gtk.FileFilter()
+        filter_session.set_name("Sessions")
+        filter_session.add_pattern("*" + double64_session.SUFFIX)
+        dialog.add_filter(filter_session)
+
+    def add_dump_filter(self, dialog):
+        filter_dump = Gtk.FileFilter()
+        filter_dump.set_name("Binary dumps")
+        filter_dump.add_pattern("*.bin")
+        filter_dump.add_pattern("*.dat")
+        filter_dump.add_pattern("*.raw")
+        dialog.add_filter(filter_dump)
+
+    def add_simh_filter(self, dialog):
+        filter_simh = Gtk.FileFilter()
+        filter_simh.set_name("simh console logs")
+        for suffix in SIMH_LOG_SUFFIXES:
+            filter_simh.add_pattern("*" + suffix)
+        dialog.add_filter(filter_simh)
+
     def add_filters(self, dialog):
         filter_text = Gtk.FileFilter()
         filter_text.set_name("Text files")
@@ -668,17 +1307,16 @@ class Main_Window(Gtk.Window):
 
     def cb_new(self, button):
         """Select a new file"""
-        print("New File callback")
+        log.debug("New File callback")
         self.cb_save_as(button)
         
 
     def cb_save(self, button):
         """Save button on Header Bar. Save unless variable not set."""
-        print("Save File callback")
+        log.debug("Save File callback")
 
         if self.filename:
-            with open(self.filename, "w") as fout:
-                fout.write(self.main_data)
+            self.save_session()
         else:
             # If self.flename is blank then call the Save_As method.
             self.cb_save_as(button)
@@ -686,7 +1324,7 @@ class Main_Window(Gtk.Window):
         
     def cb_save_as(self, button):
         """Save_as button on Header Bar. Opens Dialog, sets variable, and saves"""
-        print("Save_As File callback")        
+        log.debug("Save_As File callback")        
         dialog = Gtk.FileChooserDialog(
                 title="Please provide a file name", 
                 parent=self, 
@@ -699,66 +1337,87 @@ class Main_Window(Gtk.Window):
                 Gtk.ResponseType.OK,
                 )
 
-        self.add_filters(dialog)
+        dialog.set_do_overwrite_confirmation(True)
+        dialog.set_current_name("session" + double64_session.SUFFIX)
+        self.add_session_filter(dialog)
         
-        response = dialog.run()
-        if response == Gtk.ResponseType.OK:
-            print("Save button clicked")
-            print("File selected: " + dialog.get_filename())
-            self.filename = dialog.get_filename()
-
-            # Write main data to file
-            with open(self.filename, "w") as fout:
-                fout.write(self.main_data)            
-                        
-            if TESTING:
-                # Testing. Place a time stamp into the file each time it is opened.
-                # E.g. 'Fri May  7 16:46:41 2021'
-                with open(self.filename, "a") as fout:
-                    fout.write("Created: " + time.ctime() + "\n")             
-            
-        elif response == Gtk.ResponseType.CANCEL:
-            print("Cancel clicked")
+        # The dialog does not run its own main loop. See cb_save_as_response()
+        dialog.set_modal(True)
+        dialog.connect("response", self.cb_save_as_response)
+        dialog.show()
+
 
+    def cb_save_as_response(self, dialog, response):
+        filename = dialog.get_filename()
         dialog.destroy()
+        if response != Gtk.ResponseType.OK:
+            log.debug("Cancel clicked")
+            return
+        log.debug("Save button clicked")
+        log.info("File selected: %s", filename)
+        if not filename.endswith(double64_session.SUFFIX):
+            filename += double64_session.SUFFIX
+        self.filename = filename
+        self.save_session()
 
 
     # Callbacks for Popover main menu
+    def cb_destroy(self, widget):
+        """Cancel the background jobs. They stop at their next check, so exit is not held up"""
+        self.tasks.shutdown()
+
+
     def cb_close(self, *args):
         """ Main close in Popover menu"""
         Gtk.main_quit()    
     
     
-    def cb_something_1(self, button):
-        """Modify to meet the needs of the application."""
-        print("Do Something 1")  
+    def cb_instrument(self, button):
+        """
+        Toggle instrumentation of the callbacks. When turned off log a summary
+        of the latency and set_label calls of each callback. 
+        """
+        if not INSTRUMENT.enabled:
+            log.info("Instrumentation on")
+            INSTRUMENT.start()
+        else:
+            INSTRUMENT.stop()
+            log.info("Instrumentation off")
+            for line in INSTRUMENT.summary():
+                log.info("%s", line)
 
 
     def cb_something_2(self, button):
         """Modify to meet the needs of the application."""
-        print("Do Something 2")  
+        log.debug("Do Something 2")  
 
 
     def cb_something_3(self, button):
         """Modify to meet the needs of the application."""
-        print("Do Something 3")  
+        log.debug("Do Something 3")  
 
 
     def cb_something_4(self, button):
         """Modify to meet the needs of the application."""        
-        print("Do Something 4")  
+        log.debug("Do Something 4")  
      
        
     def cb_about_show(self, button):
         """Show the About dialog."""        
-        print("About Dialog show")  
-        self.about_dialog = self.builder.get_object("about_dialog")  
+        log.debug("About Dialog show")  
+        if self.about_dialog is None:
+            # First use. Instantiate the about dialog from glade_xml and add the logo
+            self.builder.add_objects_from_string(glade_xml, ["about_dialog"])
+            self.builder.connect_signals(self)
+            self.about_dialog = self.builder.get_object("about_dialog")  
+            self.about_dialog.set_logo(self.image)
+            self.about_dialog.set_transient_for(self)
         self.about_dialog.show_all()
                
     # Callback in About Dialog           
     def cb_about_hide(self, *args):
         """About dialog. Response to Close button.""" 
-        print("About Dialog hide")
+        log.debug("About Dialog hide")
         self.about_dialog.hide()
 
 
@@ -767,7 +1426,27 @@ class Main_Window(Gtk.Window):
         B64_IMAGE is decoded it to binary bytes.
         Load the bytes using GdkPixbuf.PixbufLoader
         Return the Pixbuf image.
+        The decoded pixels are cached in the user cache directory, so later
+        starts create the Pixbuf directly from them. See IMAGE_CACHE_FORMAT
         '''
+        crc = zlib.crc32(b64_image)
+        cache_file = os.path.join(GLib.get_user_cache_dir(), "double_precision", 
+                "favicon.pixels")
+        try:
+            with open(cache_file, "rb") as fin:
+                data = fin.read()
+            cached_crc, width, height, rowstride, has_alpha = \
+                    IMAGE_CACHE_FORMAT.unpack_from(data)
+            pixels = data[IMAGE_CACHE_FORMAT.size:]
+            # The bytes the Pixbuf reads. The last row need not be padded to rowstride.
+            size = (height - 1) * rowstride + width * (4 if has_alpha else 3)
+            if cached_crc == crc and width and height and len(pixels) >= size:
+                return GdkPixbuf.Pixbuf.new_from_bytes(GLib.Bytes.new(pixels),
+                        GdkPixbuf.Colorspace.RGB, bool(has_alpha), 8, 
+                        width, height, rowstride)
+        except (OSError, struct.error):
+            pass
+
         # Decode base64 data
         image_data = base64.decodebytes(b64_image)
         
@@ -776,6 +1455,24 @@ class Main_Window(Gtk.Window):
         loader.write(image_data)
         loader.close()
         pixbuf = loader.get_pixbuf()                 
+
+        # Written to a temporary file that then replaces the cache, so another
+        # start never reads a part written cache
+        temporary = None
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            handle, temporary = tempfile.mkstemp(suffix=".tmp", 
+                    dir=os.path.dirname(cache_file))
+            with os.fdopen(handle, "wb") as fout:
+                fout.write(IMAGE_CACHE_FORMAT.pack(crc, pixbuf.get_width(), 
+                        pixbuf.get_height(), pixbuf.get_rowstride(), 
+                        pixbuf.get_has_alpha()))
+                fout.write(pixbuf.read_pixel_bytes().get_data())
+            os.replace(temporary, cache_file)
+        except OSError as err:
+            log.warning("Unable to cache the image: %s", err)
+            if temporary is not None and os.path.exists(temporary):
+                os.remove(temporary)
         return pixbuf 
 
 
@@ -866,6 +1563,11 @@ def add_provider(widget):
         font: 16px Arial, sans-serif;
         }    
 
+    .label_trace {
+        margin: 5px;
+        font: 12px Courier New, monospace;
+        }
+
     .colour_0 {
         background: Aquamarine;
         /*background: rgb(255,160,160)*/
@@ -886,6 +1588,9 @@ def add_provider(widget):
      
     style.add_provider_for_screen(screen, provider, Gtk.STYLE_PROVIDER_PRIORITY_USER)
 
+# Header of the cached image pixels: crc32 of B64_IMAGE, width, height, rowstride, alpha
+IMAGE_CACHE_FORMAT = struct.Struct("<IIIII")
+
 # Image used as the logo.
 B64_IMAGE = (b"""
 iVBORw0KGgoAAAANSUhEUgAAACAAAAAgCAYAAABzenr0AAAJs3pUWHRSYXcgcHJvZmlsZSB0eXBl
@@ -1077,8 +1782,8 @@ Author: Juan Pablo Ugarte
             <property name="visible">True</property>
             <property name="can-focus">True</property>
             <property name="receives-default">True</property>
-            <property name="text" translatable="yes">Do Something 1</property>
-            <signal name="clicked" handler="cb_something_1" swapped="no"/>
+            <property name="text" translatable="yes">Instrumentation On/Off</property>
+            <signal name="clicked" handler="cb_instrument" swapped="no"/>
           </object>
           <packing>
             <property name="expand">False</property>
@@ -1308,11 +2013,20 @@ Author: Juan Pablo Ugarte
 </interface>
 """.format(AUTHOR, COMMENT, WEBSITE, EMAIL)
 
-win = Main_Window()
-win.connect("realize", add_provider)
-win.connect("destroy", Gtk.main_quit)
-win.show_all()
-Gtk.main()
+if __name__ == "__main__":
+    # INFO shows the time to the first frame, file and instrumentation reports.
+    # DEBUG adds the callback trace.
+    logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO,
+            format="%(levelname)s: %(message)s")
+    parser = argparse.ArgumentParser(description=COMMENT)
+    parser.add_argument("--format", choices=list(FORMATS), default=BINARY64.name,
+            help="Floating point format of the register frames. Default binary64")
+    args = parser.parse_args()
+    win = Main_Window(FORMATS[args.format])
+    win.connect("realize", add_provider)
+    win.connect("destroy", Gtk.main_quit)
+    win.show_all()
+    Gtk.main()
 
 """
 # Notes:
@@ -0,0 +1,90 @@
+"""Tests of double64_arith against exact Fraction arithmetic, and of double64_batch.operate_array"""
+import math
+import random
+import struct
+from fractions import Fraction
+
+import numpy as np
+
+import double64_arith as arith
+import double64_batch
+
+OPERATIONS = {
+    arith.ADD: lambda a, b, c: a + b,
+    arith.SUBTRACT: lambda a, b, c: a - b,
+    arith.MULTIPLY: lambda a, b, c: a * b,
+    arith.DIVIDE: lambda a, b, c: a / b,
+    arith.FMA: lambda a, b, c: a * b + c,
+}
+
+
+def to_bits(value):
+    return struct.unpack("<Q", struct.pack("<d", value))[0]
+
+
+def to_float(bits):
+    return struct.unpack("<d", struct.pack("<Q", bits))[0]
+
+
+def operands(rng, count):
+    """Finite non zero doubles of mixed signs and exponents, with some cancelling sums"""
+    for _ in range(count):
+        a, b, c = (rng.choice((-1, 1)) * (1 + rng.getrandbits(52) * 2.0 ** -52)
+                * 2.0 ** rng.randint(-300, 300) for _ in range(3))
+        if rng.random() < 0.3:
+            b = -a * (1 + rng.randint(-4, 4) * 2.0 ** -52)
+            c = -a * b * (1 + rng.randint(-4, 4) * 2.0 ** -52)
+        yield a, b, c
+
+
+def rounded(value, mode):
+    """The double of the Fraction value rounded in mode"""
+    nearest = float(value)
+    if mode == arith.ROUND_NEAREST_EVEN or Fraction(nearest) == value:
+        return nearest
+    above = Fraction(nearest) > value
+    if mode == arith.ROUND_UP:
+        return nearest if above else math.nextafter(nearest, math.inf)
+    if mode == arith.ROUND_DOWN:
+        return math.nextafter(nearest, -math.inf) if above else nearest
+    return math.nextafter(nearest, 0.0) if above == (value > 0) else nearest
+
+
+def test_operations_match_fraction():
+    rng = random.Random(16)
+    for a, b, c in operands(rng, 3000):
+        for op, exact in OPERATIONS.items():
+            value = exact(Fraction(a), Fraction(b), Fraction(c))
+            if value == 0:
+                continue
+            for mode in arith.ROUNDING_MODES:
+                result = arith.operate(op, to_bits(a), to_bits(b), to_bits(c), mode=mode)
+                assert result.bits == to_bits(rounded(value, mode)), (op, mode, a, b, c)
+
+
+def test_sqrt_brackets_root():
+    rng = random.Random(17)
+    for a, _, _ in operands(rng, 3000):
+        a = abs(a)
+        for mode in arith.ROUNDING_MODES:
+            root = to_float(arith.sqrt(to_bits(a), mode))
+            if mode == arith.ROUND_NEAREST_EVEN:
+                assert root == math.sqrt(a)
+            elif mode == arith.ROUND_UP:
+                assert Fraction(root) ** 2 >= a > Fraction(math.nextafter(root, 0.0)) ** 2
+            else:
+                assert Fraction(root) ** 2 <= a < Fraction(math.nextafter(root, math.inf)) ** 2
+
+
+def test_operate_array_matches_operate():
+    rng = random.Random(18)
+    values = list(operands(rng, 2000))
+    values += [(1.0, 1.0, -1.0), (0.0, 5.0, -0.0), (math.inf, 0.0, 1.0), (2.0 ** 1000, 2.0 ** 1000, 1.0),
+            (2.0 ** -1000, 3.0, 2.0 ** -1074), (math.nan, 1.0, 1.0)]
+    a, b, c = (np.array(column).view(np.uint64) for column in zip(*values))
+    for op in OPERATIONS:
+        for mode in arith.ROUNDING_MODES:
+            bits = double64_batch.operate_array(op, a, b, c, mode=mode)
+            for i in range(len(values)):
+                expected = arith.operate(op, int(a[i]), int(b[i]), int(c[i]), mode=mode).bits
+                assert int(bits[i]) == expected, (op, mode, values[i])
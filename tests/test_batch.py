@@ -0,0 +1,66 @@
+"""Tests of the NumPy batch decoder, double64_batch, against double64"""
+import random
+
+import numpy as np
+
+import double64
+import double64_batch
+from double64_batch import CLASS_NAMES, DumpReader
+
+EDGES = [0x0000000000000000, 0x8000000000000000, 0x0000000000000001, 0x8000000000000001,
+        0x000FFFFFFFFFFFFF, 0x0010000000000000, 0x8010000000000000, 0x7FEFFFFFFFFFFFFF,
+        0xFFEFFFFFFFFFFFFF, 0x7FF0000000000000, 0xFFF0000000000000, 0x7FF8000000000000,
+        0xFFF0000000000001, 0x3FF0000000000000, 0x3FB999999999999A]
+
+
+def patterns(count=5000):
+    rng = random.Random(4)
+    return np.array(EDGES + [rng.getrandbits(64) for _ in range(count)], dtype=np.uint64)
+
+
+def test_decode_array_matches_double64():
+    bits = patterns()
+    breakdown = double64_batch.decode_array(bits)
+    for i, word in enumerate(bits.tolist()):
+        assert breakdown.sign[i] == word >> 63
+        assert breakdown.exponent[i] == double64.unbiased_exponent(word)
+        assert breakdown.fraction[i] == word & double64.FRACTION_MASK
+        assert CLASS_NAMES[breakdown.kind[i]] == double64.classify(word)
+
+
+def test_describe_array_matches_describe():
+    bits = patterns()
+    texts = double64_batch.describe_array(bits)
+    assert texts.tolist() == [double64.describe(word) for word in bits.tolist()]
+    # Big endian raw bytes
+    assert double64_batch.describe_array(bits.astype(">u8").tobytes(), ">").tolist() \
+            == texts.tolist()
+
+
+def test_dump_reader(tmp_path):
+    bits = patterns(3 * DumpReader.PAGE_SIZE)
+    filename = tmp_path / "dump.bin"
+    # A trailing part value is ignored
+    filename.write_bytes(bits.astype(">u8").tobytes() + b"\0\0\0")
+    reader = DumpReader(str(filename), ">")
+    try:
+        assert len(reader) == len(bits)
+        for index in (0, 1, DumpReader.PAGE_SIZE - 1, DumpReader.PAGE_SIZE, len(bits) - 1):
+            assert reader.bits(index) == int(bits[index])
+        counts = reader.class_counts()
+        expected = [0] * len(CLASS_NAMES)
+        for word in bits.tolist():
+            expected[CLASS_NAMES.index(double64.classify(word))] += 1
+        assert counts.tolist() == expected
+    finally:
+        reader.close()
+
+
+def test_ulp_diff_matches_ulp_distance():
+    a, b = patterns(), np.roll(patterns(), 1)
+    distances = double64_batch.ulp_diff(a, b)
+    assert distances.tolist() == [double64.ulp_distance(x, y)
+            for x, y in zip(a.tolist(), b.tolist())]
+    # float64 arrays are their bits
+    assert double64_batch.ulp_diff(np.array([1.0, -0.0]), np.array([2.0, 0.0])).tolist() \
+            == [1 << 52, 0]
@@ -0,0 +1,39 @@
+"""Tests of the word parsing of the decode command line, double64_cli"""
+import double64_cli
+from double64_cli import parse_value, read_words
+
+
+def test_parse_value():
+    assert parse_value("3FF0000000000000") == 0x3FF0000000000000
+    assert parse_value("0x3ff0000000000000") == 0x3FF0000000000000
+    assert parse_value(" 0x1 ") == 1
+    # 16 digits are hex, even if all decimal
+    assert parse_value("1000000000000000") == 0x1000000000000000
+    assert parse_value("1e15") == 0x430C6BF526340000
+    assert parse_value("0x1.8p1") == 0x4008000000000000
+    assert parse_value("-2") == 0xC000000000000000
+    assert parse_value("inf") == 0x7FF0000000000000
+    # Wider than 64 bits, even with leading zeros that fit
+    assert parse_value("0x10000000000000000") is None
+    assert parse_value("0x00000000000000001") == 1
+    assert parse_value("Breakpoint, PC: 0000000020000000") is None
+
+
+def test_read_words_and_warnings():
+    warnings = []
+    lines = ["F0:\t0000000000000001\n", "F1: 3FF0000000000000\n", "Breakpoint\n",
+            "1000000000000000\n", "2000000000000000\n", "0x10000000000000000\n", "1.5\n"]
+    words = list(read_words(lines, warnings.append))
+    assert words == [("F0", 1), ("F1", 0x3FF0000000000000), ("", 0x1000000000000000),
+            ("", 0x2000000000000000), ("", 0x3FF8000000000000)]
+    assert len(warnings) == 3
+    assert "wider than 64 bits" in warnings[2]
+
+
+def test_main(tmp_path, capsys):
+    filename = tmp_path / "words.txt"
+    filename.write_text("F1:\t3FF0000000000000\n0x0000000000000001\n")
+    assert double64_cli.main([str(filename)]) == 0
+    assert capsys.readouterr().out.splitlines() == [
+            "F1\t3FF0000000000000\t0\t0\t0000000000000\tnormal\t1.0",
+            "\t0000000000000001\t0\t-1022\t0000000000001\tsubnormal\t5e-324 ~ Min subnormal +ve"]
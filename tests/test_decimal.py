@@ -0,0 +1,55 @@
+"""Tests of double64_decimal, the shortest and exact decimal text"""
+import random
+import struct
+import threading
+from fractions import Fraction
+
+import double64_decimal
+from double64_formats import X87, BINARY128
+
+
+def patterns(count=5000):
+    rng = random.Random(21)
+    for _ in range(count):
+        bits = rng.getrandbits(64)
+        if (bits >> 52) & 0x7FF != 0x7FF:
+            yield bits
+
+
+def to_float(bits):
+    return struct.unpack("<d", struct.pack("<Q", bits))[0]
+
+
+def test_shortest_is_repr():
+    for bits in patterns():
+        assert double64_decimal.shortest(bits) == repr(to_float(bits))
+
+
+def test_exact_value():
+    for bits in patterns(500):
+        assert Fraction(double64_decimal.exact(bits)) == Fraction(to_float(bits))
+
+
+def test_exact_beyond_int_str_limit():
+    for fmt in (X87, BINARY128):
+        text = fmt.exact_text(fmt.max())
+        assert len(text) > 4300
+        sign, significand, exponent = fmt.decompose(fmt.max())
+        whole, point, fraction = text.partition(".")
+        assert fraction == "0"
+        # Compare the digits 1000 at a time, below the int() limit
+        value = 0
+        for start in range(0, len(whole), 1000):
+            chunk = whole[start:start + 1000]
+            value = value * 10 ** len(chunk) + int(chunk)
+        assert value == significand << exponent
+
+
+def test_exact_cancelled():
+    cancelled = threading.Event()
+    cancelled.set()
+    # Not the max, which test_exact_beyond_int_str_limit has cached
+    bits = BINARY128.max() - 1
+    assert BINARY128.exact_text(bits, cancelled) is None
+    # Not cached as None
+    assert BINARY128.exact_text(bits).endswith(".0")
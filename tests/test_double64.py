@@ -0,0 +1,85 @@
+"""Tests of the double64 bit model, describe() and classify()"""
+import math
+
+import double64
+from double64 import (Double64, classify, describe, unbiased_exponent, bits_to_float,
+        float_to_bits, ZERO, SUBNORMAL, NORMAL, INFINITE, NAN)
+
+
+def test_fields():
+    d = Double64.from_float(-1.5)
+    assert d.hex() == "BFF8000000000000"
+    assert (d.sign, d.exponent, d.fraction) == (1, 0x3FF, 0x8000000000000)
+    d.sign = 0
+    d.exponent = 0x400
+    assert d.value == 3.0
+    d.fraction = 0
+    assert d.value == 2.0
+    assert d.toggle_bit(63) == 1 and d.value == -2.0
+    d.set_bit(63, 0)
+    assert d == Double64.from_float(2.0)
+    assert d.nibble(15) == 4 and d.bit(62) == 1
+
+
+def test_value_is_reinterpreted():
+    for value in (0.1, -0.0, 5e-324, 1.7976931348623157e308, math.inf):
+        bits = float_to_bits(value)
+        assert Double64(bits).value == value
+        assert math.copysign(1, bits_to_float(bits)) == math.copysign(1, value)
+    assert math.isnan(Double64(0x7FF8000000000001).value)
+
+
+def test_classify():
+    assert classify(0x0000000000000000) == ZERO
+    assert classify(0x8000000000000000) == ZERO
+    assert classify(0x0000000000000001) == SUBNORMAL
+    assert classify(0x000FFFFFFFFFFFFF) == SUBNORMAL
+    assert classify(0x0010000000000000) == NORMAL
+    assert classify(0xFFF0000000000000) == INFINITE
+    assert classify(0x7FF0000000000001) == NAN
+    assert unbiased_exponent(0x0000000000000001) == -1022
+    assert unbiased_exponent(0x3FF0000000000000) == 0
+    assert unbiased_exponent(0x7FF0000000000000) == 1024
+
+
+def test_describe():
+    assert describe(0x0000000000000000) == "+0.0"
+    assert describe(0x8000000000000000) == "-0.0"
+    assert describe(0x7FF0000000000000) == "+∞"
+    assert describe(0xFFF8000000000000) == "-NaN"
+    assert describe(0x0000000000000001) == "5e-324 ~ Min subnormal +ve"
+    assert describe(0x8000000000000002) == "-1e-323 ~ Subnormal"
+    assert describe(0x7FEFFFFFFFFFFFFF) == "1.7976931348623157e+308 ~ Max +ve"
+    assert describe(0x8010000000000000) == "-2.2250738585072014e-308 ~ Min -ve"
+    assert describe(0x3FB999999999999A) == "0.1"
+    assert Double64(0x3FF0000000000000).describe() == "1.0"
+
+
+def test_encode():
+    assert double64.encode("0.1") == float_to_bits(0.1)
+    assert double64.encode("-0x1.8p1") == float_to_bits(-3.0)
+    assert double64.encode("1e400") == 0x7FF0000000000000
+
+
+def test_step_ulps():
+    one = float_to_bits(1.0)
+    assert bits_to_float(double64.next_up(one)) == math.nextafter(1.0, math.inf)
+    assert bits_to_float(double64.next_down(one)) == math.nextafter(1.0, -math.inf)
+    assert double64.step_ulps(0x8000000000000000, 1) == 0x0000000000000001
+    assert double64.step_ulps(0x0000000000000001, -2) == 0x8000000000000001
+    # Onto zero gives +0. Stops at ±∞. NaN unchanged
+    assert double64.step_ulps(0x8000000000000001, 1) == 0
+    assert double64.step_ulps(0x7FEFFFFFFFFFFFFF, 5) == 0x7FF0000000000000
+    assert double64.step_ulps(0x0000000000000000, -(1 << 63)) == 0xFFF0000000000000
+    assert double64.step_ulps(0x7FF8000000000000, 1) == 0x7FF8000000000000
+    d = Double64(one)
+    d.step_ulps(1 << 52)
+    assert d.value == 2.0
+
+
+def test_ulp_distance():
+    assert double64.ulp_distance(float_to_bits(1.0), float_to_bits(2.0)) == 1 << 52
+    assert double64.ulp_distance(0x8000000000000000, 0) == 0
+    assert double64.ulp_distance(0x8000000000000001, 0x0000000000000001) == 2
+    assert double64.ulp_distance(0x7FF8000000000000, 0xFFF8000000000001) == 0
+    assert double64.ulp_distance(0x7FF8000000000000, 0) == double64.NAN_DISTANCE
@@ -0,0 +1,36 @@
+"""Tests of double64_formats.Format encoding"""
+import double64
+from double64_formats import Format, FORMATS, BINARY16
+
+# A binary64 Format without the double64 fast paths
+GENERIC64 = Format("generic64", 64, 11)
+
+
+def test_generic_binary64_matches_double64():
+    for text in ("0.1", "1e-320", "2.4703282292062328e-324", "2.4703282292062327e-324",
+            "1.7976931348623158e308", "1.7976931348623159e308", "1e400", "0x1.8p1",
+            "-0x.1p-1070", "-0.0", "123456789012345678901234567890"):
+        assert GENERIC64.encode(text) == double64.encode(text), text
+
+
+def test_huge_literals():
+    for fmt in FORMATS.values():
+        assert fmt.encode("9" * 5000) == fmt.infinity()
+        assert fmt.encode("1e99999999999999") == fmt.infinity()
+        assert fmt.encode("0." + "0" * 9000 + "7") == 0
+        assert fmt.encode("3." + "1" * 10000) == fmt.encode("3.1111111111111111111111111111111111111111111")
+
+
+def test_half_way_sticky():
+    # Half the binary16 min subnormal rounds to 0, anything above it to the min subnormal
+    assert BINARY16.encode("2.98023223876953125e-8") == 0
+    assert BINARY16.encode("2.98023223876953125" + "0" * 50 + "1e-8") == 1
+
+
+def test_step_ulps_generic_matches_double64():
+    for bits in (0, 0x8000000000000000, 1, 0x8000000000000001, 0x000FFFFFFFFFFFFF,
+            0x3FF0000000000000, 0x7FEFFFFFFFFFFFFF, 0xFFF0000000000000, 0x7FF8000000000000):
+        for count in (-3, -1, 1, 2, 1 << 52):
+            assert GENERIC64.step_ulps(bits, count) == double64.step_ulps(bits, count)
+    # Next up from the binary16 max is infinity
+    assert BINARY16.step_ulps(BINARY16.max(), 1) == BINARY16.infinity()
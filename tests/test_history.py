@@ -0,0 +1,54 @@
+"""Tests of double64.History, the XOR delta undo history"""
+from double64 import RegisterFile, History
+
+
+def write(registers, history, index, bits):
+    old = registers[index]
+    registers[index] = bits
+    history.record(index, old, registers[index])
+
+
+def test_undo_redo():
+    registers, history = RegisterFile(), History()
+    for bits in (1, 2, 3):
+        write(registers, history, 0, bits)
+    history.undo(registers)
+    history.undo(registers)
+    assert registers[0] == 1
+    write(registers, history, 0, 9)
+    assert len(history) == 2
+    assert history.redo(registers) is None
+    history.seek(registers, 0)
+    assert registers[0] == 0
+
+
+def test_steps_after_wrap_undo_record():
+    registers, history = RegisterFile(), History(capacity=4)
+    for bits in range(1, 7):
+        write(registers, history, bits % 3, bits)
+    history.undo(registers)
+    history.undo(registers)
+    write(registers, history, 2, 100)
+    assert len(history) == 3
+
+    deltas, indices = history.steps()
+    assert len(deltas) == len(indices) == 3
+
+    restored = History(capacity=4)
+    restored.restore(deltas, indices, history.position)
+    copy = RegisterFile()
+    for index, bits in enumerate(registers.values):
+        copy[index] = bits
+    history.seek(registers, 0)
+    restored.seek(copy, 0)
+    assert list(copy.values) == list(registers.values)
+
+
+def test_steps_wide_registers():
+    registers, history = RegisterFile(4, 128), History(128, capacity=3)
+    for bits in range(1, 6):
+        write(registers, history, 1, bits << 100)
+    history.undo(registers)
+    write(registers, history, 1, 7)
+    deltas, indices = history.steps()
+    assert len(deltas) == 2 * len(indices) == 2 * len(history)
@@ -0,0 +1,77 @@
+"""Tests of double64_session, the binary session file"""
+import struct
+import threading
+from array import array
+
+import pytest
+
+import double64_session
+from double64_session import Session, HEADER, Cancelled
+
+
+def binary64_session():
+    return Session("binary64", [0x3FF0000000000000, 0, 0xFFF0000000000000], 2,
+            ["F0: one", "F1", "F2: -∞"], array("Q", [0x3FF0000000000000, 1]),
+            array("B", [0, 2]), 1)
+
+
+def test_binary64_round_trip(tmp_path):
+    filename = str(tmp_path / "a.d64s")
+    session = binary64_session()
+    fractions = []
+    double64_session.save(filename, session, progress=fractions.append)
+    assert double64_session.load(filename) == session
+    assert fractions[-1] == 1.0
+
+
+def test_x87_round_trip(tmp_path):
+    # 80 bit registers are two uint64 words each, least significant first
+    filename = str(tmp_path / "x87.d64s")
+    registers = [0x3FFF8000000000000000, 0xFFFFFFFFFFFFFFFFFFFF, 0x7FFEFFFFFFFFFFFFFFFF]
+    session = Session("x87", registers, 1, ["a", "b", "c"],
+            array("Q", [1, 1 << 15, 0xFFFFFFFFFFFFFFFF, 3]), array("B", [1, 0]), 2)
+    double64_session.save(filename, session, width=80)
+    loaded = double64_session.load(filename)
+    assert loaded == session
+    assert loaded.registers == registers
+
+
+def test_bad_files(tmp_path):
+    filename = str(tmp_path / "bad.d64s")
+    double64_session.save(filename, binary64_session())
+    with open(filename, "rb") as fin:
+        data = fin.read()
+
+    with open(filename, "wb") as fout:
+        fout.write(b"NOTASESS" + data[8:])
+    with pytest.raises(ValueError, match="not a session file"):
+        double64_session.load(filename)
+
+    with open(filename, "wb") as fout:
+        fout.write(data[:8] + struct.pack("<H", double64_session.VERSION + 1) + data[10:])
+    with pytest.raises(ValueError, match="session version"):
+        double64_session.load(filename)
+
+    with open(filename, "wb") as fout:
+        fout.write(data[:-1])
+    with pytest.raises(ValueError, match="cut short"):
+        double64_session.load(filename)
+
+    with open(filename, "wb") as fout:
+        fout.write(data[:HEADER.size - 1])
+    with pytest.raises(ValueError, match="not a session file"):
+        double64_session.load(filename)
+
+
+def test_cancelled_save_keeps_old_file(tmp_path):
+    filename = str(tmp_path / "keep.d64s")
+    old = binary64_session()
+    double64_session.save(filename, old)
+    cancelled = threading.Event()
+    cancelled.set()
+    new = old._replace(registers=[1, 2, 3])
+    with pytest.raises(Cancelled):
+        double64_session.save(filename, new, cancelled=cancelled)
+    assert double64_session.load(filename) == old
+    # The temporary file is removed
+    assert [path.name for path in tmp_path.iterdir()] == ["keep.d64s"]
@@ -0,0 +1,49 @@
+"""Tests of double64_tasks.TaskPool, with on_done and on_progress called in the worker thread"""
+import threading
+
+from double64_tasks import TaskPool
+
+
+def test_progress_then_done():
+    pool = TaskPool()
+    finished = threading.Event()
+    fractions, results = [], []
+
+    def work(cancelled, progress, count):
+        for step in range(count + 1):
+            progress(step / count)
+        progress(None)
+        return count
+
+    def done(result, error):
+        results.append((result, error))
+        finished.set()
+    pool.submit("file", work, 1000, on_done=done, on_progress=fractions.append)
+    assert finished.wait(5)
+    pool.shutdown()
+    assert results == [(1000, None)]
+    # About 1% steps, then each None
+    shown, last = fractions[:-1], fractions[-1]
+    assert 50 < len(shown) <= 101 and shown[0] == 0 and last is None
+    assert all(later - earlier >= 0.0099 for earlier, later in zip(shown, shown[1:]))
+
+
+def test_cancelled_job_is_not_delivered():
+    pool = TaskPool()
+    started, release = threading.Event(), threading.Event()
+    results, fractions = [], []
+
+    def work(cancelled, progress):
+        started.set()
+        release.wait(5)
+        progress(0.5)
+        return cancelled.is_set()
+    job = pool.submit("file", work, on_done=lambda *args: results.append(args),
+            on_progress=fractions.append)
+    assert started.wait(5)
+    pool.cancel("file")
+    assert not pool.busy("file")
+    release.set()
+    job.future.result(5)
+    pool.shutdown()
+    assert results == [] and fractions == []